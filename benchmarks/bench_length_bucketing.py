@@ -0,0 +1,73 @@
+"""
+Throughput of plain vs length-bucketed embedding on the sample GRC workload.
+
+Run from the repo root:
+    python -m benchmarks.bench_length_bucketing
+"""
+
+import time
+from pathlib import Path
+
+import numpy as np
+
+from services.data_manager import load_data
+from services.sbert_engine import sbert_embedder
+
+FILE_PATH = Path("sample_files/sample_large_control-procedures_dataset.xlsx")
+SHEET_NAME = "Sheet1"
+COLUMNS = ["name", "description"]
+MODEL_KEY = "MiniLM-L6-v2"
+REPEATS = 3
+
+
+def _padding_efficiency(lengths: np.ndarray, batches) -> float:
+    """Share of tokens in all padded batches that are real tokens."""
+    padded = sum(len(batch) * lengths[batch].max() for batch in batches)
+    return lengths.sum() / padded
+
+
+def _best_time(fn) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    records = load_data.extract_data(FILE_PATH, SHEET_NAME, COLUMNS)
+    # Mix short names and long descriptions as separate inputs, as a GRC sheet would
+    sentences = [str(record[column]) for record in records for column in COLUMNS]
+
+    model = sbert_embedder.get_model(MODEL_KEY)
+    lengths = sbert_embedder._token_lengths(model, sentences)
+    fixed_batches = [
+        np.arange(start, min(start + 32, len(sentences)))
+        for start in range(0, len(sentences), 32)
+    ]
+    bucketed_batches = sbert_embedder._token_budget_batches(
+        lengths, sbert_embedder.TOKEN_BUDGET, sbert_embedder.MAX_BATCH_SIZE
+    )
+
+    model.encode(sentences[:32], show_progress_bar=False)  # warm-up
+    plain_s = _best_time(
+        lambda: model.encode(sentences, batch_size=32, show_progress_bar=False)
+    )
+    bucketed_s = _best_time(lambda: sbert_embedder._encode_with_model(model, sentences))
+
+    print(f"📄 {len(sentences)} sentences, {lengths.sum()} tokens")
+    print(
+        f"Plain (batch 32):     {len(sentences) / plain_s:8.1f} sentences/s, "
+        f"padding efficiency {_padding_efficiency(lengths, fixed_batches):.0%}"
+    )
+    print(
+        f"Token-budget buckets: {len(sentences) / bucketed_s:8.1f} sentences/s, "
+        f"padding efficiency {_padding_efficiency(lengths, bucketed_batches):.0%} "
+        f"({len(bucketed_batches)} batches)"
+    )
+    print(f"⚡ Speed-up: {plain_s / bucketed_s:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Offline, deterministic performance benchmarks for the search pipeline.
+
+For every (format, size) case a synthetic corpus is generated once, then a
+fresh worker process prepares it into an empty cache and runs queries:
+
+    prepare_seconds / prepare_rows_per_s   prepare_corpus throughput
+    cold_query_ms                          first query, nothing resident
+    warm_p50_ms / warm_p99_ms              new queries, corpus resident
+    cached_p50_ms                          repeated queries (result cache)
+    peak_rss_mb                            peak resident memory of the worker
+    cache_bytes                            corpus cache directory on disk
+
+Run from the repo root:
+    python -m benchmarks.run_benchmarks --sizes 1k,100k --formats csv,xlsx
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks import stand_in_model, synthetic_data
+
+DATA_DIR = Path("benchmarks/data")
+DEFAULT_OUTPUT = Path("benchmarks/results/latest.json")
+BENCH_COLUMNS = ["name", "description"]
+
+# Metrics compared against the baseline; all are "lower is better"
+COMPARED_METRICS = (
+    "prepare_seconds",
+    "cold_query_ms",
+    "warm_p50_ms",
+    "warm_p99_ms",
+    "peak_rss_mb",
+    "cache_bytes",
+)
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _timed_queries(queries: List[str], embedding_id: str, model_key: str, top_k: int):
+    from services import semantic_search
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        semantic_search.query_corpus(query, embedding_id, model_key, top_k=top_k)
+        latencies.append(1000 * (time.perf_counter() - start))
+    return np.array(latencies)
+
+
+def run_case(path: str, fmt: str, n_rows: int, n_queries: int, top_k: int) -> Dict:
+    """Prepare and query one corpus in a fresh cache; runs in a worker process."""
+    from services import metrics, semantic_search
+    from services.data_manager import corpus_cache, local_caching
+    from services.sbert_engine import embedding_store, sbert_embedder
+
+    model_key = stand_in_model.install()
+    metrics.enable()
+    with tempfile.TemporaryDirectory(prefix="teddy-bench-") as cache_root:
+        local_caching.CACHE_ROOT = Path(cache_root)
+        embedding_store.STORE_PATH = Path(cache_root) / "sentences.sqlite3"
+
+        start = time.perf_counter()
+        embedding_id, _ = semantic_search.prepare_corpus(
+            Path(path),
+            "Sheet1" if fmt == "xlsx" else None,
+            BENCH_COLUMNS,
+            model_key,
+            workers=1,
+        )
+        prepare_seconds = time.perf_counter() - start
+
+        queries = synthetic_data.sample_queries(n_queries + 1)
+        corpus_cache.clear()
+        semantic_search.clear_result_cache()
+        sbert_embedder.clear_query_cache()
+        cold = _timed_queries(queries[:1], embedding_id, model_key, top_k)
+        warm = _timed_queries(queries[1:], embedding_id, model_key, top_k)
+        cached = _timed_queries(queries[1:], embedding_id, model_key, top_k)
+
+        return {
+            "case": f"{fmt}-{n_rows}",
+            "format": fmt,
+            "rows": n_rows,
+            "prepare_seconds": prepare_seconds,
+            "prepare_rows_per_s": n_rows / prepare_seconds,
+            "cold_query_ms": float(cold[0]),
+            "warm_p50_ms": float(np.percentile(warm, 50)),
+            "warm_p99_ms": float(np.percentile(warm, 99)),
+            "cached_p50_ms": float(np.percentile(cached, 50)),
+            "peak_rss_mb": _peak_rss_mb(),
+            "cache_bytes": _dir_size(local_caching.get_cache_dir(embedding_id)),
+            "sentence_store_bytes": embedding_store.STORE_PATH.stat().st_size,
+            "stages": metrics.snapshot(),
+        }
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """Describe every metric that got worse than baseline by more than tolerance."""
+    baseline_by_case = {row["case"]: row for row in baseline}
+    regressions = []
+    for row in results:
+        reference = baseline_by_case.get(row["case"])
+        if reference is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = reference.get(metric), row.get(metric)
+            if not old or new is None:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append(
+                    f"{row['case']}: {metric} {old:.4g} → {new:.4g} "
+                    f"(+{100 * (new / old - 1):.0f}%)"
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1k,100k", help="e.g. 1k,100k,1M")
+    parser.add_argument("--formats", default="csv,xlsx")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    # A fresh interpreter per case keeps peak RSS and warm caches independent
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for fmt in args.formats.split(","):
+        for size in args.sizes.split(","):
+            n_rows = parse_size(size)
+            path = synthetic_data.generate(DATA_DIR, fmt, n_rows)
+            with context.Pool(1) as pool:
+                row = pool.apply(
+                    run_case, (str(path), fmt, n_rows, args.queries, args.top_k)
+                )
+            results.append(row)
+            print(
+                f"📊 {row['case']:>12}: prepare {row['prepare_rows_per_s']:,.0f} rows/s, "
+                f"cold {row['cold_query_ms']:.1f} ms, "
+                f"warm p50/p99 {row['warm_p50_ms']:.2f}/{row['warm_p99_ms']:.2f} ms, "
+                f"peak RSS {row['peak_rss_mb'] or 0:.0f} MB, "
+                f"cache {row['cache_bytes'] / 1e6:.1f} MB"
+            )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "model": stand_in_model.MODEL_NAME,
+            "queries": args.queries,
+            "top_k": args.top_k,
+        },
+        "results": results,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"💾 Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"⚠️ Regression {line}")
+        if regressions:
+            return 1
+        print(f"✅ Within {args.tolerance:.0%} of baseline {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Tiny offline stand-in for a SentenceTransformer, used by the benchmarks.
+
+Sentences are embedded by feature hashing of their lower-cased words into a
+fixed number of signed buckets, so results are deterministic, need no
+download and cost little enough that the benchmarks measure the pipeline
+rather than the model.
+"""
+
+import zlib
+from typing import List
+
+import numpy as np
+
+from services.sbert_engine import sbert_embedder
+from services.sbert_engine.sbert_model_registry import SUPPORTED_MODELS
+
+MODEL_KEY = "bench-hashing"
+MODEL_NAME = "local/feature-hashing"
+
+
+class HashingModel:
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+
+    def encode(self, sentences: List[str], convert_to_numpy=True, **kwargs):
+        vecs = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            for token in sentence.lower().split():
+                h = zlib.crc32(token.encode("utf-8"))
+                vecs[i, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vecs
+
+
+def install(dim: int = 64) -> str:
+    """Register the stand-in under MODEL_KEY and return that key."""
+    SUPPORTED_MODELS[MODEL_KEY] = MODEL_NAME
+    sbert_embedder._model_cache[MODEL_NAME] = HashingModel(dim)
+    return MODEL_KEY
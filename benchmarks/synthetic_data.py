@@ -0,0 +1,148 @@
+"""Deterministic GRC-style corpora for benchmarking (CSV and XLSX)."""
+
+import csv
+from pathlib import Path
+from typing import Iterator, List
+
+import numpy as np
+from openpyxl import Workbook
+
+COLUMNS = ["id", "name", "description", "owner"]
+
+_SUBJECTS = [
+    "password",
+    "firewall",
+    "backup",
+    "encryption",
+    "access",
+    "audit",
+    "patch",
+    "incident",
+    "vendor",
+    "network",
+    "endpoint",
+    "privileged",
+    "logging",
+    "retention",
+    "change",
+    "asset",
+    "malware",
+    "training",
+    "recovery",
+    "key",
+]
+_ACTIONS = [
+    "review",
+    "enforce",
+    "monitor",
+    "approve",
+    "rotate",
+    "restrict",
+    "test",
+    "document",
+    "validate",
+    "escalate",
+    "revoke",
+    "configure",
+    "report",
+]
+_FILLER = [
+    "quarterly",
+    "annually",
+    "all",
+    "systems",
+    "users",
+    "records",
+    "within",
+    "days",
+    "policy",
+    "controls",
+    "critical",
+    "production",
+    "evidence",
+    "owner",
+    "must",
+    "shall",
+    "management",
+    "exceptions",
+    "approved",
+    "according",
+    "to",
+    "the",
+    "standard",
+    "procedure",
+    "and",
+    "risk",
+    "register",
+    "third-party",
+]
+_OWNERS = ["IT", "Security", "Finance", "HR", "Legal", "Operations", "Risk"]
+
+
+def iter_rows(n_rows: int, seed: int = 0) -> Iterator[List[str]]:
+    """Yield [id, name, description, owner] rows; descriptions vary in length."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_rows, 10_000):
+        n = min(10_000, n_rows - start)
+        subjects = rng.integers(0, len(_SUBJECTS), size=n)
+        actions = rng.integers(0, len(_ACTIONS), size=n)
+        owners = rng.integers(0, len(_OWNERS), size=n)
+        lengths = rng.integers(4, 60, size=n)
+        filler = rng.integers(0, len(_FILLER), size=int(lengths.sum()))
+        offset = 0
+        for i in range(n):
+            words = [_FILLER[w] for w in filler[offset : offset + lengths[i]]]
+            offset += lengths[i]
+            subject, action = _SUBJECTS[subjects[i]], _ACTIONS[actions[i]]
+            yield [
+                f"CTRL-{start + i:07d}",
+                f"{action.capitalize()} {subject} controls",
+                f"{action.capitalize()} {subject} " + " ".join(words),
+                _OWNERS[owners[i]],
+            ]
+
+
+def write_csv(path: Path, n_rows: int, seed: int = 0) -> Path:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(iter_rows(n_rows, seed))
+    return path
+
+
+def write_xlsx(path: Path, n_rows: int, seed: int = 0) -> Path:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(COLUMNS)
+    for row in iter_rows(n_rows, seed):
+        ws.append(row)
+    wb.save(path)
+    return path
+
+
+def generate(directory: Path, fmt: str, n_rows: int, seed: int = 0) -> Path:
+    """Create (or reuse) a synthetic corpus file of the given format and size."""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"synthetic_{n_rows}_{seed}.{fmt}"
+    if path.exists():
+        return path
+    # Written under a temporary name so an interrupted run is never reused
+    tmp = path.with_suffix(f".tmp.{fmt}")
+    if fmt == "csv":
+        write_csv(tmp, n_rows, seed)
+    elif fmt == "xlsx":
+        write_xlsx(tmp, n_rows, seed)
+    else:
+        raise ValueError(f"Unsupported benchmark format: {fmt}")
+    tmp.replace(path)
+    return path
+
+
+def sample_queries(n_queries: int, seed: int = 1) -> List[str]:
+    """Distinct short queries in the corpus vocabulary."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i in range(n_queries):
+        words = rng.choice(_SUBJECTS + _FILLER, size=rng.integers(2, 6))
+        queries.append(f"{_ACTIONS[i % len(_ACTIONS)]} " + " ".join(words))
+    return list(dict.fromkeys(queries))
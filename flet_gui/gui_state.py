@@ -5,6 +5,8 @@ class AppState:
         self.columns = []
         self.embedding_id = None
         self.results = []
+        self.query_generation = 0  # bumped per search; older results are dropped
+        self.prepare_cancel = None  # threading.Event of the running preparation
 
     def clear(self):
         self.__init__()
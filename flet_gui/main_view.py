@@ -1,10 +1,26 @@
 import flet as ft
+import threading
 from pathlib import Path
 from services import semantic_search
 from flet_gui.gui_state import AppState
 
 app_state = AppState()
 
+# Rows per prepare_corpus chunk: how often progress updates and Cancel is honoured
+GUI_CHUNK_SIZE = 256
+
+
+def format_progress(progress) -> str:
+    total = f"/{progress.rows_total}" if progress.rows_total else ""
+    text = (
+        f"🔄 Loaded {progress.rows_loaded}{total} rows, "
+        f"embedded {progress.rows_embedded}{total}"
+    )
+    if progress.eta_seconds is not None:
+        minutes, seconds = divmod(int(progress.eta_seconds), 60)
+        text += f" — ETA {minutes}m {seconds:02d}s"
+    return text
+
 
 def main(page: ft.Page):
     page.title = "🐾 Teddy Search"
@@ -16,6 +32,17 @@ def main(page: ft.Page):
     # UI state components
     results_output = ft.Column(scroll="auto", expand=True)
     metadata_display = ft.Text("No file loaded.")
+    model_status = ft.Text(f"⏳ Loading model {DEFAULT_MODEL}...")
+
+    def on_model_loaded(model_key, error):
+        if error is None:
+            model_status.value = f"✅ Model ready: {model_key}"
+        else:
+            model_status.value = f"❌ Model {model_key} failed to load: {error}"
+        page.update()
+
+    # Load the model while the user picks a file, not on the first query
+    semantic_search.sbert_embedder.warm_up(DEFAULT_MODEL, on_model_loaded)
     export_button = ft.ElevatedButton("Export Results", disabled=True)
 
     # Dialog state
@@ -35,19 +62,38 @@ def main(page: ft.Page):
         if not query:
             return
 
+        # Any search still running belongs to an older generation and is dropped
+        app_state.query_generation += 1
+        generation = app_state.query_generation
+        embedding_id = app_state.embedding_id
+
         results_output.controls.append(ft.Text("🔎 Searching..."))
         page.update()
 
-        results = semantic_search.query_corpus(
-            query, app_state.embedding_id, DEFAULT_MODEL, top_k=5
-        )
-        app_state.results = results
+        def run_query():
+            try:
+                results = semantic_search.query_corpus(
+                    query, embedding_id, DEFAULT_MODEL, top_k=5
+                )
+            except Exception as ex:
+                if generation == app_state.query_generation:
+                    results_output.controls.clear()
+                    results_output.controls.append(ft.Text(f"❌ Error: {ex}"))
+                    page.update()
+                return
+            if generation != app_state.query_generation:
+                return
 
-        results_output.controls.clear()
-        for i, (record, score) in enumerate(results):
-            results_output.controls.append(ft.Text(f"{i+1}. [{score:.4f}] {record}"))
-        export_button.disabled = False
-        page.update()
+            app_state.results = results
+            results_output.controls.clear()
+            for i, (record, score) in enumerate(results):
+                results_output.controls.append(
+                    ft.Text(f"{i+1}. [{score:.4f}] {record}")
+                )
+            export_button.disabled = False
+            page.update()
+
+        page.run_thread(run_query)
 
     # Must come after on_query is defined
     query_input = ft.TextField(label="Enter query", expand=True, on_submit=on_query)
@@ -75,6 +121,9 @@ def main(page: ft.Page):
 
         sheet_dropdown.on_change = update_columns_for_sheet
 
+        progress_bar = ft.ProgressBar(width=300, value=0, visible=False)
+        prepare_button = ft.TextButton("Prepare")
+
         def on_prepare_clicked(e):
             selected_columns = [cb.label for cb in columns_column.controls if cb.value]
             if not selected_columns:
@@ -83,25 +132,73 @@ def main(page: ft.Page):
                 return
 
             dialog_status.value = "🔄 Generating embeddings..."
+            prepare_button.disabled = True
+            progress_bar.value = None
+            progress_bar.visible = True
             page.update()
 
             sheet = sheet_dropdown.value if sheet_dropdown.visible else None
-            embedding_id, _ = semantic_search.prepare_corpus(
-                file_path, sheet, selected_columns, DEFAULT_MODEL
-            )
+            cancel_event = threading.Event()
+            app_state.prepare_cancel = cancel_event
+
+            def on_progress(progress):
+                dialog_status.value = format_progress(progress)
+                if progress.rows_total:
+                    progress_bar.value = min(
+                        1.0, progress.rows_embedded / progress.rows_total
+                    )
+                page.update()
 
-            app_state.file_path = file_path
-            app_state.sheet = sheet
-            app_state.columns = selected_columns
-            app_state.embedding_id = embedding_id
-            app_state.results = []
+            def run_prepare():
+                try:
+                    embedding_id, _ = semantic_search.prepare_corpus(
+                        file_path,
+                        sheet,
+                        selected_columns,
+                        DEFAULT_MODEL,
+                        chunk_size=GUI_CHUNK_SIZE,
+                        progress_callback=on_progress,
+                        cancel_event=cancel_event,
+                    )
+                except semantic_search.PrepareCancelled:
+                    dialog_status.value = "⏹️ Cancelled."
+                    return
+                except Exception as ex:
+                    dialog_status.value = f"❌ Error: {ex}"
+                    return
+                finally:
+                    app_state.prepare_cancel = None
+                    prepare_button.disabled = False
+                    progress_bar.visible = False
+                    page.update()
+
+                app_state.file_path = file_path
+                app_state.sheet = sheet
+                app_state.columns = selected_columns
+                app_state.embedding_id = embedding_id
+                app_state.results = []
+                app_state.query_generation += 1
+
+                metadata_display.value = f"📄 {file_path.name} - Selected Sheet: {sheet or 'N/A'}. Selected Columns: {', '.join(selected_columns)}"
+                export_button.disabled = True
+                query_input.value = ""
+                results_output.controls.clear()
+                dialog.open = False
+                page.update()
+
+            page.run_thread(run_prepare)
 
-            metadata_display.value = f"📄 {file_path.name} - Selected Sheet: {sheet or 'N/A'}. Selected Columns: {', '.join(selected_columns)}"
-            export_button.disabled = True
-            query_input.value = ""
-            dialog.open = False
+        def on_cancel_clicked(e):
+            # Stop a running preparation at the next chunk; otherwise close
+            if app_state.prepare_cancel is not None:
+                app_state.prepare_cancel.set()
+                dialog_status.value = "⏹️ Cancelling..."
+            else:
+                dialog.open = False
             page.update()
 
+        prepare_button.on_click = on_prepare_clicked
+
         dialog = ft.AlertDialog(
             modal=True,
             title=ft.Text("Configure Columns"),
@@ -109,14 +206,13 @@ def main(page: ft.Page):
                 [
                     sheet_dropdown,
                     columns_column,
+                    progress_bar,
                 ]
             ),
             actions=[
                 dialog_status,
-                ft.TextButton("Prepare", on_click=on_prepare_clicked),
-                ft.TextButton(
-                    "Cancel", on_click=lambda e: setattr(dialog, "open", False)
-                ),
+                prepare_button,
+                ft.TextButton("Cancel", on_click=on_cancel_clicked),
             ],
             actions_alignment=ft.MainAxisAlignment.END,
         )
@@ -183,7 +279,10 @@ def main(page: ft.Page):
                         ft.IconButton(icon=ft.icons.SEARCH, on_click=on_query),
                     ]
                 ),
-                metadata_display,
+                ft.Row(
+                    [metadata_display, model_status],
+                    alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                ),
                 results_output,
                 ft.Row([export_button], alignment=ft.MainAxisAlignment.END),
             ],
@@ -7,5 +7,13 @@ class EmbeddingMetadata(BaseModel):
     file_hash: str  # md5 hash of the loaded file (raw)
     file_name: str
     model_key: str
+    backend: str = "torch"  # inference backend the embeddings came from
     columns: List[str]
     sheet_name: Optional[str] = None
+    source_path: Optional[str] = None  # resolved path, links versions of a file
+    normalized: bool = False  # embeddings stored as L2-normalised float32
+    index_type: Optional[str] = None  # approximate index persisted alongside
+    lexical_index: bool = False  # BM25 index of the sentences persisted alongside
+    filter_columns: List[str] = []  # extra record columns kept for filtering only
+    filter_index: bool = False  # per-column value postings persisted alongside
+    embedding_encoding: str = "float32"  # compact copy used for the coarse pass
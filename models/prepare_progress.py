@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class PrepareProgress(BaseModel):
+    rows_loaded: int = 0  # rows read from the source file so far
+    rows_embedded: int = 0  # rows embedded (or reused) and written to the cache
+    rows_reused: int = 0  # rows whose vectors came from a previous version
+    rows_total: Optional[int] = None  # estimated row count, if known up front
+    elapsed_seconds: float = 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time extrapolated from the embedding rate so far."""
+        if not self.rows_total or not self.rows_embedded:
+            return None
+        remaining = max(0, self.rows_total - self.rows_embedded)
+        return remaining * self.elapsed_seconds / self.rows_embedded
@@ -0,0 +1,82 @@
+"""
+Inspect and prune the embedding cache.
+
+    python -m services.data_manager.cache_admin stats [--budget-mb 2048]
+    python -m services.data_manager.cache_admin prune [--budget-mb 2048] [--dry-run]
+    python -m services.data_manager.cache_admin pin <embedding_id> [--unpin]
+
+stats lists every cached corpus, least recently used first, with its size
+and whether pruning to the budget would evict it.
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from typing import List, Optional
+
+from services.data_manager import local_caching
+
+
+def _mb(n_bytes: int) -> str:
+    return f"{n_bytes / (1024 * 1024):,.1f} MB"
+
+
+def print_stats(stats: dict) -> None:
+    print(
+        f"{'embedding_id':<32}  {'size':>11}  {'rows':>9}  {'last access':<16}  "
+        f"{'model':<20}  file"
+    )
+    for entry in stats["corpora"]:
+        last_access = datetime.fromtimestamp(entry["last_access"])
+        flag = "📌" if entry["pinned"] else ("🗑️" if entry["evict"] else "")
+        print(
+            f"{entry['embedding_id']:<32}  {_mb(entry['size_bytes']):>11}  "
+            f"{entry['row_count']:>9,}  {last_access:%Y-%m-%d %H:%M}  "
+            f"{entry['model_key'] or '?':<20}  {entry['file_name'] or '?'} {flag}"
+        )
+    budget = _mb(stats["budget_bytes"]) if stats["budget_bytes"] else "unlimited"
+    print(
+        f"\n{len(stats['corpora'])} corpora, {_mb(stats['total_bytes'])} "
+        f"({_mb(stats['pinned_bytes'])} pinned), budget {budget}, "
+        f"prune would reclaim {_mb(stats['reclaimable_bytes'])}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("stats", "prune"):
+        command = commands.add_parser(name)
+        command.add_argument(
+            "--budget-mb",
+            type=float,
+            default=None,
+            help="defaults to TEDDY_SEARCH_CACHE_BUDGET_MB",
+        )
+    commands.choices["prune"].add_argument("--dry-run", action="store_true")
+    pin = commands.add_parser("pin")
+    pin.add_argument("embedding_id")
+    pin.add_argument("--unpin", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        print_stats(local_caching.cache_stats(args.budget_mb))
+    elif args.command == "prune":
+        evicted = local_caching.prune(args.budget_mb, dry_run=args.dry_run)
+        verb = "Would evict" if args.dry_run else "Evicted"
+        for entry in evicted:
+            print(f"🗑️ {verb} {entry['embedding_id']} ({_mb(entry['size_bytes'])})")
+        reclaimed = sum(entry["size_bytes"] for entry in evicted)
+        print(f"{verb} {len(evicted)} corpora, {_mb(reclaimed)}")
+    else:
+        try:
+            local_caching.pin(args.embedding_id, not args.unpin)
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"{'Unpinned' if args.unpin else '📌 Pinned'} {args.embedding_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+SQLite catalog of the corpora under a cache root.
+
+local_caching keeps it in step on every save_metadata / delete_cache, so
+listing corpora, is_cached and lookups by file hash or model are indexed
+queries instead of directory scans. A missing catalog is rebuilt from the
+cache directories on first use.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from models.embeddings_metadata import EmbeddingMetadata
+
+CATALOG_FILE = "catalog.sqlite3"
+# Marker file of a pinned corpus, so pins survive a catalog rebuild
+PIN_FILE = "pinned"
+
+# ? Minimum seconds between last-access writes for the same corpus
+TOUCH_INTERVAL_SECONDS = 60.0
+
+_lock = threading.Lock()
+_connections: Dict[Path, sqlite3.Connection] = {}
+_last_touch: Dict[tuple, float] = {}
+
+_COLUMNS = (
+    "embedding_id",
+    "file_hash",
+    "file_name",
+    "source_path",
+    "sheet_name",
+    "model_key",
+    "columns",
+    "row_count",
+    "size_bytes",
+    "saved_at",
+    "last_access",
+    "pinned",
+    "metadata",
+)
+
+
+def _connect(cache_root: Path) -> sqlite3.Connection:
+    """Open (once per root) the catalog, rebuilding it if it did not exist."""
+    path = Path(cache_root) / CATALOG_FILE
+    conn = _connections.get(path)
+    if conn is not None:
+        return conn
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    is_new = not path.exists()
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS corpora (
+            embedding_id TEXT PRIMARY KEY,
+            file_hash TEXT,
+            file_name TEXT,
+            source_path TEXT,
+            sheet_name TEXT,
+            model_key TEXT,
+            columns TEXT,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            size_bytes INTEGER NOT NULL DEFAULT 0,
+            saved_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            pinned INTEGER NOT NULL DEFAULT 0,
+            metadata TEXT
+        )
+        """)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(corpora)")}
+    if "pinned" not in existing:
+        # Catalogs written before pinning existed
+        conn.execute("ALTER TABLE corpora ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0")
+    for column in ("file_hash", "model_key", "source_path", "last_access"):
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_corpora_{column} ON corpora ({column})"
+        )
+    conn.commit()
+    _connections[path] = conn
+    if is_new:
+        _rebuild(conn, Path(cache_root))
+    return conn
+
+
+def _row_count(cache_dir: Path) -> int:
+    """Rows in embeddings.npy, read from its header only."""
+    try:
+        with open(cache_dir / "embeddings.npy", "rb") as f:
+            version = np.lib.format.read_magic(f)
+            read_header = (
+                np.lib.format.read_array_header_1_0
+                if version == (1, 0)
+                else np.lib.format.read_array_header_2_0
+            )
+            shape, _, _ = read_header(f)
+        return int(shape[0])
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _dir_size(cache_dir: Path) -> int:
+    return sum(f.stat().st_size for f in cache_dir.rglob("*") if f.is_file())
+
+
+def _entry(cache_dir: Path, metadata: Optional[EmbeddingMetadata], now: float):
+    saved_at = now
+    metadata_path = cache_dir / "metadata.json"
+    if metadata_path.exists():
+        saved_at = metadata_path.stat().st_mtime
+    return (
+        cache_dir.name,
+        metadata.file_hash if metadata else None,
+        metadata.file_name if metadata else None,
+        metadata.source_path if metadata else None,
+        metadata.sheet_name if metadata else None,
+        metadata.model_key if metadata else None,
+        json.dumps(metadata.columns) if metadata else None,
+        _row_count(cache_dir),
+        _dir_size(cache_dir),
+        saved_at,
+        now,
+        int((cache_dir / PIN_FILE).exists()),
+        metadata.model_dump_json() if metadata else None,
+    )
+
+
+def _upsert(conn: sqlite3.Connection, entry: tuple) -> None:
+    # Keep the recorded last access of corpora that are only re-saved
+    conn.execute(
+        f"INSERT INTO corpora ({', '.join(_COLUMNS)})"
+        f" VALUES ({', '.join('?' * len(_COLUMNS))})"
+        " ON CONFLICT (embedding_id) DO UPDATE SET "
+        + ", ".join(
+            f"{c} = excluded.{c}"
+            for c in _COLUMNS
+            if c not in ("embedding_id", "last_access")
+        ),
+        entry,
+    )
+
+
+def _rebuild(conn: sqlite3.Connection, cache_root: Path) -> None:
+    conn.execute("DELETE FROM corpora")
+    now = time.time()
+    if cache_root.exists():
+        for cache_dir in cache_root.iterdir():
+            metadata_path = cache_dir / "metadata.json"
+            if not metadata_path.is_file():
+                continue
+            try:
+                metadata = EmbeddingMetadata.model_validate_json(
+                    metadata_path.read_text()
+                )
+            except ValueError:
+                metadata = None  # unreadable, but its directory still counts
+            _upsert(conn, _entry(cache_dir, metadata, now))
+    conn.commit()
+
+
+def close(cache_root: Path) -> None:
+    """Close the catalog connection of a cache root; the next use re-opens it."""
+    with _lock:
+        conn = _connections.pop(Path(cache_root) / CATALOG_FILE, None)
+        if conn is not None:
+            conn.close()
+
+
+def rebuild(cache_root: Path) -> None:
+    """Re-create the catalog from the cache directories."""
+    with _lock:
+        _rebuild(_connect(cache_root), Path(cache_root))
+
+
+def upsert(cache_root: Path, metadata: EmbeddingMetadata) -> None:
+    """Record (or refresh) a corpus whose files are all in place."""
+    cache_dir = Path(cache_root) / metadata.embedding_id
+    with _lock:
+        conn = _connect(cache_root)
+        _upsert(conn, _entry(cache_dir, metadata, time.time()))
+        conn.commit()
+
+
+def remove(cache_root: Path, embedding_id: str) -> None:
+    with _lock:
+        conn = _connect(cache_root)
+        conn.execute("DELETE FROM corpora WHERE embedding_id = ?", (embedding_id,))
+        conn.commit()
+
+
+def contains(cache_root: Path, embedding_id: str) -> bool:
+    with _lock:
+        row = (
+            _connect(cache_root)
+            .execute("SELECT 1 FROM corpora WHERE embedding_id = ?", (embedding_id,))
+            .fetchone()
+        )
+    return row is not None
+
+
+def touch(cache_root: Path, embedding_id: str, force: bool = False) -> None:
+    """Record an access; writes are throttled to one per TOUCH_INTERVAL_SECONDS."""
+    now = time.time()
+    key = (Path(cache_root), embedding_id)
+    if not force and now - _last_touch.get(key, 0.0) < TOUCH_INTERVAL_SECONDS:
+        return
+    _last_touch[key] = now
+    with _lock:
+        conn = _connect(cache_root)
+        conn.execute(
+            "UPDATE corpora SET last_access = ? WHERE embedding_id = ?",
+            (now, embedding_id),
+        )
+        conn.commit()
+
+
+def list_metadata(
+    cache_root: Path,
+    model_key: Optional[str] = None,
+    file_hash: Optional[str] = None,
+    source_path: Optional[str] = None,
+) -> List[EmbeddingMetadata]:
+    """Metadata of cached corpora, optionally narrowed by indexed fields."""
+    clauses, params = ["metadata IS NOT NULL"], []
+    for column, value in (
+        ("model_key", model_key),
+        ("file_hash", file_hash),
+        ("source_path", source_path),
+    ):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    with _lock:
+        rows = (
+            _connect(cache_root)
+            .execute(
+                f"SELECT metadata FROM corpora WHERE {' AND '.join(clauses)}"
+                " ORDER BY saved_at",
+                params,
+            )
+            .fetchall()
+        )
+    return [EmbeddingMetadata.model_validate_json(row[0]) for row in rows]
+
+
+def set_pinned(cache_root: Path, embedding_id: str, pinned: bool) -> None:
+    """Pinned corpora are never evicted."""
+    marker = Path(cache_root) / embedding_id / PIN_FILE
+    if pinned:
+        marker.touch()
+    else:
+        marker.unlink(missing_ok=True)
+    with _lock:
+        conn = _connect(cache_root)
+        conn.execute(
+            "UPDATE corpora SET pinned = ? WHERE embedding_id = ?",
+            (int(pinned), embedding_id),
+        )
+        conn.commit()
+
+
+def eviction_plan(
+    cache_root: Path, budget_bytes: int, keep: Iterable[str] = ()
+) -> List[Dict]:
+    """
+    Least recently used corpora to delete so the cache fits budget_bytes.
+
+    Pinned corpora and those in keep still count towards the total but are
+    never chosen; the plan may therefore leave the cache over budget.
+    """
+    keep = set(keep)
+    cached = entries(cache_root)
+    excess = sum(e["size_bytes"] for e in cached) - budget_bytes
+    plan = []
+    for entry in cached:  # least recently used first
+        if excess <= 0:
+            break
+        if entry["pinned"] or entry["embedding_id"] in keep:
+            continue
+        plan.append(entry)
+        excess -= entry["size_bytes"]
+    return plan
+
+
+def entries(cache_root: Path) -> List[Dict]:
+    """One dict per corpus: catalog columns except the metadata blob."""
+    names = [c for c in _COLUMNS if c != "metadata"]
+    with _lock:
+        rows = (
+            _connect(cache_root)
+            .execute(f"SELECT {', '.join(names)} FROM corpora ORDER BY last_access")
+            .fetchall()
+        )
+    result = []
+    for row in rows:
+        entry = dict(zip(names, row))
+        entry["columns"] = json.loads(entry["columns"]) if entry["columns"] else None
+        entry["pinned"] = bool(entry["pinned"])
+        result.append(entry)
+    return result
@@ -0,0 +1,200 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from services import metrics
+from services.data_manager import local_caching, record_store
+from services.sbert_engine import ann_index, bm25_index, filter_index
+from models.embeddings_metadata import EmbeddingMetadata
+
+# Load env vars
+load_dotenv()
+
+# ? Memory budget for corpora kept resident between queries
+DEFAULT_MEMORY_BUDGET_MB = float(os.getenv("TEDDY_SEARCH_CORPUS_CACHE_MB", "1024"))
+
+
+class CorpusHandle:
+    """A loaded corpus: memory-mapped embeddings and records, optional indexes."""
+
+    def __init__(
+        self,
+        embedding_id: str,
+        cache_dir: Path,
+        version: Tuple,
+        embeddings: np.ndarray,
+        records: record_store.RecordStore,
+        metadata: Optional[EmbeddingMetadata] = None,
+    ):
+        self.embedding_id = embedding_id
+        self.cache_dir = cache_dir
+        self.version = version
+        self._embeddings = embeddings
+        self.records = records
+        self.metadata = metadata
+        self.ann_index = None
+        self.bm25_index = None
+        self.filter_index = None
+        self.codes = None
+        self.code_scales = None
+        # Records decode lazily; only their offsets index stays resident
+        self.nbytes = records.nbytes
+        if metadata is not None and metadata.index_type:
+            self.ann_index = ann_index.load_index(
+                metadata.index_type,
+                cache_dir / ann_index.index_file_name(metadata.index_type),
+            )
+            self.nbytes += self.ann_index.nbytes
+        if metadata is not None and metadata.lexical_index:
+            self.bm25_index = bm25_index.BM25Index.load(
+                cache_dir / bm25_index.INDEX_FILE
+            )
+            self.nbytes += self.bm25_index.nbytes
+        if metadata is not None and metadata.filter_index:
+            self.filter_index = filter_index.FilterIndex.load(
+                cache_dir / filter_index.INDEX_FILE
+            )
+            self.nbytes += self.filter_index.nbytes
+        if self.encoding != "float32":
+            # Full-precision vectors stay on disk; only shortlists are paged in
+            self.codes, self.code_scales = local_caching.load_embedding_codes(
+                embedding_id, self.encoding
+            )
+            self.nbytes += self.codes.nbytes
+        else:
+            self.nbytes += int(embeddings.nbytes)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        if self._embeddings is None:
+            # Closed while a query was still using it: map the file again
+            self._embeddings = np.load(self.cache_dir / "embeddings.npy", mmap_mode="r")
+        return self._embeddings
+
+    def close(self) -> None:
+        """Release the record map and the embeddings memmap (file handles)."""
+        self.records.close()
+        self._embeddings = None
+
+    @property
+    def normalized(self) -> bool:
+        """Whether embeddings were stored at unit length by prepare_corpus."""
+        return self.metadata is not None and self.metadata.normalized
+
+    @property
+    def encoding(self) -> str:
+        """Encoding of the compact copy scanned before exact rescoring."""
+        return self.metadata.embedding_encoding if self.metadata else "float32"
+
+
+_lock = threading.Lock()
+_corpora: "OrderedDict[str, CorpusHandle]" = OrderedDict()
+_memory_budget_bytes = int(DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024)
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _corpus_version(cache_dir: Path) -> Tuple:
+    """Cheap change detector for the files backing a corpus."""
+    version = []
+    for name in ("embeddings.npy", local_caching.RECORDS_FILE, "metadata.json"):
+        path = cache_dir / name
+        if name == "metadata.json" and not path.exists():
+            version.append(None)
+            continue
+        st = path.stat()
+        version.append((st.st_mtime_ns, st.st_size))
+    return tuple(version)
+
+
+def _evict_over_budget() -> None:
+    # Always keep the most recently used corpus, even if it alone exceeds the budget
+    total = sum(h.nbytes for h in _corpora.values())
+    while total > _memory_budget_bytes and len(_corpora) > 1:
+        _, evicted = _corpora.popitem(last=False)
+        evicted.close()
+        total -= evicted.nbytes
+        _stats["evictions"] += 1
+
+
+def set_memory_budget(megabytes: float) -> None:
+    """Change the resident memory budget and evict down to it."""
+    global _memory_budget_bytes
+    with _lock:
+        _memory_budget_bytes = int(megabytes * 1024 * 1024)
+        _evict_over_budget()
+
+
+def get_corpus(embedding_id: str) -> CorpusHandle:
+    """Return a warm corpus handle, loading it (memory-mapped) on first use."""
+    with metrics.span("load-corpus") as span:
+        cache_dir = local_caching.get_cache_dir(embedding_id)
+        if not (cache_dir / local_caching.RECORDS_FILE).exists():
+            local_caching.migrate_legacy_stores(embedding_id)
+        version = _corpus_version(cache_dir)
+        local_caching.touch(embedding_id)
+
+        with _lock:
+            handle = _corpora.get(embedding_id)
+            if (
+                handle is not None
+                and handle.cache_dir == cache_dir
+                and handle.version == version
+            ):
+                _corpora.move_to_end(embedding_id)
+                _stats["hits"] += 1
+                span.add(rows=len(handle.records), cache_hits=1)
+                return handle
+            _stats["misses"] += 1
+
+        handle = CorpusHandle(
+            embedding_id=embedding_id,
+            cache_dir=cache_dir,
+            version=version,
+            embeddings=local_caching.load_embeddings(embedding_id, mmap=True),
+            records=local_caching.open_records(embedding_id),
+            metadata=(
+                local_caching.load_metadata(embedding_id)
+                if local_caching.is_cached(embedding_id)
+                else None
+            ),
+        )
+        span.add(rows=len(handle.records), cache_misses=1)
+
+        with _lock:
+            stale = _corpora.get(embedding_id)
+            _corpora[embedding_id] = handle
+            _corpora.move_to_end(embedding_id)
+            _evict_over_budget()
+        if stale is not None and stale is not handle:
+            stale.close()
+        return handle
+
+
+def invalidate(embedding_id: str) -> None:
+    with _lock:
+        handle = _corpora.pop(embedding_id, None)
+    if handle is not None:
+        handle.close()
+
+
+def clear() -> None:
+    with _lock:
+        handles = list(_corpora.values())
+        _corpora.clear()
+    for handle in handles:
+        handle.close()
+
+
+def get_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return {
+            **_stats,
+            "resident": len(_corpora),
+            "resident_bytes": sum(h.nbytes for h in _corpora.values()),
+            "budget_bytes": _memory_budget_bytes,
+        }
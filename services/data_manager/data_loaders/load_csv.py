@@ -1,5 +1,5 @@
 import csv
-from typing import List, Dict, Union
+from typing import List, Dict, Iterator, Union
 from pathlib import Path
 
 
@@ -12,18 +12,39 @@ def list_columns(file_path: Union[str, Path]) -> List[str]:
         return next(reader)
 
 
-def extract_data(
+def count_rows(file_path: Union[str, Path]) -> int:
+    """
+    Estimates the number of data rows from line breaks (multi-line cells overcount).
+    """
+    newlines, last = 0, b"\n"
+    with open(file_path, "rb") as f:
+        while block := f.read(1 << 20):
+            newlines += block.count(b"\n")
+            last = block[-1:]
+    lines = newlines + (last != b"\n")
+    return max(0, lines - 1)
+
+
+def iter_data(
     file_path: Union[str, Path],
     columns: List[str],
-) -> List[Dict[str, Union[str, float]]]:
+) -> Iterator[Dict[str, Union[str, float]]]:
     """
-    Extracts rows using only the specified columns, skipping completely empty rows.
+    Lazily yields rows with only the specified columns, skipping completely empty rows.
     """
     with open(file_path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
-        selected_rows = []
         for row in reader:
             selected_row = {col: row[col] for col in columns if row[col]}
             if selected_row:
-                selected_rows.append(selected_row)
-        return selected_rows
+                yield selected_row
+
+
+def extract_data(
+    file_path: Union[str, Path],
+    columns: List[str],
+) -> List[Dict[str, Union[str, float]]]:
+    """
+    Extracts rows using only the specified columns, skipping completely empty rows.
+    """
+    return list(iter_data(file_path, columns))
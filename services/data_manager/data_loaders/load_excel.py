@@ -1,6 +1,12 @@
-from typing import List, Dict, Union
+from typing import List, Dict, Iterator, Optional, Union
 from pathlib import Path
-from openpyxl import load_workbook
+
+
+def load_workbook(*args, **kwargs):
+    # Deferred: openpyxl adds ~0.1s to start-up and is only needed for Excel files
+    from openpyxl import load_workbook as _load_workbook
+
+    return _load_workbook(*args, **kwargs)
 
 
 def list_sheets(file_path: Union[str, Path]) -> List[str]:
@@ -21,6 +27,46 @@ def list_columns(file_path: Union[str, Path], sheet_name: str) -> List[str]:
     return [col for col in header_row if col is not None]
 
 
+def count_rows(file_path: Union[str, Path], sheet_name: str) -> Optional[int]:
+    """
+    Return the number of data rows recorded in the sheet dimensions, if present.
+    Empty rows inside that range are included, so this is an upper bound.
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        max_row = wb[sheet_name].max_row
+        return max(0, max_row - 1) if max_row is not None else None
+    finally:
+        wb.close()
+
+
+def iter_data(
+    file_path: Union[str, Path],
+    sheet_name: str,
+    columns: List[str],
+) -> Iterator[Dict[str, Union[str, float]]]:
+    """
+    Yield rows from the given sheet one at a time using only the specified columns.
+    Each row is a dictionary; completely empty rows are skipped.
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = wb[sheet_name]
+        header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True))
+        col_idx_map = {name: idx for idx, name in enumerate(header) if name in columns}
+
+        for row in sheet.iter_rows(min_row=2, values_only=True):
+            row_data = {
+                col: row[idx]
+                for col, idx in col_idx_map.items()
+                if idx < len(row) and row[idx] is not None
+            }
+            if any(row_data.values()):
+                yield row_data
+    finally:
+        wb.close()
+
+
 def extract_data(
     file_path: Union[str, Path],
     sheet_name: str,
@@ -30,18 +76,4 @@ def extract_data(
     Extract rows from the given sheet using only the specified columns.
     Returns a list of dictionaries where each dict represents a row.
     """
-    wb = load_workbook(file_path, read_only=True, data_only=True)
-    sheet = wb[sheet_name]
-    header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True))
-    col_idx_map = {name: idx for idx, name in enumerate(header) if name in columns}
-
-    data = []
-    for row in sheet.iter_rows(min_row=2, values_only=True):
-        row_data = {
-            col: row[idx]
-            for col, idx in col_idx_map.items()
-            if idx < len(row) and row[idx] is not None
-        }
-        if any(row_data.values()):
-            data.append(row_data)
-    return data
+    return list(iter_data(file_path, sheet_name, columns))
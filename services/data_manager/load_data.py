@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List, Dict, Union, Optional
+from typing import List, Dict, Iterator, Union, Optional
 from services.data_manager.data_loaders import load_excel, load_csv
 
 
@@ -33,6 +33,19 @@ def list_columns(
         raise UnsupportedFileTypeError(f"Unsupported file type: {file_path}")
 
 
+def count_rows(
+    file_path: Union[str, Path], sheet_name: Optional[str] = None
+) -> Optional[int]:
+    """Cheap estimate of the data row count, used for progress reporting."""
+    ext = _get_extension(file_path)
+    if ext in ("xlsx", "xls"):
+        return load_excel.count_rows(file_path, sheet_name)
+    elif ext == "csv":
+        return load_csv.count_rows(file_path)
+    else:
+        raise UnsupportedFileTypeError(f"Unsupported file type: {file_path}")
+
+
 def extract_data(
     file_path: Union[str, Path], sheet_name: Optional[str], columns: List[str]
 ) -> List[Dict]:
@@ -43,3 +56,16 @@ def extract_data(
         return load_csv.extract_data(file_path, columns)
     else:
         raise UnsupportedFileTypeError(f"Unsupported file type: {file_path}")
+
+
+def iter_data(
+    file_path: Union[str, Path], sheet_name: Optional[str], columns: List[str]
+) -> Iterator[Dict]:
+    """Lazily yield extracted rows instead of materialising the whole file."""
+    ext = _get_extension(file_path)
+    if ext in ("xlsx", "xls"):
+        return load_excel.iter_data(file_path, sheet_name, columns)
+    elif ext == "csv":
+        return load_csv.iter_data(file_path, columns)
+    else:
+        raise UnsupportedFileTypeError(f"Unsupported file type: {file_path}")
@@ -1,20 +1,109 @@
 from pathlib import Path
+from contextlib import contextmanager
+import os
 import json
 import hashlib
 import shutil
+import threading
+import uuid
 import numpy as np
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from models.embeddings_metadata import EmbeddingMetadata
+from services import metrics
+from services.data_manager import cache_catalog, record_store
+from dotenv import load_dotenv
 
+# Load env vars
+load_dotenv()
 
 CACHE_ROOT = Path("cache")
 CACHE_ROOT.mkdir(parents=True, exist_ok=True)
 
+# ? Disk budget of cached corpora; least recently used ones are evicted (0 = unlimited)
+CACHE_BUDGET_MB = float(os.getenv("TEDDY_SEARCH_CACHE_BUDGET_MB", "0"))
 
-def generate_file_hash(file_path: Path) -> str:
-    """Generate MD5 hash of the raw file content."""
-    file_bytes = file_path.read_bytes()
-    return hashlib.md5(file_bytes).hexdigest()
+# Per-corpus lock files and in-progress builds, kept out of the corpus directories
+LOCKS_DIR = ".locks"
+STAGING_DIR = ".staging"
+
+# Columnar record / sentence stores (see record_store.py); JSON files are legacy
+RECORDS_FILE = "records.bin"
+SENTENCES_FILE = "sentences.bin"
+_LEGACY_JSON = {RECORDS_FILE: "records.json", SENTENCES_FILE: "sentences.json"}
+
+
+# ? File hash algorithm; "blake2b" is faster on large files but yields new IDs
+FILE_HASH_ALGORITHM = os.getenv("TEDDY_SEARCH_FILE_HASH", "md5")
+SUPPORTED_FILE_HASHES = ("md5", "blake2b", "sha256")
+
+# ? In-memory view of CACHE_ROOT/file_hashes.json, keyed by cache root
+_file_hash_memos = {}
+_file_hash_memo_lock = threading.Lock()
+
+
+def _file_hash_memo_path() -> Path:
+    return CACHE_ROOT / "file_hashes.json"
+
+
+def _load_file_hash_memo() -> dict:
+    path = _file_hash_memo_path()
+    if path not in _file_hash_memos:
+        try:
+            _file_hash_memos[path] = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            _file_hash_memos[path] = {}
+    return _file_hash_memos[path]
+
+
+def _save_file_hash_memo(memo: dict) -> None:
+    path = _file_hash_memo_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_text(json.dumps(memo, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def generate_file_hash(
+    file_path: Path, algorithm: Optional[str] = None, use_memo: bool = True
+) -> str:
+    """
+    Hash the raw file content, streaming it in chunks.
+
+    A persistent (path, size, mtime, inode) memo lets an unchanged file be
+    recognised with a single stat() instead of a full read.
+    """
+    algorithm = algorithm or FILE_HASH_ALGORITHM
+    if algorithm not in SUPPORTED_FILE_HASHES:
+        raise ValueError(f"Unsupported file hash algorithm: {algorithm}")
+
+    file_path = Path(file_path)
+    with metrics.span("hash") as span:
+        st = file_path.stat()
+        fingerprint = [st.st_size, st.st_mtime_ns, st.st_ino]
+        memo_key = f"{algorithm}:{file_path.resolve()}"
+        with _file_hash_memo_lock:
+            memo = _load_file_hash_memo() if use_memo else {}
+            entry = memo.get(memo_key)
+        if entry and entry["fingerprint"] == fingerprint:
+            span.add(cache_hits=1)
+            return entry["hash"]
+
+        with open(file_path, "rb") as f:
+            file_hash = hashlib.file_digest(f, algorithm).hexdigest()
+        span.add(cache_misses=1)
+
+        if use_memo:
+            with _file_hash_memo_lock:
+                memo = _load_file_hash_memo()
+                memo[memo_key] = {"fingerprint": fingerprint, "hash": file_hash}
+                _save_file_hash_memo(memo)
+        return file_hash
+
+
+def compute_row_hash(record: dict) -> bytes:
+    """MD5 digest of a record's selected values, used to diff file versions."""
+    json_str = json.dumps(record, sort_keys=True, default=str)
+    return hashlib.md5(json_str.encode("utf-8")).digest()
 
 
 def compute_embedding_id(
@@ -22,6 +111,7 @@ def compute_embedding_id(
     columns: List[str],
     model_key: str,
     sheet_name: Optional[str] = None,
+    filter_columns: Optional[List[str]] = None,
 ) -> str:
     """Compute deterministic embedding ID based on config."""
     fingerprint = {
@@ -30,31 +120,247 @@ def compute_embedding_id(
         "model_key": model_key,
         "sheet_name": sheet_name,
     }
+    if filter_columns:
+        # Only added when set, so IDs of corpora without them are unchanged
+        fingerprint["filter_columns"] = filter_columns
     json_str = json.dumps(fingerprint, sort_keys=True)
     return hashlib.md5(json_str.encode("utf-8")).hexdigest()
 
 
+# ? embedding_id → private directory of a build in progress (see staging())
+_staging: Dict[str, Path] = {}
+
+
 def get_cache_dir(embedding_id: str) -> Path:
-    return CACHE_ROOT / embedding_id
+    staged = _staging.get(embedding_id)
+    return staged if staged is not None else CACHE_ROOT / embedding_id
+
+
+def _lock_file(f, blocking: bool = True) -> bool:
+    """Lock f exclusively; without blocking, return False if it is held."""
+    if os.name == "nt":
+        import msvcrt
+
+        while True:
+            try:
+                # Blocks ~10 s, then raises; keep waiting on long builds
+                msvcrt.locking(
+                    f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1
+                )
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+    else:
+        import fcntl
+
+        try:
+            fcntl.flock(
+                f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            )
+        except BlockingIOError:
+            return False
+        return True
+
+
+def _unlock_file(f) -> None:
+    if os.name == "nt":
+        import msvcrt
+
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def corpus_lock(embedding_id: str, blocking: bool = True) -> Iterator[bool]:
+    """
+    Exclusive, inter-process lock on one corpus, for builds and updates.
+
+    Also excludes other threads of the same process: each holder opens the
+    lock file separately, and both flock and msvcrt locks conflict across
+    separately opened files.
+
+    Yields whether the lock was taken: with blocking=False, a lock held
+    elsewhere yields False at once and the block runs unlocked.
+    """
+    path = CACHE_ROOT / LOCKS_DIR / f"{embedding_id}.lock"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if blocking:
+            with metrics.span("lock-wait"):
+                acquired = _lock_file(f)
+        else:
+            acquired = _lock_file(f, blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _unlock_file(f)
+
+
+@contextmanager
+def staging(embedding_id: str) -> Iterator[Path]:
+    """
+    Build a corpus in a private directory and publish it with one rename.
+
+    Inside the block, get_cache_dir (hence every save_* and load_*) points
+    at the staging directory and save_metadata does not catalog the corpus.
+    On success the directory replaces CACHE_ROOT/<embedding_id> and is
+    catalogued, so readers never see a partial corpus; on error it is
+    discarded. Callers must hold corpus_lock(embedding_id).
+    """
+    root = CACHE_ROOT / STAGING_DIR
+    for stale in root.glob(f"{embedding_id}-*"):
+        shutil.rmtree(stale, ignore_errors=True)  # left by a crashed build
+    staged = root / f"{embedding_id}-{uuid.uuid4().hex}"
+    staged.mkdir(parents=True)
+    _staging[embedding_id] = staged
+    try:
+        yield staged
+    except BaseException:
+        shutil.rmtree(staged, ignore_errors=True)
+        raise
+    finally:
+        del _staging[embedding_id]
+
+    if not (staged / "metadata.json").exists():
+        shutil.rmtree(staged, ignore_errors=True)
+        raise ValueError(f"Staged corpus {embedding_id} has no metadata")
+    final = get_cache_dir(embedding_id)
+    # Anything already there is not catalogued, i.e. an incomplete older build
+    shutil.rmtree(final, ignore_errors=True)
+    os.replace(staged, final)
+    _catalog(load_metadata(embedding_id))
 
 
 def is_cached(embedding_id: str) -> bool:
-    """Check if metadata exists for the embedding."""
-    return (get_cache_dir(embedding_id) / "metadata.json").exists()
+    """
+    Check the catalog for the embedding (see cache_catalog.py).
+
+    A catalogued corpus whose directory was removed by hand is dropped from
+    the catalog and reported as not cached.
+    """
+    if not cache_catalog.contains(CACHE_ROOT, embedding_id):
+        return False
+    if not (Path(CACHE_ROOT) / embedding_id / "metadata.json").is_file():
+        cache_catalog.remove(CACHE_ROOT, embedding_id)
+        return False
+    return True
+
+
+def list_metadata(
+    model_key: Optional[str] = None,
+    file_hash: Optional[str] = None,
+    source_path: Optional[str] = None,
+) -> List[EmbeddingMetadata]:
+    """Metadata of every cached corpus, oldest save first, from the catalog."""
+    return cache_catalog.list_metadata(
+        CACHE_ROOT, model_key=model_key, file_hash=file_hash, source_path=source_path
+    )
+
+
+def list_catalog() -> List[dict]:
+    """Catalog entries (ID, file, model, rows, sizes, access times), LRU first."""
+    return cache_catalog.entries(CACHE_ROOT)
+
+
+def touch(embedding_id: str) -> None:
+    """Record that a corpus was used (throttled)."""
+    cache_catalog.touch(CACHE_ROOT, embedding_id)
+
+
+def rebuild_catalog() -> None:
+    """Re-create the catalog from the cache directories."""
+    cache_catalog.rebuild(CACHE_ROOT)
+
+
+def pin(embedding_id: str, pinned: bool = True) -> None:
+    """Exempt a corpus from eviction (or, with pinned=False, stop exempting it)."""
+    if not is_cached(embedding_id):
+        raise FileNotFoundError(f"No cached corpus: {embedding_id}")
+    cache_catalog.set_pinned(CACHE_ROOT, embedding_id, pinned)
+
+
+def is_pinned(embedding_id: str) -> bool:
+    return (CACHE_ROOT / embedding_id / cache_catalog.PIN_FILE).exists()
+
+
+def _budget_bytes(budget_mb: Optional[float]) -> int:
+    return int((CACHE_BUDGET_MB if budget_mb is None else budget_mb) * 1024 * 1024)
+
+
+def cache_stats(budget_mb: Optional[float] = None) -> dict:
+    """Per-corpus disk usage and what pruning to the budget would reclaim."""
+    budget = _budget_bytes(budget_mb)
+    corpora = list_catalog()
+    plan = cache_catalog.eviction_plan(CACHE_ROOT, budget) if budget > 0 else []
+    evictable = {entry["embedding_id"] for entry in plan}
+    for entry in corpora:
+        entry["evict"] = entry["embedding_id"] in evictable
+    return {
+        "corpora": corpora,
+        "total_bytes": sum(entry["size_bytes"] for entry in corpora),
+        "pinned_bytes": sum(e["size_bytes"] for e in corpora if e["pinned"]),
+        "budget_bytes": budget,
+        "reclaimable_bytes": sum(entry["size_bytes"] for entry in plan),
+    }
+
+
+def prune(
+    budget_mb: Optional[float] = None, keep: Tuple[str, ...] = (), dry_run=False
+) -> List[dict]:
+    """
+    Delete least recently used, unpinned corpora until the cache fits the
+    budget (CACHE_BUDGET_MB by default). Returns the evicted catalog entries.
+
+    Corpora locked by a build or update elsewhere are skipped, not waited for.
+    """
+    budget = _budget_bytes(budget_mb)
+    if budget <= 0:
+        return []
+    plan = cache_catalog.eviction_plan(CACHE_ROOT, budget, keep)
+    if dry_run:
+        return plan
+    evicted = []
+    for entry in plan:
+        with corpus_lock(entry["embedding_id"], blocking=False) as acquired:
+            if acquired:
+                delete_cache(entry["embedding_id"])
+                evicted.append(entry)
+    return evicted
+
+
+def _catalog(metadata: EmbeddingMetadata) -> None:
+    cache_catalog.upsert(CACHE_ROOT, metadata)
+    if CACHE_BUDGET_MB > 0:
+        prune(keep=(metadata.embedding_id,))
 
 
 def save_metadata(metadata: EmbeddingMetadata) -> None:
+    """Write metadata.json last, once the corpus files are in place, and catalog it."""
     cache_dir = get_cache_dir(metadata.embedding_id)
     cache_dir.mkdir(parents=True, exist_ok=True)
-    with open(cache_dir / "metadata.json", "w", encoding="utf-8") as f:
-        f.write(metadata.model_dump_json(indent=2))
+    # Replaced atomically: readers see the old or the new metadata, never a part
+    path = cache_dir / "metadata.json"
+    tmp_path = path.with_name(f"metadata.json.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_text(metadata.model_dump_json(indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+    if metadata.embedding_id not in _staging:
+        _catalog(metadata)  # staged corpora are catalogued once published
 
 
-def save_sentences(embedding_id: str, sentences: List[str]) -> None:
+def _save_store(embedding_id: str, name: str, rows: list, value_encoding: str):
     cache_dir = get_cache_dir(embedding_id)
     cache_dir.mkdir(parents=True, exist_ok=True)
-    with open(cache_dir / "sentences.json", "w", encoding="utf-8") as f:
-        json.dump(sentences, f, indent=2)
+    record_store.write_store(cache_dir / name, rows, value_encoding)
+    (cache_dir / _LEGACY_JSON[name]).unlink(missing_ok=True)
+
+
+def save_sentences(embedding_id: str, sentences: List[str]) -> None:
+    _save_store(embedding_id, SENTENCES_FILE, sentences, "text")
 
 
 def save_embeddings(embedding_id: str, embeddings: np.ndarray) -> None:
@@ -63,11 +369,118 @@ def save_embeddings(embedding_id: str, embeddings: np.ndarray) -> None:
     np.save(cache_dir / "embeddings.npy", embeddings)
 
 
-def save_records(embedding_id: str, records: List[dict]) -> None:
+def save_embedding_codes(
+    embedding_id: str,
+    encoding: str,
+    codes: np.ndarray,
+    scales: Optional[np.ndarray] = None,
+) -> None:
     cache_dir = get_cache_dir(embedding_id)
     cache_dir.mkdir(parents=True, exist_ok=True)
-    with open(cache_dir / "records.json", "w", encoding="utf-8") as f:
-        json.dump(records, f, indent=2)
+    np.save(cache_dir / f"embeddings.{encoding}.npy", codes)
+    if scales is not None:
+        np.save(cache_dir / f"embeddings.{encoding}.scales.npy", scales)
+
+
+def delete_embedding_codes(embedding_id: str, encoding: str) -> None:
+    """Remove the compact copy of an encoding (float32 has none)."""
+    cache_dir = get_cache_dir(embedding_id)
+    (cache_dir / f"embeddings.{encoding}.npy").unlink(missing_ok=True)
+    (cache_dir / f"embeddings.{encoding}.scales.npy").unlink(missing_ok=True)
+
+
+def save_records(embedding_id: str, records: List[dict]) -> None:
+    _save_store(embedding_id, RECORDS_FILE, records, "json")
+
+
+class CorpusWriter:
+    """
+    Streams a new corpus to its cache directory chunk by chunk.
+
+    Records and sentences go to columnar stores block by block and
+    embeddings are appended to a raw file that becomes embeddings.npy on
+    close, so memory stays bounded by the chunk size. Per-row content hashes
+    are kept in row_hashes.npy. Partial files are removed if the build fails.
+    """
+
+    def __init__(self, embedding_id: str):
+        self.cache_dir = get_cache_dir(embedding_id)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.n_rows = 0
+        self.dim = None
+        self.dtype = None
+        self._row_hashes = []
+        self._raw_path = self.cache_dir / "embeddings.npy.part"
+        self._records = record_store.RecordStoreWriter(
+            self.cache_dir / RECORDS_FILE, "json"
+        )
+        self._sentences = record_store.RecordStoreWriter(
+            self.cache_dir / SENTENCES_FILE, "text"
+        )
+        self._raw_f = open(self._raw_path, "wb")
+
+    def __enter__(self) -> "CorpusWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def append(
+        self,
+        records: List[dict],
+        sentences: List[str],
+        embeddings: np.ndarray,
+        row_hashes: Optional[List[bytes]] = None,
+    ) -> None:
+        if not len(records) == len(sentences) == len(embeddings):
+            raise ValueError("Records, sentences and embeddings must align")
+        if not records:
+            return
+        if row_hashes is None:
+            row_hashes = [compute_row_hash(r) for r in records]
+        with metrics.span("save") as span:
+            self._row_hashes.extend(row_hashes)
+            if self.dim is None:
+                self.dim, self.dtype = embeddings.shape[1], embeddings.dtype
+            self._records.append(records)
+            self._sentences.append(sentences)
+            self._raw_f.write(np.ascontiguousarray(embeddings, dtype=self.dtype).data)
+            self.n_rows += len(records)
+            span.add(rows=len(records))
+
+    def close(self) -> None:
+        with metrics.span("save"):
+            self._records.close()
+            self._sentences.close()
+            self._raw_f.close()
+
+            header = {
+                "descr": np.lib.format.dtype_to_descr(
+                    np.dtype(self.dtype or np.float32)
+                ),
+                "fortran_order": False,
+                "shape": (self.n_rows, self.dim or 0),
+            }
+            with open(self.cache_dir / "embeddings.npy", "wb") as out:
+                np.lib.format.write_array_header_1_0(out, header)
+                with open(self._raw_path, "rb") as raw:
+                    shutil.copyfileobj(raw, out)
+            self._raw_path.unlink()
+            np.save(
+                self.cache_dir / "row_hashes.npy",
+                np.frombuffer(b"".join(self._row_hashes), dtype=np.uint8).reshape(
+                    -1, 16
+                ),
+            )
+
+    def abort(self) -> None:
+        self._records.abort()
+        self._sentences.abort()
+        self._raw_f.close()
+        self._raw_path.unlink(missing_ok=True)
 
 
 def load_metadata(embedding_id: str) -> EmbeddingMetadata:
@@ -75,21 +488,83 @@ def load_metadata(embedding_id: str) -> EmbeddingMetadata:
     return EmbeddingMetadata.model_validate_json(path.read_text())
 
 
+def migrate_legacy_stores(embedding_id: str) -> None:
+    """Convert records.json / sentences.json of older caches to columnar stores."""
+    cache_dir = get_cache_dir(embedding_id)
+    for name, legacy_name in _LEGACY_JSON.items():
+        legacy = cache_dir / legacy_name
+        if (cache_dir / name).exists() or not legacy.exists():
+            continue
+        with open(legacy, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        tmp = cache_dir / f"{name}.{os.getpid()}.tmp"
+        record_store.write_store(
+            tmp, rows, "text" if name == SENTENCES_FILE else "json"
+        )
+        os.replace(tmp, cache_dir / name)
+        legacy.unlink(missing_ok=True)
+
+
+def _open_store(embedding_id: str, name: str) -> record_store.RecordStore:
+    path = get_cache_dir(embedding_id) / name
+    if not path.exists():
+        migrate_legacy_stores(embedding_id)
+    return record_store.RecordStore(path)
+
+
+def open_sentences(embedding_id: str) -> record_store.RecordStore:
+    """Lazy sentence store: rows are decoded only when indexed."""
+    return _open_store(embedding_id, SENTENCES_FILE)
+
+
 def load_sentences(embedding_id: str) -> List[str]:
-    with open(
-        get_cache_dir(embedding_id) / "sentences.json", "r", encoding="utf-8"
-    ) as f:
-        return json.load(f)
+    store = open_sentences(embedding_id)
+    try:
+        return list(store)
+    finally:
+        store.close()
+
+
+def load_embeddings(embedding_id: str, mmap: bool = False) -> np.ndarray:
+    """Load corpus embeddings, optionally memory-mapped read-only."""
+    return np.load(
+        get_cache_dir(embedding_id) / "embeddings.npy",
+        mmap_mode="r" if mmap else None,
+    )
+
+
+def load_embedding_codes(
+    embedding_id: str, encoding: str
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    cache_dir = get_cache_dir(embedding_id)
+    scales_path = cache_dir / f"embeddings.{encoding}.scales.npy"
+    codes = np.load(cache_dir / f"embeddings.{encoding}.npy")
+    scales = np.load(scales_path) if scales_path.exists() else None
+    return codes, scales
+
+
+def has_row_hashes(embedding_id: str) -> bool:
+    return (get_cache_dir(embedding_id) / "row_hashes.npy").exists()
+
+
+def load_row_hashes(embedding_id: str) -> np.ndarray:
+    """(n, 16) uint8 array of per-row MD5 digests."""
+    return np.load(get_cache_dir(embedding_id) / "row_hashes.npy")
 
 
-def load_embeddings(embedding_id: str) -> np.ndarray:
-    return np.load(get_cache_dir(embedding_id) / "embeddings.npy")
+def open_records(embedding_id: str) -> record_store.RecordStore:
+    """Lazy record store: only the rows that are indexed get decoded."""
+    return _open_store(embedding_id, RECORDS_FILE)
 
 
 def load_records(embedding_id: str) -> List[dict]:
-    with open(get_cache_dir(embedding_id) / "records.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+    store = open_records(embedding_id)
+    try:
+        return list(store)
+    finally:
+        store.close()
 
 
 def delete_cache(embedding_id: str) -> None:
+    cache_catalog.remove(CACHE_ROOT, embedding_id)
     shutil.rmtree(get_cache_dir(embedding_id), ignore_errors=True)
@@ -0,0 +1,292 @@
+"""
+Columnar binary store for corpus records and sentences.
+
+Rows are grouped into blocks of BLOCK_ROWS. Each block stores one blob per
+column: a uint32 offsets array (block_rows + 1) followed by the encoded
+cells, optionally zlib-compressed. A footer holds the column names and an
+(n_blocks, n_columns, 2) index of blob (offset, length) pairs, so reading
+row i only touches the blobs of block i // BLOCK_ROWS.
+
+File layout:
+    blob* | footer JSON | index (uint64) | trailer (json_len, index_len, MAGIC)
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load env vars
+load_dotenv()
+
+MAGIC = b"TEDDYCS1"
+_TRAILER = struct.Struct("<QQ8s")
+
+# ? Rows per block: a lookup decompresses one block per column, so keep it small
+BLOCK_ROWS = 16
+COMPRESSIONS = ("zlib", "none")
+DEFAULT_COMPRESSION = os.getenv("TEDDY_SEARCH_RECORD_COMPRESSION", "zlib")
+# ? Bytes of decoded blocks kept per open store (small corpora stay fully decoded)
+BLOCK_CACHE_BYTES = 4 * 1024 * 1024
+
+# Cell encodings: "json" keeps value types of records, "text" stores raw strings
+VALUE_ENCODINGS = ("json", "text")
+# Column name used by single-column text stores (sentences)
+TEXT_COLUMN = ""
+
+
+def _encode_cell(value: Any, value_encoding: str) -> bytes:
+    if value_encoding == "text":
+        return value.encode("utf-8")
+    return json.dumps(value).encode("utf-8")
+
+
+class RecordStoreWriter:
+    """Append rows chunk by chunk; blocks are flushed as they fill up."""
+
+    def __init__(
+        self,
+        path: Path,
+        value_encoding: str = "json",
+        compression: Optional[str] = None,
+        block_rows: int = BLOCK_ROWS,
+    ):
+        compression = compression or DEFAULT_COMPRESSION
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unsupported record compression: {compression}")
+        if value_encoding not in VALUE_ENCODINGS:
+            raise ValueError(f"Unsupported value encoding: {value_encoding}")
+        self.path = Path(path)
+        self.value_encoding = value_encoding
+        self.compression = compression
+        self.block_rows = block_rows
+        self.n_rows = 0
+        self.columns: Dict[str, int] = {}
+        self._pending: List[Union[dict, str]] = []
+        self._blocks: List[Dict[int, tuple]] = []
+        self._f = open(self.path, "wb")
+
+    def append(self, rows: List[Union[dict, str]]) -> None:
+        """Add records (dicts) or, for text stores, plain strings."""
+        self._pending.extend(rows)
+        while len(self._pending) >= self.block_rows:
+            self._flush_block(self._pending[: self.block_rows])
+            del self._pending[: self.block_rows]
+
+    def _flush_block(self, rows: List[Union[dict, str]]) -> None:
+        if self.value_encoding == "text":
+            rows = [{TEXT_COLUMN: row} for row in rows]
+        cells: Dict[int, List[bytes]] = {}
+        for i, row in enumerate(rows):
+            for name, value in row.items():
+                col = self.columns.setdefault(name, len(self.columns))
+                cells.setdefault(col, [b""] * len(rows))[i] = _encode_cell(
+                    value, self.value_encoding
+                )
+
+        block = {}
+        for col, values in cells.items():
+            offsets = np.zeros(len(values) + 1, dtype=np.uint32)
+            np.cumsum([len(v) for v in values], out=offsets[1:])
+            blob = offsets.tobytes() + b"".join(values)
+            if self.compression == "zlib":
+                blob = zlib.compress(blob, 1)
+            block[col] = (self._f.tell(), len(blob))
+            self._f.write(blob)
+        self._blocks.append(block)
+        self.n_rows += len(rows)
+
+    def close(self) -> None:
+        if self._pending:
+            self._flush_block(self._pending)
+            self._pending = []
+        index = np.zeros((len(self._blocks), len(self.columns), 2), dtype=np.uint64)
+        for b, block in enumerate(self._blocks):
+            for col, (offset, length) in block.items():
+                index[b, col] = (offset, length)
+        footer = json.dumps(
+            {
+                "columns": list(self.columns),
+                "n_rows": self.n_rows,
+                "block_rows": self.block_rows,
+                "compression": self.compression,
+                "value_encoding": self.value_encoding,
+            }
+        ).encode("utf-8")
+        self._f.write(footer)
+        self._f.write(index.tobytes())
+        self._f.write(_TRAILER.pack(len(footer), index.nbytes, MAGIC))
+        self._f.close()
+
+    def abort(self) -> None:
+        self._f.close()
+        self.path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "RecordStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _decoded_size(block: List[Optional[tuple]]) -> int:
+    return sum(len(column[1]) for column in block if column is not None)
+
+
+class RecordStore(Sequence):
+    """
+    Read-only, memory-mapped view of a store written by RecordStoreWriter.
+
+    Indexing decodes a single row; iterating decodes block by block.
+    Records come back as dicts (absent cells omitted), text rows as str.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._mmap = self._open_map()
+        json_len, index_len, magic = _TRAILER.unpack(self._mmap[-_TRAILER.size :])
+        if magic != MAGIC:
+            raise ValueError(f"Not a record store: {self.path}")
+        index_start = len(self._mmap) - _TRAILER.size - index_len
+        footer = json.loads(self._mmap[index_start - json_len : index_start])
+        self.columns: List[str] = footer["columns"]
+        self.n_rows: int = footer["n_rows"]
+        self.block_rows: int = footer["block_rows"]
+        self.compression: str = footer["compression"]
+        self.value_encoding: str = footer["value_encoding"]
+        n_blocks = -(-self.n_rows // self.block_rows)
+        self._index = np.frombuffer(
+            self._mmap[index_start : index_start + index_len], dtype=np.uint64
+        ).reshape(n_blocks, len(self.columns), 2)
+        self._blocks: "OrderedDict[int, List[Optional[tuple]]]" = OrderedDict()
+        self._block_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held outside the page cache: the index and decoded blocks."""
+        return int(self._index.nbytes) + self._block_bytes
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def _column_blob(self, block: int, col: int) -> Optional[tuple]:
+        offset, length = (int(x) for x in self._index[block, col])
+        if length == 0:
+            return None  # column absent from every row of this block
+        with self._lock:
+            if self._mmap.closed:
+                # Closed while a reader was still using it (an evicted corpus)
+                self._mmap = self._open_map()
+            blob = self._mmap[offset : offset + length]
+        if self.compression == "zlib":
+            blob = zlib.decompress(blob)
+        n = min(self.block_rows, self.n_rows - block * self.block_rows)
+        offsets = np.frombuffer(blob, dtype=np.uint32, count=n + 1)
+        return offsets, blob, offsets.nbytes
+
+    def _block(self, block: int) -> List[Optional[tuple]]:
+        with self._lock:
+            cached = self._blocks.get(block)
+            if cached is not None:
+                self._blocks.move_to_end(block)
+                return cached
+        decoded = [self._column_blob(block, c) for c in range(len(self.columns))]
+        with self._lock:
+            if block not in self._blocks:
+                self._blocks[block] = decoded
+                self._block_bytes += _decoded_size(decoded)
+            while self._block_bytes > BLOCK_CACHE_BYTES and len(self._blocks) > 1:
+                _, evicted = self._blocks.popitem(last=False)
+                self._block_bytes -= _decoded_size(evicted)
+        return decoded
+
+    def _decode_row(self, block: List[Optional[tuple]], i: int):
+        row = {}
+        for name, column in zip(self.columns, block):
+            if column is None:
+                continue
+            offsets, blob, start = column
+            lo, hi = start + int(offsets[i]), start + int(offsets[i + 1])
+            if hi == lo:
+                continue
+            raw = blob[lo:hi].decode("utf-8")
+            row[name] = raw if self.value_encoding == "text" else json.loads(raw)
+        if self.value_encoding == "text":
+            return row.get(TEXT_COLUMN, "")
+        return row
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.n_rows))]
+        index = int(index)
+        if index < 0:
+            index += self.n_rows
+        if not 0 <= index < self.n_rows:
+            raise IndexError("record index out of range")
+        block, i = divmod(index, self.block_rows)
+        return self._decode_row(self._block(block), i)
+
+    def __iter__(self) -> Iterator:
+        # Decode each block once without disturbing the lookup cache
+        for block in range(len(self._index)):
+            decoded = [self._column_blob(block, c) for c in range(len(self.columns))]
+            n = min(self.block_rows, self.n_rows - block * self.block_rows)
+            for i in range(n):
+                yield self._decode_row(decoded, i)
+
+    def iter_column(self, name: str) -> Iterator[Tuple[int, Any]]:
+        """(row, value) for the rows holding the column, decoding only its blobs."""
+        col = self.columns.index(name)
+        for block in range(len(self._index)):
+            column = self._column_blob(block, col)
+            if column is None:
+                continue
+            offsets, blob, start = column
+            first = block * self.block_rows
+            for i in range(len(offsets) - 1):
+                lo, hi = start + int(offsets[i]), start + int(offsets[i + 1])
+                if hi == lo:
+                    continue
+                raw = blob[lo:hi].decode("utf-8")
+                yield first + i, (
+                    raw if self.value_encoding == "text" else json.loads(raw)
+                )
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (RecordStore, list, tuple)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def _open_map(self) -> mmap.mmap:
+        with open(self.path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        """Release the file map and decoded blocks; a later read re-opens the map."""
+        with self._lock:
+            self._mmap.close()
+            self._blocks.clear()
+            self._block_bytes = 0
+
+
+def write_store(
+    path: Path,
+    rows: List[Union[dict, str]],
+    value_encoding: str = "json",
+    compression: Optional[str] = None,
+) -> None:
+    with RecordStoreWriter(path, value_encoding, compression) as writer:
+        writer.append(rows)
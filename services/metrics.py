@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Load env vars
+load_dotenv()
+
+# Pipeline stages instrumented by prepare_corpus / query_corpus
+STAGES = (
+    "load",
+    "hash",
+    "lock-wait",
+    "sentence-build",
+    "embed",
+    "save",
+    "load-corpus",
+    "embed-query",
+    "score",
+    "top-k",
+)
+
+_enabled = os.getenv("TEDDY_SEARCH_METRICS", "0").lower() in ("1", "true", "yes")
+_lock = threading.Lock()
+_totals: Dict[str, Dict[str, float]] = {}
+_callbacks: List[Callable[["Span"], None]] = []
+
+
+class Span:
+    """One timed execution of a pipeline stage."""
+
+    __slots__ = ("name", "start", "wall_seconds", "rows", "cache_hits", "cache_misses")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0.0
+        self.wall_seconds = 0.0
+        self.rows = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add(self, rows: int = 0, cache_hits: int = 0, cache_misses: int = 0) -> None:
+        self.rows += rows
+        self.cache_hits += cache_hits
+        self.cache_misses += cache_misses
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.wall_seconds = time.perf_counter() - self.start
+        _finish(self)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "name": self.name,
+            "wall_seconds": self.wall_seconds,
+            "rows": self.rows,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+
+class _NullSpan:
+    """Stand-in returned while metrics are disabled; every call is a no-op."""
+
+    __slots__ = ()
+
+    def add(self, rows: int = 0, cache_hits: int = 0, cache_misses: int = 0) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def span(name: str):
+    """
+    Context manager timing one stage; call .add() on it to attach counts.
+
+        with metrics.span("embed") as s:
+            ...
+            s.add(rows=len(batch), cache_hits=n_reused)
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name)
+
+
+def record(
+    name: str,
+    wall_seconds: float,
+    rows: int = 0,
+    cache_hits: int = 0,
+    cache_misses: int = 0,
+) -> None:
+    """Report a stage timed by the caller (e.g. accumulated over a loop)."""
+    if not _enabled:
+        return
+    finished = Span(name)
+    finished.wall_seconds = wall_seconds
+    finished.add(rows, cache_hits, cache_misses)
+    _finish(finished)
+
+
+def _finish(finished: Span) -> None:
+    with _lock:
+        totals = _totals.setdefault(
+            finished.name,
+            {
+                "calls": 0,
+                "wall_seconds": 0.0,
+                "max_wall_seconds": 0.0,
+                "rows": 0,
+                "cache_hits": 0,
+                "cache_misses": 0,
+            },
+        )
+        totals["calls"] += 1
+        totals["wall_seconds"] += finished.wall_seconds
+        totals["max_wall_seconds"] = max(
+            totals["max_wall_seconds"], finished.wall_seconds
+        )
+        totals["rows"] += finished.rows
+        totals["cache_hits"] += finished.cache_hits
+        totals["cache_misses"] += finished.cache_misses
+        callbacks = list(_callbacks)
+    for callback in callbacks:
+        callback(finished)
+
+
+def add_callback(callback: Callable[[Span], None]) -> None:
+    """Call callback(span) after every finished span (only while enabled)."""
+    with _lock:
+        _callbacks.append(callback)
+
+
+def remove_callback(callback: Callable[[Span], None]) -> None:
+    with _lock:
+        if callback in _callbacks:
+            _callbacks.remove(callback)
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    """Per-stage totals: calls, wall seconds (sum and max), rows, cache hits/misses."""
+    with _lock:
+        return {name: dict(totals) for name, totals in _totals.items()}
+
+
+def reset() -> None:
+    with _lock:
+        _totals.clear()
+
+
+def to_json(indent: Optional[int] = 2) -> str:
+    return json.dumps(snapshot(), indent=indent)
+
+
+_PROMETHEUS_METRICS = (
+    ("calls", "teddy_search_stage_calls_total", "counter", "Spans finished"),
+    ("wall_seconds", "teddy_search_stage_seconds_total", "counter", "Wall time"),
+    ("max_wall_seconds", "teddy_search_stage_max_seconds", "gauge", "Slowest span"),
+    ("rows", "teddy_search_stage_rows_total", "counter", "Rows processed"),
+    ("cache_hits", "teddy_search_stage_cache_hits_total", "counter", "Cache hits"),
+    ("cache_misses", "teddy_search_stage_cache_misses_total", "counter", "Misses"),
+)
+
+
+def to_prometheus() -> str:
+    """Render the per-stage totals in the Prometheus text exposition format."""
+    totals = snapshot()
+    lines = []
+    for field, metric, metric_type, help_text in _PROMETHEUS_METRICS:
+        lines.append(f"# HELP {metric} {help_text} per pipeline stage.")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for stage, values in sorted(totals.items()):
+            lines.append(f'{metric}{{stage="{stage}"}} {values[field]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,279 @@
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.sbert_engine import numpy_retriever
+
+# Supported approximate index types (persisted as <type>_index.npz)
+INDEX_TYPES = ("ivfpq",)
+
+# ? Lists probed per query: higher → better recall, slower queries
+DEFAULT_NPROBE = 8
+# ? Shortlist size (x top_k) rescored against the full-precision vectors
+DEFAULT_RESCORE_FACTOR = 10
+MAX_TRAIN_SIZE = 100_000
+ENCODE_CHUNK_SIZE = 65536
+
+
+def index_file_name(index_type: str) -> str:
+    return f"{index_type}_index.npz"
+
+
+def _assign(
+    data: np.ndarray, centroids: np.ndarray, chunk_size: int = ENCODE_CHUNK_SIZE
+) -> np.ndarray:
+    """Nearest centroid (L2) for each row, computed in chunks."""
+    half_sq_norms = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start : start + chunk_size]
+        labels[start : start + len(chunk)] = np.argmax(
+            chunk @ centroids.T - half_sq_norms, axis=1
+        )
+    return labels
+
+
+def _kmeans(
+    data: np.ndarray, k: int, n_iter: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Plain Lloyd's k-means; empty clusters are re-seeded from random rows."""
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _assign(data, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, np.newaxis]
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), size=empty.sum())]
+    return centroids
+
+
+def _default_subquantizers(dim: int) -> int:
+    for sub_dim in (8, 4, 2, 1):
+        if dim % sub_dim == 0:
+            return dim // sub_dim
+
+
+class IVFPQIndex:
+    """
+    Inverted-file index with product-quantised residuals (IVFADC).
+
+    Rows are bucketed by a k-means coarse quantiser; each row's residual to
+    its bucket centroid is stored as one byte per sub-vector. A query scans
+    only the nprobe closest buckets and ranks them with lookup tables.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        codebooks: np.ndarray,
+        list_offsets: np.ndarray,
+        list_ids: np.ndarray,
+        codes: np.ndarray,
+    ):
+        self.centroids = centroids  # (n_lists, dim)
+        self.codebooks = codebooks  # (m, ksub, dim / m)
+        self.list_offsets = list_offsets  # (n_lists + 1,)
+        self.list_ids = list_ids  # (n,) row ids grouped by list
+        self.codes = codes  # (n, m) uint8, same order as list_ids
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            a.nbytes
+            for a in (
+                self.centroids,
+                self.codebooks,
+                self.list_offsets,
+                self.list_ids,
+                self.codes,
+            )
+        )
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_subquantizers: Optional[int] = None,
+        n_iter: int = 20,
+        seed: int = 0,
+    ) -> "IVFPQIndex":
+        """Train the quantisers on a sample and encode every row in chunks."""
+        n_rows, dim = embeddings.shape
+        rng = np.random.default_rng(seed)
+        n_lists = n_lists or max(1, int(np.sqrt(n_rows)))
+        n_lists = min(n_lists, n_rows)
+        m = n_subquantizers or _default_subquantizers(dim)
+        if dim % m != 0:
+            raise ValueError(f"Embedding dim {dim} not divisible by {m} sub-vectors")
+        sub_dim = dim // m
+
+        train_size = min(n_rows, max(64 * n_lists, 256 * 40), MAX_TRAIN_SIZE)
+        sample_ids = np.sort(rng.choice(n_rows, size=train_size, replace=False))
+        sample = numpy_retriever.normalize_embeddings(embeddings[sample_ids])
+
+        centroids = _kmeans(sample, n_lists, n_iter, rng)
+        residuals = sample - centroids[_assign(sample, centroids)]
+        ksub = min(256, train_size)
+        codebooks = np.stack(
+            [
+                _kmeans(
+                    residuals[:, j * sub_dim : (j + 1) * sub_dim], ksub, n_iter, rng
+                )
+                for j in range(m)
+            ]
+        )
+
+        labels = np.empty(n_rows, dtype=np.int64)
+        codes = np.empty((n_rows, m), dtype=np.uint8)
+        for start in range(0, n_rows, ENCODE_CHUNK_SIZE):
+            chunk = numpy_retriever.normalize_embeddings(
+                embeddings[start : start + ENCODE_CHUNK_SIZE]
+            )
+            chunk_labels = _assign(chunk, centroids)
+            chunk_residuals = chunk - centroids[chunk_labels]
+            labels[start : start + len(chunk)] = chunk_labels
+            for j in range(m):
+                codes[start : start + len(chunk), j] = _assign(
+                    chunk_residuals[:, j * sub_dim : (j + 1) * sub_dim], codebooks[j]
+                )
+
+        list_ids = np.argsort(labels, kind="stable")
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_lists), out=list_offsets[1:])
+        return cls(centroids, codebooks, list_offsets, list_ids, codes[list_ids])
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        nprobe: int = DEFAULT_NPROBE,
+        corpus_embeddings: Optional[np.ndarray] = None,
+        rescore_factor: int = DEFAULT_RESCORE_FACTOR,
+    ) -> List[Tuple[int, float]]:
+        """
+        Approximate cosine top-k.
+
+        When corpus_embeddings are given, a shortlist of top_k * rescore_factor
+        candidates is rescored exactly against them.
+        """
+        if query_embedding.ndim != 1:
+            raise ValueError("Query embedding must be a 1D array")
+        if nprobe < 1:
+            raise ValueError(f"nprobe must be at least 1, got {nprobe}")
+
+        query = numpy_retriever.normalize_embeddings(query_embedding)
+        n_lists = len(self.centroids)
+        coarse_scores = self.centroids @ query
+        probe = np.argsort(-coarse_scores)[: min(nprobe, n_lists)]
+
+        positions = np.concatenate(
+            [np.arange(self.list_offsets[p], self.list_offsets[p + 1]) for p in probe]
+        )
+        if len(positions) == 0:
+            return []
+
+        m, _, sub_dim = self.codebooks.shape
+        tables = np.einsum(
+            "mks,ms->mk", self.codebooks, query.reshape(m, sub_dim)
+        )  # (m, ksub)
+        list_of_position = np.repeat(
+            probe, np.diff(self.list_offsets)[probe]
+        )  # bucket of each candidate, same order as positions
+        scores = coarse_scores[list_of_position] + tables[
+            np.arange(m), self.codes[positions]
+        ].sum(axis=1)
+        row_ids = self.list_ids[positions]
+
+        if corpus_embeddings is not None:
+            shortlist = min(len(scores), top_k * rescore_factor)
+            keep = np.argpartition(-scores, shortlist - 1)[:shortlist]
+            row_ids = np.sort(row_ids[keep])
+            vectors = numpy_retriever.normalize_embeddings(corpus_embeddings[row_ids])
+            scores = vectors @ query
+
+        order = np.lexsort((row_ids, -scores))[:top_k]
+        return [(int(row_ids[i]), float(scores[i])) for i in order]
+
+    def save(self, path: Path) -> None:
+        np.savez(
+            path,
+            centroids=self.centroids,
+            codebooks=self.codebooks,
+            list_offsets=self.list_offsets,
+            list_ids=self.list_ids,
+            codes=self.codes,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFPQIndex":
+        with np.load(path) as data:
+            return cls(
+                data["centroids"],
+                data["codebooks"],
+                data["list_offsets"],
+                data["list_ids"],
+                data["codes"],
+            )
+
+
+def build_index(index_type: str, embeddings: np.ndarray) -> IVFPQIndex:
+    if index_type == "ivfpq":
+        return IVFPQIndex.build(embeddings)
+    else:
+        raise ValueError(f"Unsupported index type: {index_type}")
+
+
+def load_index(index_type: str, path: Path) -> IVFPQIndex:
+    if index_type == "ivfpq":
+        return IVFPQIndex.load(path)
+    else:
+        raise ValueError(f"Unsupported index type: {index_type}")
+
+
+def recall_report(
+    index: IVFPQIndex,
+    corpus_embeddings: np.ndarray,
+    query_embeddings: np.ndarray,
+    top_k: int = 10,
+    nprobe_values: Sequence[int] = (1, 2, 4, 8, 16, 32),
+    corpus_normalized: bool = False,
+) -> List[Dict[str, float]]:
+    """
+    Compare approximate search against exact search for a set of queries.
+
+    Returns one row per nprobe with recall@k (overlap with the exact top-k)
+    and mean per-query latency of both engines in milliseconds.
+    """
+    start = time.perf_counter()
+    exact = [
+        {idx for idx, _ in matches}
+        for matches in numpy_retriever.get_top_cosine_matches_batch(
+            query_embeddings, corpus_embeddings, top_k, corpus_normalized
+        )
+    ]
+    exact_ms = 1000 * (time.perf_counter() - start) / len(query_embeddings)
+
+    report = []
+    for nprobe in nprobe_values:
+        hits = 0
+        start = time.perf_counter()
+        for query, truth in zip(query_embeddings, exact):
+            found = index.search(query, top_k, nprobe, corpus_embeddings)
+            hits += len(truth.intersection(idx for idx, _ in found))
+        report.append(
+            {
+                "nprobe": nprobe,
+                "recall_at_k": hits / max(1, sum(len(t) for t in exact)),
+                "ann_latency_ms": 1000
+                * (time.perf_counter() - start)
+                / len(query_embeddings),
+                "exact_latency_ms": exact_ms,
+            }
+        )
+    return report
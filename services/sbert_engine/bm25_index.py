@@ -0,0 +1,255 @@
+"""
+BM25 inverted index over corpus sentences.
+
+Dense embeddings match control IDs, CVE numbers and clause references
+("AC-2(4)", "CVE-2021-44228") poorly; this lexical index keeps such
+identifiers whole as tokens, next to their alphanumeric parts.
+
+Persisted as one .npz: the sorted vocabulary, CSR postings (offsets, doc
+ids, term frequencies) and per-document lengths. A query only touches the
+postings of its own terms, never the whole corpus.
+"""
+
+import itertools
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_FILE = "bm25_index.npz"
+
+# BM25 term-frequency saturation and length normalisation
+K1 = 1.2
+B = 0.75
+# Longer tokens (URLs, hashes) are dropped to keep the vocabulary compact
+MAX_TOKEN_LENGTH = 64
+# ? Sentences tokenised per build step; bounds the build's working memory
+BUILD_CHUNK_SIZE = 8192
+# ? Most documents scored when too few contain every query term
+MAX_FALLBACK_CANDIDATES = 2048
+
+_WORD = re.compile(r"[^\W_]+")
+_EDGE_PUNCTUATION = ".,;:!?\"'`[]{}<>"
+
+
+def _strip_identifier(chunk: str) -> str:
+    """Trim punctuation around a whitespace-separated chunk, keeping balanced ()."""
+    while True:
+        stripped = chunk.strip(_EDGE_PUNCTUATION)
+        if stripped.startswith("(") and stripped.count("(") > stripped.count(")"):
+            stripped = stripped[1:]
+        if stripped.endswith(")") and stripped.count(")") > stripped.count("("):
+            stripped = stripped[:-1]
+        if stripped.startswith("(") and stripped.endswith(")"):
+            stripped = stripped[1:-1]
+        if stripped == chunk:
+            return chunk
+        chunk = stripped
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase words, plus identifiers kept whole.
+
+    "Enforce AC-2(4) now" → ["enforce", "ac", "2", "4", "now", "ac-2(4)"]
+    """
+    text = text.lower()
+    tokens = _WORD.findall(text)
+    for chunk in [c for c in text.split() if not c.isalnum()]:
+        chunk = _strip_identifier(chunk)
+        if not chunk.isalnum() and _WORD.search(chunk):
+            tokens.append(chunk)
+    return [token for token in tokens if len(token) <= MAX_TOKEN_LENGTH]
+
+
+class BM25Index:
+    def __init__(
+        self,
+        vocabulary: np.ndarray,
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+    ):
+        self.vocabulary = vocabulary  # (n_terms,) sorted str
+        self.offsets = offsets  # (n_terms + 1,) postings of term t: offsets[t:t+2]
+        self.doc_ids = doc_ids  # ascending within each term
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        n_docs = len(doc_lengths)
+        doc_freqs = np.diff(offsets)
+        self.idf = np.log1p((n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(
+            np.float32
+        )
+        average = doc_lengths.mean() if n_docs else 1.0
+        # Per-document part of the BM25 denominator, computed once
+        self._length_norm = (
+            K1 * (1 - B + B * doc_lengths / max(average, 1e-9))
+        ).astype(np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            int(a.nbytes)
+            for a in (
+                self.vocabulary,
+                self.offsets,
+                self.doc_ids,
+                self.term_freqs,
+                self.doc_lengths,
+                self.idf,
+                self._length_norm,
+            )
+        )
+
+    @classmethod
+    def build(cls, sentences: Iterable[str]) -> "BM25Index":
+        """
+        Index sentences chunk by chunk: each chunk's tokens become compact
+        (term, doc, tf) postings before the next chunk is read.
+        """
+        term_ids = {}
+        terms, docs, tfs, doc_lengths = [], [], [], []
+        sentences = iter(sentences)
+        while chunk := list(itertools.islice(sentences, BUILD_CHUNK_SIZE)):
+            first_doc = len(doc_lengths)
+            tokens = []
+            for sentence in chunk:
+                doc_tokens = tokenize(sentence)
+                doc_lengths.append(len(doc_tokens))
+                tokens.extend(term_ids.setdefault(t, len(term_ids)) for t in doc_tokens)
+            chunk_docs = np.repeat(
+                np.arange(len(chunk), dtype=np.int64), doc_lengths[first_doc:]
+            )
+            # One (term, doc) key per token: unique() sorts by term, then doc
+            keys, counts = np.unique(
+                np.array(tokens, dtype=np.int64) * len(chunk) + chunk_docs,
+                return_counts=True,
+            )
+            terms.append((keys // len(chunk)).astype(np.int32))
+            docs.append((keys % len(chunk) + first_doc).astype(np.uint32))
+            tfs.append(np.minimum(counts, np.iinfo(np.uint16).max).astype(np.uint16))
+
+        vocabulary = np.array(sorted(term_ids), dtype=str)
+        # Renumber terms in vocabulary order so lookups can binary-search
+        rank = np.empty(len(term_ids), dtype=np.int32)
+        rank[[term_ids[t] for t in vocabulary]] = np.arange(len(vocabulary))
+        del term_ids
+        terms = rank[np.concatenate(terms)] if terms else np.empty(0, np.int32)
+        # Chunks hold ascending docs, so a stable sort by term keeps docs sorted
+        order = np.argsort(terms, kind="stable")
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(vocabulary)), out=offsets[1:])
+        return cls(
+            vocabulary,
+            offsets,
+            np.concatenate(docs)[order] if docs else np.empty(0, np.uint32),
+            np.concatenate(tfs)[order] if tfs else np.empty(0, np.uint16),
+            np.array(doc_lengths, dtype=np.float32),
+        )
+
+    def _term_ids(self, query: str) -> np.ndarray:
+        tokens = np.unique(tokenize(query))
+        if len(tokens) == 0 or len(self.vocabulary) == 0:
+            return np.empty(0, dtype=np.int64)
+        pos = np.searchsorted(self.vocabulary, tokens)
+        pos = np.minimum(pos, len(self.vocabulary) - 1)
+        return pos[self.vocabulary[pos] == tokens]
+
+    def _postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, stop = self.offsets[term], self.offsets[term + 1]
+        return self.doc_ids[start:stop], self.term_freqs[start:stop]
+
+    def search(
+        self, query: str, top_k: int = 5, row_mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        BM25 top-k for a query, optionally restricted to rows where row_mask is set.
+
+        Documents containing every query term are scored (postings
+        intersection). If fewer than top_k do, the MAX_FALLBACK_CANDIDATES
+        documents matching the most query idf are scored instead.
+        """
+        terms = self._term_ids(query)
+        if len(terms) == 0 or top_k <= 0:
+            return []
+        postings = sorted(
+            (self._postings(t) + (self.idf[t],) for t in terms),
+            key=lambda p: len(p[0]),
+        )
+
+        # Position of each candidate in every term's postings, found once
+        candidates, positions = postings[0][0], [np.arange(len(postings[0][0]))]
+        if row_mask is not None:
+            positions = [np.flatnonzero(row_mask[candidates])]
+            candidates = candidates[positions[0]]
+        for docs, _, _ in postings[1:]:
+            if len(candidates) < top_k:
+                break
+            pos = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+            hit = docs[pos] == candidates
+            candidates = candidates[hit]
+            positions = [p[hit] for p in positions] + [pos[hit]]
+        if len(candidates) < top_k:
+            candidates = self._fallback_candidates(postings, top_k, row_mask)
+            positions = []
+        if len(candidates) == 0:
+            return []
+
+        scores = np.zeros(len(candidates), dtype=np.float32)
+        norm = self._length_norm[candidates]
+        for i, (docs, freqs, idf) in enumerate(postings):
+            if i < len(positions):
+                tf = freqs[positions[i]].astype(np.float32)  # every candidate has it
+            else:
+                pos = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+                tf = np.where(docs[pos] == candidates, freqs[pos], 0).astype(np.float32)
+            scores += idf * tf * (K1 + 1) / (tf + norm)
+
+        top_k = min(top_k, len(candidates))
+        keep = np.argpartition(-scores, top_k - 1)[:top_k]
+        order = keep[np.lexsort((candidates[keep], -scores[keep]))]
+        return [(int(candidates[i]), float(scores[i])) for i in order]
+
+    def _fallback_candidates(
+        self, postings: list, top_k: int, row_mask: Optional[np.ndarray]
+    ) -> np.ndarray:
+        """Documents with any query term, capped to those matching the most idf."""
+        docs = np.concatenate([d for d, _, _ in postings])
+        weights = np.concatenate([np.full(len(d), idf) for d, _, idf in postings])
+        if row_mask is not None:
+            allowed = row_mask[docs]
+            docs, weights = docs[allowed], weights[allowed]
+        limit = max(top_k, MAX_FALLBACK_CANDIDATES)
+        if len(docs) <= limit:
+            return np.unique(docs)
+        matched_idf = np.bincount(
+            docs, weights=weights, minlength=len(self.doc_lengths)
+        )
+        candidates = np.flatnonzero(matched_idf)
+        if len(candidates) > limit:
+            best = np.argpartition(-matched_idf[candidates], limit - 1)[:limit]
+            candidates = np.sort(candidates[best])
+        return candidates
+
+    def save(self, path: Path) -> None:
+        np.savez(
+            path,
+            vocabulary=self.vocabulary,
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            term_freqs=self.term_freqs,
+            doc_lengths=self.doc_lengths,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with np.load(path) as data:
+            return cls(
+                data["vocabulary"],
+                data["offsets"],
+                data["doc_ids"],
+                data["term_freqs"],
+                data["doc_lengths"],
+            )
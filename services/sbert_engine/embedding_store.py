@@ -0,0 +1,210 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load env vars
+load_dotenv()
+
+# ? Content-addressed sentence embeddings shared by every corpus
+STORE_PATH = Path(
+    os.getenv("TEDDY_SEARCH_SENTENCE_CACHE", "cache/sentence_embeddings.sqlite3")
+)
+MAX_STORE_MB = float(os.getenv("TEDDY_SEARCH_SENTENCE_CACHE_MB", "2048"))
+
+# SQLite caps the number of bound parameters per statement
+_BATCH_SIZE = 500
+
+# A rowid table: vectors are 1.5-3 KB BLOBs, too large for WITHOUT ROWID rows
+_CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS sentence_embeddings (
+        model_key TEXT NOT NULL,
+        text_hash BLOB NOT NULL,
+        vector BLOB NOT NULL,
+        last_access REAL NOT NULL,
+        PRIMARY KEY (model_key, text_hash)
+    )
+"""
+
+_lock = threading.Lock()
+_connections: Dict[Path, sqlite3.Connection] = {}
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _connect() -> sqlite3.Connection:
+    """Open (once per path) the store database and ensure its schema."""
+    path = Path(STORE_PATH)
+    if path not in _connections:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        _migrate_without_rowid(conn)
+        conn.execute(_CREATE_TABLE)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access"
+            " ON sentence_embeddings (last_access)"
+        )
+        # Running total of vector bytes, kept in step by triggers so the
+        # budget check never sums the whole table
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS store_size"
+            " (id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO store_size SELECT 0, COALESCE(SUM(LENGTH(vector)), 0)"
+            " FROM sentence_embeddings"
+        )
+        for name, event, delta in (
+            ("size_insert", "INSERT", "LENGTH(NEW.vector)"),
+            ("size_delete", "DELETE", "-LENGTH(OLD.vector)"),
+            (
+                "size_update",
+                "UPDATE OF vector",
+                "LENGTH(NEW.vector) - LENGTH(OLD.vector)",
+            ),
+        ):
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event}"
+                " ON sentence_embeddings BEGIN"
+                f" UPDATE store_size SET total_bytes = total_bytes + {delta};"
+                " END"
+            )
+        conn.commit()
+        _connections[path] = conn
+    return _connections[path]
+
+
+def _migrate_without_rowid(conn: sqlite3.Connection) -> None:
+    """Stores written before vectors moved to a rowid table (large BLOB rows)."""
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'sentence_embeddings'"
+    ).fetchone()
+    if row is None or "WITHOUT ROWID" not in row[0].upper():
+        return
+    conn.execute("ALTER TABLE sentence_embeddings RENAME TO sentence_embeddings_old")
+    conn.execute("DROP INDEX IF EXISTS idx_last_access")
+    conn.execute(_CREATE_TABLE)
+    conn.execute(
+        "INSERT INTO sentence_embeddings SELECT * FROM sentence_embeddings_old"
+    )
+    conn.execute("DROP TABLE sentence_embeddings_old")
+    conn.commit()
+
+
+def _text_hash(sentence: str) -> bytes:
+    return hashlib.sha1(sentence.encode("utf-8")).digest()
+
+
+def get_many(model_key: str, sentences: List[str]) -> List[Optional[np.ndarray]]:
+    """Look up cached vectors; None marks sentences the model has not seen."""
+    hashes = [_text_hash(s) for s in sentences]
+    found = {}
+    with _lock:
+        conn = _connect()
+        for start in range(0, len(hashes), _BATCH_SIZE):
+            batch = list(set(hashes[start : start + _BATCH_SIZE]))
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                "SELECT text_hash, vector FROM sentence_embeddings"
+                f" WHERE model_key = ? AND text_hash IN ({placeholders})",
+                [model_key, *batch],
+            ).fetchall()
+            found.update(rows)
+        if found:
+            now = time.time()
+            conn.executemany(
+                "UPDATE sentence_embeddings SET last_access = ?"
+                " WHERE model_key = ? AND text_hash = ?",
+                [(now, model_key, h) for h in found],
+            )
+            conn.commit()
+
+        vectors = [
+            np.frombuffer(found[h], dtype=np.float32) if h in found else None
+            for h in hashes
+        ]
+        hits = sum(v is not None for v in vectors)
+        _stats["hits"] += hits
+        _stats["misses"] += len(vectors) - hits
+    return vectors
+
+
+def put_many(model_key: str, sentences: List[str], vectors: np.ndarray) -> None:
+    """Store freshly computed vectors, then evict down to the size budget."""
+    now = time.time()
+    rows = [
+        (model_key, _text_hash(s), np.asarray(v, dtype=np.float32).tobytes(), now)
+        for s, v in zip(sentences, vectors)
+    ]
+    with _lock:
+        conn = _connect()
+        # An upsert, not INSERT OR REPLACE: replace-deletes skip the size triggers
+        conn.executemany(
+            "INSERT INTO sentence_embeddings"
+            " (model_key, text_hash, vector, last_access) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (model_key, text_hash) DO UPDATE SET"
+            " vector = excluded.vector, last_access = excluded.last_access",
+            rows,
+        )
+        _evict_over_budget(conn)
+
+
+def _evict_over_budget(conn: sqlite3.Connection) -> None:
+    """Drop least-recently-used vectors until the store fits MAX_STORE_MB."""
+    budget = int(MAX_STORE_MB * 1024 * 1024)
+    (total,) = conn.execute("SELECT total_bytes FROM store_size").fetchone()
+    while total > budget:
+        oldest = conn.execute(
+            "SELECT model_key, text_hash, LENGTH(vector) FROM sentence_embeddings"
+            " ORDER BY last_access LIMIT ?",
+            (_BATCH_SIZE,),
+        ).fetchall()
+        if not oldest:
+            break
+        victims = []
+        for model_key, text_hash, nbytes in oldest:
+            victims.append((model_key, text_hash))
+            total -= nbytes
+            if total <= budget:
+                break
+        conn.executemany(
+            "DELETE FROM sentence_embeddings WHERE model_key = ? AND text_hash = ?",
+            victims,
+        )
+        _stats["evictions"] += len(victims)
+    conn.commit()
+
+
+def get_stats() -> Dict[str, float]:
+    """Hit/miss counters for this process plus the current store size."""
+    with _lock:
+        entries, size = (
+            _connect()
+            .execute(
+                "SELECT COUNT(*), (SELECT total_bytes FROM store_size)"
+                " FROM sentence_embeddings"
+            )
+            .fetchone()
+        )
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_rate": _stats["hits"] / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+
+def clear() -> None:
+    with _lock:
+        conn = _connect()
+        conn.execute("DELETE FROM sentence_embeddings")
+        conn.commit()
+        for key in _stats:
+            _stats[key] = 0
@@ -0,0 +1,166 @@
+"""
+Per-column value postings for structured filters ("Owner = X, Status = Active").
+
+For each indexed record column, every distinct value keeps the sorted ids
+of the rows holding it. A filter turns into one boolean row mask — the
+union of the postings of its allowed values, ANDed across columns — so
+retrieval can score only the surviving rows.
+
+Requested filter columns are indexed up to MAX_DISTINCT_VALUES; any other
+column only while it stays under LOW_CARDINALITY_LIMIT, which leaves
+embedded free text (one value per row) out of the index.
+
+Persisted as one .npz with, per column i: value_bytes_i / value_offsets_i
+(sorted values as concatenated UTF-8) and offsets_i / rows_i (CSR
+postings, uint32).
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+INDEX_FILE = "filter_index.npz"
+
+# ? Requested filter columns with more distinct values than this are not indexed
+MAX_DISTINCT_VALUES = 65536
+# ? Other columns are indexed only while they have at most this many values
+LOW_CARDINALITY_LIMIT = 256
+
+FilterValue = Union[Any, Sequence[Any]]
+
+
+def normalize_filters(filters: Dict[str, FilterValue]) -> Dict[str, List[str]]:
+    """{column: value or [values]} → {column: sorted allowed values as text}."""
+    normalized = {}
+    for column, allowed in filters.items():
+        if isinstance(allowed, (list, tuple, set, frozenset)):
+            normalized[column] = sorted({str(v) for v in allowed})
+        else:
+            normalized[column] = [str(allowed)]
+    return normalized
+
+
+def _pack_values(values: List[str]) -> tuple:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(v) for v in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_values(value_bytes: np.ndarray, value_offsets: np.ndarray) -> List[str]:
+    blob = value_bytes.tobytes()
+    return [
+        blob[start:stop].decode("utf-8")
+        for start, stop in zip(value_offsets[:-1], value_offsets[1:])
+    ]
+
+
+def _column_postings(cells: Iterable[Tuple[int, Any]], cap: int) -> Optional[tuple]:
+    """Packed values and CSR postings of one column; None past cap values."""
+    by_value: Dict[str, List[int]] = {}
+    for row, value in cells:
+        by_value.setdefault(str(value), []).append(row)
+        if len(by_value) > cap:
+            return None
+    values = sorted(by_value)
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(by_value[v]) for v in values], out=offsets[1:])
+    rows = (
+        np.concatenate([by_value[v] for v in values]).astype(np.uint32)
+        if values
+        else np.empty(0, dtype=np.uint32)
+    )
+    return _pack_values(values) + (offsets, rows)
+
+
+class FilterIndex:
+    def __init__(self, n_rows: int, columns: Dict[str, tuple]):
+        self.n_rows = n_rows
+        # column → (value_bytes, value_offsets, offsets, rows)
+        self.columns = columns
+        # column → {value: position in the column's postings}
+        self._positions = {
+            column: {
+                value: i for i, value in enumerate(_unpack_values(arrays[0], arrays[1]))
+            }
+            for column, arrays in columns.items()
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(int(a.nbytes) for arrays in self.columns.values() for a in arrays)
+
+    @classmethod
+    def build(
+        cls,
+        records: Sequence[dict],
+        filter_columns: Sequence[str] = (),
+        max_distinct: Optional[int] = None,
+        low_cardinality: Optional[int] = None,
+    ) -> "FilterIndex":
+        """
+        Index records (dicts, or a RecordStore read column by column).
+
+        A column is dropped as soon as it passes its distinct-value cap, so
+        free-text columns cost only their first few blocks.
+        """
+        max_distinct = max_distinct or MAX_DISTINCT_VALUES
+        low_cardinality = low_cardinality or LOW_CARDINALITY_LIMIT
+        if hasattr(records, "iter_column"):
+            names, cells = records.columns, records.iter_column
+        else:
+            names = list(dict.fromkeys(c for record in records for c in record))
+
+            def cells(column):
+                return (
+                    (row, record[column])
+                    for row, record in enumerate(records)
+                    if column in record
+                )
+
+        columns = {}
+        for column in names:
+            cap = max_distinct if column in filter_columns else low_cardinality
+            postings = _column_postings(cells(column), cap)
+            if postings is not None:
+                columns[column] = postings
+        return cls(len(records), columns)
+
+    def mask(self, column: str, allowed: List[str]) -> np.ndarray:
+        """Rows whose column holds one of the allowed values (as text)."""
+        _, _, offsets, rows = self.columns[column]
+        positions = self._positions[column]
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for value in allowed:
+            p = positions.get(value)
+            if p is not None:
+                mask[rows[offsets[p] : offsets[p + 1]]] = True
+        return mask
+
+    def save(self, path: Path) -> None:
+        arrays = {
+            "n_rows": np.array(self.n_rows),
+            "names": np.array(list(self.columns), dtype=str),
+        }
+        for i, (value_bytes, value_offsets, offsets, rows) in enumerate(
+            self.columns.values()
+        ):
+            arrays[f"value_bytes_{i}"] = value_bytes
+            arrays[f"value_offsets_{i}"] = value_offsets
+            arrays[f"offsets_{i}"] = offsets
+            arrays[f"rows_{i}"] = rows
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> "FilterIndex":
+        with np.load(path) as data:
+            columns = {}
+            for i, name in enumerate(data["names"]):
+                if f"values_{i}" in data:
+                    # Indexes written with fixed-width str values
+                    packed = _pack_values(data[f"values_{i}"].tolist())
+                else:
+                    packed = (data[f"value_bytes_{i}"], data[f"value_offsets_{i}"])
+                columns[str(name)] = packed + (data[f"offsets_{i}"], data[f"rows_{i}"])
+            return cls(int(data["n_rows"]), columns)
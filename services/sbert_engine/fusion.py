@@ -0,0 +1,57 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Fusion methods for combining dense and lexical rankings
+FUSIONS = ("rrf", "weighted")
+
+# ? Rank offset of reciprocal rank fusion: larger → flatter weighting of ranks
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[List[Tuple[int, float]]],
+    weights: Sequence[float],
+    k: int = RRF_K,
+) -> List[Tuple[int, float]]:
+    """Sum of weight / (k + rank) over the rankings each document appears in."""
+    fused: Dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, (idx, _) in enumerate(ranking, start=1):
+            fused[idx] = fused.get(idx, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda m: (-m[1], m[0]))
+
+
+def weighted_score_fusion(
+    rankings: Sequence[List[Tuple[int, float]]],
+    weights: Sequence[float],
+) -> List[Tuple[int, float]]:
+    """Weighted sum of min-max normalised scores; absent documents score 0."""
+    fused: Dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        if not ranking:
+            continue
+        scores = np.array([score for _, score in ranking], dtype=np.float64)
+        low, span = scores.min(), np.ptp(scores)
+        for (idx, _), score in zip(ranking, scores):
+            normalized = (score - low) / span if span > 0 else 1.0
+            fused[idx] = fused.get(idx, 0.0) + weight * normalized
+    return sorted(fused.items(), key=lambda m: (-m[1], m[0]))
+
+
+def fuse(
+    method: str,
+    dense: List[Tuple[int, float]],
+    lexical: List[Tuple[int, float]],
+    lexical_weight: float,
+    top_k: int,
+) -> List[Tuple[int, float]]:
+    """Combine a dense and a lexical ranking into one top-k ranking."""
+    weights = (1.0 - lexical_weight, lexical_weight)
+    if method == "rrf":
+        fused = reciprocal_rank_fusion((dense, lexical), weights)
+    elif method == "weighted":
+        fused = weighted_score_fusion((dense, lexical), weights)
+    else:
+        raise ValueError(f"Unsupported fusion method: {method}")
+    return [(idx, float(score)) for idx, score in fused[:top_k]]
@@ -0,0 +1,165 @@
+import time
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+
+from services import metrics
+
+# ? Rows scored per BLAS call; bounds peak memory on very large corpora
+DEFAULT_CHUNK_SIZE = 65536
+# ? Upper bound on (queries x rows) scores held at once when batching queries
+MAX_CHUNK_SCORES = 2**24
+
+
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """Return float32 embeddings scaled to unit L2 norm (zero rows stay zero)."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def select_top_k(
+    indices: np.ndarray, scores: np.ndarray, top_k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the top_k (index, score) pairs per row, ordered by score then index."""
+    if scores.shape[1] > top_k:
+        keep = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        indices = np.take_along_axis(indices, keep, axis=1)
+        scores = np.take_along_axis(scores, keep, axis=1)
+    order = np.lexsort((indices, -scores), axis=-1)
+    return (
+        np.take_along_axis(indices, order, axis=1),
+        np.take_along_axis(scores, order, axis=1),
+    )
+
+
+def top_k_by_chunks(
+    score_chunk: Callable[[int, int], np.ndarray],
+    n_queries: int,
+    n_rows: int,
+    top_k: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Running top-k over corpus rows scored chunk by chunk.
+
+    score_chunk(start, stop) must return (n_queries, stop - start) scores.
+    Returns (indices, scores), each (n_queries, top_k), best first.
+    """
+    chunk_size = max(1, min(chunk_size, MAX_CHUNK_SCORES // max(1, n_queries)))
+    best_indices = np.empty((n_queries, 0), dtype=np.int64)
+    best_scores = np.empty((n_queries, 0), dtype=np.float32)
+
+    timed = metrics.enabled()
+    score_seconds = select_seconds = 0.0
+
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+        if timed:
+            t0 = time.perf_counter()
+        scores = score_chunk(start, stop)
+        if timed:
+            t1 = time.perf_counter()
+        indices = np.broadcast_to(np.arange(start, stop), scores.shape)
+        indices, scores = select_top_k(indices, scores, top_k)
+        best_indices, best_scores = select_top_k(
+            np.concatenate([best_indices, indices], axis=1),
+            np.concatenate([best_scores, scores], axis=1),
+            top_k,
+        )
+        if timed:
+            score_seconds += t1 - t0
+            select_seconds += time.perf_counter() - t1
+
+    if timed:
+        metrics.record("score", score_seconds, rows=n_rows * n_queries)
+        metrics.record("top-k", select_seconds, rows=n_queries)
+    return best_indices, best_scores
+
+
+def get_top_cosine_matches_batch(
+    query_embeddings: np.ndarray,
+    corpus_embeddings: np.ndarray,
+    top_k: int = 5,
+    corpus_normalized: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    row_ids: Optional[np.ndarray] = None,
+) -> List[List[Tuple[int, float]]]:
+    """
+    Exact cosine top-k for many queries using one (q x n) matrix product.
+
+    Args:
+        query_embeddings: (q, dim) — SBERT embeddings of the queries
+        corpus_embeddings: (n, dim) — corpus embeddings, may be memory-mapped
+        top_k: number of top matches to return per query
+        corpus_normalized: skip re-normalising rows already stored at unit length
+        chunk_size: maximum corpus rows scored per matrix product
+        row_ids: sorted corpus rows to score; all rows when None
+
+    Returns:
+        One list of (index, similarity score) per query, sorted by highest score
+    """
+    if query_embeddings.ndim != 2:
+        raise ValueError("Query embeddings must be a 2D array")
+    if corpus_embeddings.ndim != 2:
+        raise ValueError("Corpus embeddings must be a 2D array")
+
+    n_queries = query_embeddings.shape[0]
+    n_rows = corpus_embeddings.shape[0] if row_ids is None else len(row_ids)
+    top_k = min(top_k, n_rows)
+    if top_k <= 0 or n_queries == 0:
+        return [[] for _ in range(n_queries)]
+
+    queries = normalize_embeddings(query_embeddings)
+
+    def score_chunk(start: int, stop: int) -> np.ndarray:
+        rows = slice(start, stop) if row_ids is None else row_ids[start:stop]
+        chunk = np.asarray(corpus_embeddings[rows])
+        if not corpus_normalized:
+            chunk = normalize_embeddings(chunk)
+        return queries @ chunk.T
+
+    best_indices, best_scores = top_k_by_chunks(
+        score_chunk, n_queries, n_rows, top_k, chunk_size
+    )
+    if row_ids is not None:
+        best_indices = np.asarray(row_ids)[best_indices]
+    return [
+        [(int(i), float(s)) for i, s in zip(row_indices, row_scores)]
+        for row_indices, row_scores in zip(best_indices, best_scores)
+    ]
+
+
+def get_top_cosine_matches(
+    query_embedding: np.ndarray,
+    corpus_embeddings: np.ndarray,
+    top_k: int = 5,
+    corpus_normalized: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    row_ids: Optional[np.ndarray] = None,
+) -> List[Tuple[int, float]]:
+    """
+    Exact cosine top-k using a BLAS dot product and argpartition.
+
+    Args:
+        query_embedding: (dim,) — SBERT embedding of the query
+        corpus_embeddings: (n, dim) — corpus embeddings, may be memory-mapped
+        top_k: number of top matches to return
+        corpus_normalized: skip re-normalising rows already stored at unit length
+        chunk_size: rows scored per dot product
+        row_ids: sorted corpus rows to score; all rows when None
+
+    Returns:
+        List of (index, similarity score) sorted by highest score
+    """
+    if query_embedding.ndim != 1:
+        raise ValueError("Query embedding must be a 1D array")
+
+    return get_top_cosine_matches_batch(
+        query_embedding[np.newaxis, :],
+        corpus_embeddings,
+        top_k,
+        corpus_normalized=corpus_normalized,
+        chunk_size=chunk_size,
+        row_ids=row_ids,
+    )[0]
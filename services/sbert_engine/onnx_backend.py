@@ -0,0 +1,127 @@
+"""
+Export models for the ONNX Runtime backends and check they agree with torch.
+
+Exporting needs network access (or a warm Hugging Face cache) plus the
+onnxruntime/optimum extras; loading the exports later does not:
+
+    python -m services.sbert_engine.onnx_backend MiniLM-L6-v2
+    python -m services.sbert_engine.onnx_backend MiniLM-L6-v2 --check
+
+Then select a backend per model key in .env:
+
+    TEDDY_SEARCH_MODEL_BACKENDS=MiniLM-L6-v2=onnx-int8
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from services.sbert_engine import sbert_model_registry
+from services.sbert_engine.sbert_model_registry import SUPPORTED_MODELS
+
+# ? Minimum per-sentence cosine similarity to torch for a backend to pass
+DEFAULT_AGREEMENT_THRESHOLD = 0.99
+# Quantisation config passed to optimum; "avx512_vnni" also runs on AVX2 CPUs
+QUANTIZATION_CONFIG = "avx512_vnni"
+
+CHECK_SENTENCES = [
+    "Enforce password complexity for all user accounts",
+    "Review firewall rules every quarter",
+    "Disable guest login on workstations",
+    "Encrypt backups at rest and in transit",
+    "Log and monitor privileged access",
+    "Patch critical vulnerabilities within 14 days",
+]
+
+
+def export_onnx(model_key: str) -> Path:
+    """Export fp32 and dynamic int8 ONNX files into the model's export dir."""
+    from sentence_transformers import (
+        SentenceTransformer,
+        export_dynamic_quantized_onnx_model,
+    )
+
+    if model_key not in SUPPORTED_MODELS:
+        raise ValueError(f"Unsupported model key: {model_key}")
+    model_dir = sbert_model_registry.get_onnx_model_dir(model_key)
+    model = SentenceTransformer(SUPPORTED_MODELS[model_key], backend="onnx")
+    model.save(str(model_dir))
+    export_dynamic_quantized_onnx_model(
+        model, QUANTIZATION_CONFIG, str(model_dir), file_suffix="qint8"
+    )
+    return model_dir
+
+
+def cosine_agreement(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity between two (n, dim) embedding matrices."""
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    if reference.shape != candidate.shape:
+        raise ValueError(
+            f"Embedding shapes differ: {reference.shape} vs {candidate.shape}"
+        )
+    dots = np.einsum("ij,ij->i", reference, candidate)
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    return dots / np.maximum(norms, 1e-12)
+
+
+def check_agreement(
+    model_key: str,
+    backend: str,
+    sentences: Optional[List[str]] = None,
+    threshold: float = DEFAULT_AGREEMENT_THRESHOLD,
+) -> float:
+    """
+    Embed sentences on torch and on backend; return the lowest row-wise
+    cosine similarity, raising ValueError if it falls below threshold.
+    """
+    from services.sbert_engine import sbert_embedder
+
+    if backend not in sbert_model_registry.BACKENDS:
+        raise ValueError(f"Unsupported inference backend: {backend}")
+    sentences = sentences or CHECK_SENTENCES
+
+    def encode_on(selected: str) -> np.ndarray:
+        model = sbert_embedder.get_model(model_key, backend=selected)
+        return sbert_embedder._encode_with_model(model, sentences)
+
+    agreement = float(cosine_agreement(encode_on("torch"), encode_on(backend)).min())
+    if agreement < threshold:
+        raise ValueError(
+            f"{model_key} on {backend} agrees with torch at {agreement:.4f}, "
+            f"below {threshold}"
+        )
+    return agreement
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("model_keys", nargs="+", choices=list(SUPPORTED_MODELS))
+    parser.add_argument(
+        "--check", action="store_true", help="compare exports with torch"
+    )
+    parser.add_argument("--threshold", type=float, default=DEFAULT_AGREEMENT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for model_key in args.model_keys:
+        print(f"📦 Exported {model_key} to {export_onnx(model_key)}")
+        if not args.check:
+            continue
+        for backend in sbert_model_registry.ONNX_FILES:
+            try:
+                agreement = check_agreement(
+                    model_key, backend, threshold=args.threshold
+                )
+                print(f"✅ {model_key} {backend}: min cosine {agreement:.4f}")
+            except ValueError as e:
+                print(f"❌ {e}")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
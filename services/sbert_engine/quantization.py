@@ -0,0 +1,168 @@
+import numpy as np
+from typing import List, Optional, Tuple
+
+from services.sbert_engine import numpy_retriever
+
+# Supported on-disk encodings for the compact coarse-pass copy of a corpus
+ENCODINGS = ("float32", "float16", "int8", "binary")
+
+# ? Shortlist size (x top_k) rescored against the full-precision vectors;
+# ? coarser codes need a longer shortlist to keep recall
+DEFAULT_RESCORE_FACTORS = {"float32": 1, "float16": 4, "int8": 10, "binary": 50}
+ENCODE_CHUNK_SIZE = 65536
+
+# Popcount of every byte value, for Hamming distance on packed sign codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def encode_embeddings(
+    embeddings: np.ndarray, encoding: str
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Build compact codes for (n, dim) embeddings, reading them in chunks.
+
+    Returns (codes, scales); scales are the per-dimension int8 step sizes and
+    None for the other encodings.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported embedding encoding: {encoding}")
+
+    n_rows, dim = embeddings.shape
+    scales = None
+    if encoding == "float32":
+        return np.asarray(embeddings, dtype=np.float32), None
+    elif encoding == "float16":
+        codes = np.empty((n_rows, dim), dtype=np.float16)
+    elif encoding == "int8":
+        codes = np.empty((n_rows, dim), dtype=np.int8)
+        max_abs = np.zeros(dim, dtype=np.float32)
+        for start in range(0, n_rows, ENCODE_CHUNK_SIZE):
+            chunk = np.abs(embeddings[start : start + ENCODE_CHUNK_SIZE])
+            np.maximum(max_abs, chunk.max(axis=0), out=max_abs)
+        scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+    else:
+        codes = np.empty((n_rows, (dim + 7) // 8), dtype=np.uint8)
+
+    for start in range(0, n_rows, ENCODE_CHUNK_SIZE):
+        chunk = np.asarray(
+            embeddings[start : start + ENCODE_CHUNK_SIZE], dtype=np.float32
+        )
+        stop = start + len(chunk)
+        if encoding == "float16":
+            codes[start:stop] = chunk
+        elif encoding == "int8":
+            codes[start:stop] = np.clip(np.rint(chunk / scales), -127, 127)
+        else:
+            codes[start:stop] = np.packbits(chunk > 0, axis=1)
+    return codes, scales
+
+
+def _coarse_scorer(
+    queries: np.ndarray,
+    codes: np.ndarray,
+    encoding: str,
+    scales: Optional[np.ndarray],
+):
+    """Return score_chunk(start, stop) approximating queries @ corpus.T."""
+    if encoding == "binary":
+        query_bits = np.packbits(queries > 0, axis=1)
+
+        def score_chunk(start: int, stop: int) -> np.ndarray:
+            xor = np.bitwise_xor(query_bits[:, np.newaxis, :], codes[start:stop])
+            return -_POPCOUNT[xor].sum(axis=2, dtype=np.float32)
+
+    else:
+        weights = queries * scales if encoding == "int8" else queries
+
+        def score_chunk(start: int, stop: int) -> np.ndarray:
+            return weights @ codes[start:stop].astype(np.float32).T
+
+    return score_chunk
+
+
+def search_batch(
+    query_embeddings: np.ndarray,
+    codes: np.ndarray,
+    encoding: str,
+    corpus_embeddings: np.ndarray,
+    top_k: int = 5,
+    scales: Optional[np.ndarray] = None,
+    rescore_factor: Optional[int] = None,
+    corpus_normalized: bool = False,
+) -> List[List[Tuple[int, float]]]:
+    """
+    Coarse top-k over compact codes, then exact rescoring of a shortlist.
+
+    Args:
+        query_embeddings: (q, dim) — SBERT embeddings of the queries
+        codes: compact corpus codes from encode_embeddings
+        encoding: one of ENCODINGS
+        corpus_embeddings: (n, dim) — full-precision vectors, usually memory-mapped
+        top_k: number of top matches to return per query
+        scales: per-dimension int8 step sizes
+        rescore_factor: shortlist size as a multiple of top_k (per-encoding default)
+        corpus_normalized: skip re-normalising full-precision rows
+
+    Returns:
+        One list of (index, cosine similarity) per query, sorted by highest score
+    """
+    if query_embeddings.ndim != 2:
+        raise ValueError("Query embeddings must be a 2D array")
+
+    n_queries, n_rows = len(query_embeddings), len(codes)
+    top_k = min(top_k, n_rows)
+    if top_k <= 0 or n_queries == 0:
+        return [[] for _ in range(n_queries)]
+
+    queries = numpy_retriever.normalize_embeddings(query_embeddings)
+    rescore_factor = rescore_factor or DEFAULT_RESCORE_FACTORS[encoding]
+    if encoding == "binary":
+        # XOR of every (query, row) pair is materialised as bytes
+        chunk_size = numpy_retriever.MAX_CHUNK_SCORES // (codes.shape[1] * n_queries)
+    else:
+        chunk_size = numpy_retriever.DEFAULT_CHUNK_SIZE
+    shortlists, _ = numpy_retriever.top_k_by_chunks(
+        _coarse_scorer(queries, codes, encoding, scales),
+        n_queries,
+        n_rows,
+        min(n_rows, top_k * rescore_factor),
+        chunk_size=chunk_size,
+    )
+
+    results = []
+    for query, shortlist in zip(queries, shortlists):
+        rows = np.sort(shortlist)
+        vectors = np.asarray(corpus_embeddings[rows], dtype=np.float32)
+        if not corpus_normalized:
+            vectors = numpy_retriever.normalize_embeddings(vectors)
+        indices, scores = numpy_retriever.select_top_k(
+            rows[np.newaxis, :], (vectors @ query)[np.newaxis, :], top_k
+        )
+        results.append([(int(i), float(s)) for i, s in zip(indices[0], scores[0])])
+    return results
+
+
+def search(
+    query_embedding: np.ndarray,
+    codes: np.ndarray,
+    encoding: str,
+    corpus_embeddings: np.ndarray,
+    top_k: int = 5,
+    scales: Optional[np.ndarray] = None,
+    rescore_factor: Optional[int] = None,
+    corpus_normalized: bool = False,
+) -> List[Tuple[int, float]]:
+    """Single-query form of search_batch."""
+    if query_embedding.ndim != 1:
+        raise ValueError("Query embedding must be a 1D array")
+
+    return search_batch(
+        query_embedding[np.newaxis, :],
+        codes,
+        encoding,
+        corpus_embeddings,
+        top_k,
+        scales=scales,
+        rescore_factor=rescore_factor,
+        corpus_normalized=corpus_normalized,
+    )[0]
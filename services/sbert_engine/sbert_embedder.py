@@ -1,36 +1,369 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+import atexit
+import itertools
+import multiprocessing
+import os
+import threading
+import unicodedata
 import numpy as np
 
+from services import metrics
+from services.sbert_engine import embedding_store
+from services.sbert_engine import sbert_model_registry
 from services.sbert_engine.sbert_model_registry import (
     SUPPORTED_MODELS,
     DEFAULT_MODEL_ID,
 )
 
+if TYPE_CHECKING:
+    # sentence_transformers pulls in torch; it is imported on first model load
+    from sentence_transformers import SentenceTransformer
 
 # ? Model cache (per HuggingFace model path)
 _model_cache = {}
+# Serialises loads so a query waits for an in-flight warm-up instead of
+# loading the same model twice
+_model_lock = threading.Lock()
 
+# ? Process pools for parallel embedding (per model key, workers, threads, setup)
+_pool_cache = {}
 
-def get_model(model_key: str = DEFAULT_MODEL_ID) -> SentenceTransformer:
-    """Load and cache model by friendly key name."""
+# ? Parallel embedding defaults; 1 worker keeps the single-process path
+DEFAULT_EMBED_WORKERS = int(os.getenv("TEDDY_SEARCH_EMBED_WORKERS", "1"))
+DEFAULT_THREADS_PER_WORKER = int(os.getenv("TEDDY_SEARCH_EMBED_THREADS", "0"))
+# ? Below this many sentences a pool costs more than it saves
+PARALLEL_MIN_SENTENCES = 512
+# ? Shards per worker, so workers that finish early pick up more work
+SHARDS_PER_WORKER = 4
+# ? Picklable function run in each worker before its model loads, e.g. to
+# register a stand-in model (see benchmarks/stand_in_model.py)
+WORKER_SETUP: Optional[Callable[[], object]] = None
+
+# ? Padded tokens per forward pass; batch size shrinks as sentences get longer
+TOKEN_BUDGET = int(os.getenv("TEDDY_SEARCH_TOKEN_BUDGET", "16384"))
+MAX_BATCH_SIZE = 256
+
+# ? Query embeddings kept per (model variant, normalised query text)
+QUERY_CACHE_SIZE = int(os.getenv("TEDDY_SEARCH_QUERY_CACHE_SIZE", "1024"))
+_query_cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+_query_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _model_cache_key(model_key: str, backend: Optional[str] = None) -> str:
+    model_name = SUPPORTED_MODELS[model_key]
+    backend = backend or sbert_model_registry.get_backend(model_key)
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def _load_model(model_key: str, backend: str) -> "SentenceTransformer":
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(SUPPORTED_MODELS[model_key])
+
+    # ONNX backends only ever load exported files; nothing is downloaded
+    model_dir = sbert_model_registry.get_onnx_model_dir(model_key)
+    file_name = sbert_model_registry.ONNX_FILES[backend]
+    if not (model_dir / file_name).exists():
+        raise FileNotFoundError(
+            f"No {backend} export for {model_key} at {model_dir / file_name}; "
+            f"run: python -m services.sbert_engine.onnx_backend {model_key}"
+        )
+    return SentenceTransformer(
+        str(model_dir),
+        backend="onnx",
+        local_files_only=True,
+        model_kwargs={"file_name": file_name, "provider": "CPUExecutionProvider"},
+    )
+
+
+def get_model(
+    model_key: str = DEFAULT_MODEL_ID, backend: Optional[str] = None
+) -> "SentenceTransformer":
+    """
+    Load and cache model by friendly key name, on its registered backend
+    unless another one is given.
+    """
     if model_key not in SUPPORTED_MODELS:
         raise ValueError(f"Unsupported model key: {model_key}")
-    model_name = SUPPORTED_MODELS[model_key]
-    if model_name not in _model_cache:
-        _model_cache[model_name] = SentenceTransformer(model_name)
-    return _model_cache[model_name]
+    backend = backend or sbert_model_registry.get_backend(model_key)
+    if backend not in sbert_model_registry.BACKENDS:
+        raise ValueError(f"Unsupported inference backend: {backend}")
+    cache_key = _model_cache_key(model_key, backend)
+    if cache_key not in _model_cache:
+        with _model_lock:
+            if cache_key not in _model_cache:
+                _model_cache[cache_key] = _load_model(model_key, backend)
+    return _model_cache[cache_key]
+
+
+def is_model_loaded(model_key: str = DEFAULT_MODEL_ID) -> bool:
+    return model_key in SUPPORTED_MODELS and _model_cache_key(model_key) in _model_cache
+
+
+def warm_up(
+    model_key: str = DEFAULT_MODEL_ID,
+    on_done: Optional[Callable[[str, Optional[Exception]], None]] = None,
+) -> threading.Thread:
+    """
+    Load a model on a daemon thread so the first query does not pay for it.
+
+    on_done(model_key, error) is called from that thread once loading
+    finishes; error is None on success.
+    """
+
+    def load():
+        try:
+            get_model(model_key)
+        except Exception as ex:
+            if on_done is not None:
+                on_done(model_key, ex)
+            return
+        if on_done is not None:
+            on_done(model_key, None)
+
+    thread = threading.Thread(target=load, name=f"warm-up-{model_key}", daemon=True)
+    thread.start()
+    return thread
+
+
+def _token_lengths(model: "SentenceTransformer", sentences: List[str]) -> np.ndarray:
+    """Token count per sentence after truncation (word count if no tokenizer)."""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        return np.array([len(s.split()) + 2 for s in sentences])
+    input_ids = tokenizer(
+        sentences,
+        add_special_tokens=True,
+        truncation=True,
+        max_length=getattr(model, "max_seq_length", None) or 512,
+    )["input_ids"]
+    return np.array([len(ids) for ids in input_ids])
+
+
+def _token_budget_batches(
+    lengths: np.ndarray, token_budget: int, max_batch_size: int
+) -> List[np.ndarray]:
+    """
+    Group sentence indices by length so each padded batch fits the budget.
+
+    Sentences are sorted by token length, so a batch pads only to its own
+    longest member and short sentences travel in large batches.
+    """
+    order = np.argsort(lengths, kind="stable")
+    batches, start = [], 0
+    for end in range(1, len(order) + 1):
+        is_last = end == len(order)
+        if (
+            is_last
+            or end - start >= max_batch_size
+            or (end - start + 1) * lengths[order[end]] > token_budget
+        ):
+            batches.append(order[start:end])
+            start = end
+    return batches
+
+
+def _encode_with_model(
+    model: "SentenceTransformer", sentences: List[str]
+) -> np.ndarray:
+    """Encode length-bucketed batches and restore the original order."""
+    if len(sentences) <= 1:
+        return model.encode(sentences, convert_to_numpy=True, show_progress_bar=False)
+
+    batches = _token_budget_batches(
+        _token_lengths(model, sentences), TOKEN_BUDGET, MAX_BATCH_SIZE
+    )
+    embeddings = None
+    for batch in batches:
+        vecs = model.encode(
+            [sentences[i] for i in batch],
+            batch_size=len(batch),
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        if embeddings is None:
+            embeddings = np.empty((len(sentences), vecs.shape[1]), dtype=vecs.dtype)
+        embeddings[batch] = vecs
+    return embeddings
+
+
+def _init_worker(
+    model_key: str, threads: int, setup: Optional[Callable[[], object]] = None
+) -> None:
+    """Pool initializer: pin torch threads and load the model once per worker."""
+    import torch
+
+    torch.set_num_threads(threads)
+    if setup is not None:
+        setup()
+    get_model(model_key)
+
+
+def _encode_in_worker(model_key: str, sentences: List[str]) -> np.ndarray:
+    return _encode_with_model(get_model(model_key), sentences)
+
+
+def _get_pool(model_key: str, workers: int, threads: int) -> ProcessPoolExecutor:
+    key = (model_key, workers, threads, WORKER_SETUP)
+    if key not in _pool_cache:
+        _pool_cache[key] = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_key, threads, WORKER_SETUP),
+        )
+    return _pool_cache[key]
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    """Stop all embedding worker processes."""
+    while _pool_cache:
+        _, pool = _pool_cache.popitem()
+        pool.shutdown(cancel_futures=True)
+
+
+def _split_shards(sentences: List[str], n_shards: int) -> List[List[str]]:
+    """Contiguous, near-equal shards so results concatenate back in order."""
+    shard_size = -(-len(sentences) // n_shards)
+    return [
+        sentences[start : start + shard_size]
+        for start in range(0, len(sentences), shard_size)
+    ]
+
+
+def _encode(
+    sentences: List[str],
+    model_key: str,
+    workers: Optional[int] = None,
+    threads_per_worker: Optional[int] = None,
+) -> np.ndarray:
+    """Encode in-process, or sharded across a worker pool for large inputs."""
+    workers = workers or DEFAULT_EMBED_WORKERS
+    if workers <= 1 or len(sentences) < PARALLEL_MIN_SENTENCES:
+        return _encode_with_model(get_model(model_key), sentences)
+
+    threads = threads_per_worker or DEFAULT_THREADS_PER_WORKER
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    pool = _get_pool(model_key, workers, threads)
+    shards = _split_shards(sentences, workers * SHARDS_PER_WORKER)
+    return np.concatenate(
+        list(pool.map(_encode_in_worker, itertools.repeat(model_key), shards))
+    )
 
 
 def embed_sentences(
-    sentences: List[str], model_key: str = DEFAULT_MODEL_ID
+    sentences: List[str],
+    model_key: str = DEFAULT_MODEL_ID,
+    use_cache: bool = True,
+    workers: Optional[int] = None,
+    threads_per_worker: Optional[int] = None,
 ) -> np.ndarray:
-    """Embed a list of corpus sentences."""
-    model = get_model(model_key)
-    return model.encode(sentences, convert_to_numpy=True, show_progress_bar=False)
+    """
+    Embed a list of corpus sentences, skipping ones already in the store.
+
+    With workers > 1, large inputs are sharded across a process pool where
+    each worker holds its own model copy using threads_per_worker threads.
+    """
+    if not use_cache or not sentences:
+        return _encode(sentences, model_key, workers, threads_per_worker)
+
+    # Vectors are stored per backend variant so backends never mix
+    variant = sbert_model_registry.model_variant(model_key)
+    cached = embedding_store.get_many(variant, sentences)
+    unseen = list(dict.fromkeys(s for s, v in zip(sentences, cached) if v is None))
+    if unseen:
+        fresh = _encode(unseen, model_key, workers, threads_per_worker)
+        embedding_store.put_many(variant, unseen, fresh)
+        fresh_by_sentence = dict(zip(unseen, fresh))
+        cached = [
+            v if v is not None else fresh_by_sentence[s]
+            for s, v in zip(sentences, cached)
+        ]
+    return np.stack(cached).astype(np.float32, copy=False)
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query: NFKC text with collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+
+def _cached_query_embeddings(
+    queries: List[str], model_key: str
+) -> List[Optional[np.ndarray]]:
+    with _query_cache_lock:
+        vectors = []
+        for query in queries:
+            vector = _query_cache.get((model_key, query))
+            if vector is not None:
+                _query_cache.move_to_end((model_key, query))
+                _query_stats["hits"] += 1
+            else:
+                _query_stats["misses"] += 1
+            vectors.append(vector)
+        return vectors
+
+
+def _store_query_embeddings(
+    queries: List[str], model_key: str, vectors: np.ndarray
+) -> None:
+    with _query_cache_lock:
+        for query, vector in zip(queries, vectors):
+            vector = np.array(vector)
+            vector.flags.writeable = False  # shared by every later hit
+            _query_cache[(model_key, query)] = vector
+            _query_cache.move_to_end((model_key, query))
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+            _query_stats["evictions"] += 1
 
 
 def embed_query(query: str, model_key: str = DEFAULT_MODEL_ID) -> np.ndarray:
-    """Embed a single query string."""
-    model = get_model(model_key)
-    return model.encode([query], convert_to_numpy=True)[0]  # shape: (dim,)
+    """Embed a single query string (served from the query LRU when repeated)."""
+    return embed_queries([query], model_key)[0]  # shape: (dim,)
+
+
+def embed_queries(queries: List[str], model_key: str = DEFAULT_MODEL_ID) -> np.ndarray:
+    """Embed many query strings, encoding only those not in the query LRU."""
+    if not queries:
+        return _encode_with_model(get_model(model_key), queries)
+
+    with metrics.span("embed-query") as span:
+        queries = [normalize_query(q) for q in queries]
+        variant = sbert_model_registry.model_variant(model_key)
+        cached = _cached_query_embeddings(queries, variant)
+        unseen = list(dict.fromkeys(q for q, v in zip(queries, cached) if v is None))
+        span.add(
+            rows=len(queries),
+            cache_hits=len(queries) - len(unseen),
+            cache_misses=len(unseen),
+        )
+        if unseen:
+            fresh = _encode_with_model(get_model(model_key), unseen)
+            _store_query_embeddings(unseen, variant, fresh)
+            fresh_by_query = dict(zip(unseen, fresh))
+            cached = [
+                v if v is not None else fresh_by_query[q]
+                for q, v in zip(queries, cached)
+            ]
+    return np.stack(cached)  # shape: (q, dim)
+
+
+def get_query_cache_stats() -> Dict[str, int]:
+    with _query_cache_lock:
+        return {
+            **_query_stats,
+            "entries": len(_query_cache),
+            "capacity": QUERY_CACHE_SIZE,
+        }
+
+
+def clear_query_cache() -> None:
+    with _query_cache_lock:
+        _query_cache.clear()
+        for key in _query_stats:
+            _query_stats[key] = 0
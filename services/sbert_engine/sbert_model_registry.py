@@ -1,4 +1,6 @@
 import os
+from pathlib import Path
+from typing import Dict
 from dotenv import load_dotenv
 
 # Load env vars
@@ -12,6 +14,52 @@ SUPPORTED_MODELS = {
 
 DEFAULT_MODEL_ID = os.getenv("TEDDY_SEARCH_DEFAULT_MODEL", "MiniLM-L6-v2")
 
+# Inference backends: PyTorch eager, ONNX Runtime fp32, ONNX Runtime dynamic int8
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Exported model file per ONNX backend, relative to the model's export dir
+ONNX_FILES = {"onnx": "onnx/model.onnx", "onnx-int8": "onnx/model_qint8.onnx"}
+
+# ? Where exported ONNX models live (one sub-directory per model key)
+ONNX_MODEL_DIR = Path(os.getenv("TEDDY_SEARCH_ONNX_DIR", "onnx_models"))
+
+
+def _parse_backends(spec: str) -> Dict[str, str]:
+    """Parse "MiniLM-L6-v2=onnx-int8,MPNet-base-v2=torch" into a dict."""
+    backends = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model_key, _, backend = item.partition("=")
+        backends[model_key.strip()] = backend.strip()
+    return backends
+
+
+# ? Backend per model key; keys not listed run on torch
+MODEL_BACKENDS = {key: "torch" for key in SUPPORTED_MODELS} | _parse_backends(
+    os.getenv("TEDDY_SEARCH_MODEL_BACKENDS", "")
+)
+
 
 def list_supported_models():
     return list(SUPPORTED_MODELS.keys())
+
+
+def get_backend(model_key: str) -> str:
+    backend = MODEL_BACKENDS.get(model_key, "torch")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported inference backend for {model_key}: {backend}")
+    return backend
+
+
+def get_onnx_model_dir(model_key: str) -> Path:
+    return ONNX_MODEL_DIR / model_key
+
+
+def model_variant(model_key: str) -> str:
+    """
+    Identity of the vectors a model key produces, for cache keys.
+
+    Torch keeps the bare model key so existing caches stay valid; other
+    backends produce slightly different vectors and are cached apart.
+    """
+    backend = get_backend(model_key)
+    return model_key if backend == "torch" else f"{model_key}@{backend}"
@@ -1,4 +1,3 @@
-from sentence_transformers.util import cos_sim
 import numpy as np
 from typing import List, Tuple
 
@@ -22,6 +21,9 @@ def get_top_cosine_matches(
     if corpus_embeddings.ndim != 2:
         raise ValueError("Corpus embeddings must be a 2D array")
 
+    # Deferred: sentence_transformers imports torch
+    from sentence_transformers.util import cos_sim
+
     scores = cos_sim(query_embedding, corpus_embeddings)[0]
     scores_np = scores.cpu().numpy() if hasattr(scores, "cpu") else scores.numpy()
     top_indices = np.argsort(scores_np)[::-1][:top_k]
@@ -0,0 +1,370 @@
+"""
+Local HTTP search service: models and corpora stay loaded across requests.
+
+Concurrent /query requests are coalesced by a QueryBatcher into
+micro-batches, so N waiting queries cost one encode call and one matrix
+multiply per corpus instead of N.
+
+Run from the repo root:
+    python -m services.search_server --port 8765
+
+Endpoints (JSON in, JSON out):
+    GET  /health                          liveness and loaded state
+    GET  /corpora                         cached corpus metadata
+    GET  /stats                           batching, cache and stage metrics
+    GET  /metrics                         the same, Prometheus text format
+    POST /prepare  {file_path, columns, model_key?, sheet_name?, index_type?, encoding?,
+                    filter_columns?}
+    POST /query    {query, embedding_id, model_key?, top_k?, retriever?, nprobe?,
+                    fusion?, lexical_weight?, filters?}
+    POST /export   /query fields plus {out_path}
+    POST /federated {query, embedding_ids?, top_k?}  one top-k over many corpora
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from services import metrics, semantic_search
+from services.sbert_engine import ann_index, sbert_embedder
+from services.sbert_engine.sbert_model_registry import DEFAULT_MODEL_ID
+
+# Load env vars
+load_dotenv()
+
+DEFAULT_HOST = os.getenv("TEDDY_SEARCH_SERVER_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.getenv("TEDDY_SEARCH_SERVER_PORT", "8765"))
+# ? Queries coalesced into one encode + matmul, and how long the first may wait
+BATCH_MAX_SIZE = int(os.getenv("TEDDY_SEARCH_BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_MS = float(os.getenv("TEDDY_SEARCH_BATCH_MAX_WAIT_MS", "5"))
+
+
+class _PendingQuery:
+    __slots__ = ("query", "embedding_id", "model_key", "top_k", "done", "result")
+
+    def __init__(self, query: str, embedding_id: str, model_key: str, top_k: int):
+        self.query = query
+        self.embedding_id = embedding_id
+        self.model_key = model_key
+        self.top_k = top_k
+        self.done = threading.Event()
+        self.result = None  # list of matches, or the exception raised
+
+
+class QueryBatcher:
+    """
+    Collect queries from many threads and answer them in micro-batches.
+
+    A batch closes once max_batch_size queries are waiting or max_wait_ms
+    after its first query arrived. Queries against the same corpus and
+    model share one query_corpus_batch call.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: "queue.Queue[Optional[_PendingQuery]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {"queries": 0, "batches": 0, "max_queue_depth": 0}
+        self._batch_sizes: Counter = Counter()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        query: str,
+        embedding_id: str,
+        model_key: str = DEFAULT_MODEL_ID,
+        top_k: int = 5,
+    ) -> List[Tuple[dict, float]]:
+        """Block until the batch holding this query has been answered."""
+        pending = _PendingQuery(query, embedding_id, model_key, top_k)
+        self._queue.put(pending)
+        with self._lock:
+            self._stats["max_queue_depth"] = max(
+                self._stats["max_queue_depth"], self._queue.qsize()
+            )
+        pending.done.wait()
+        if isinstance(pending.result, Exception):
+            raise pending.result
+        return pending.result
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._answer(batch)
+            if stopping:
+                return
+
+    def _answer(self, batch: List[_PendingQuery]) -> None:
+        start = time.perf_counter()
+        groups: Dict[Tuple[str, str], List[_PendingQuery]] = {}
+        for pending in batch:
+            groups.setdefault((pending.embedding_id, pending.model_key), []).append(
+                pending
+            )
+        for (embedding_id, model_key), members in groups.items():
+            top_k = max(pending.top_k for pending in members)
+            try:
+                results = semantic_search.query_corpus_batch(
+                    [pending.query for pending in members],
+                    embedding_id,
+                    model_key,
+                    top_k,
+                )
+                for pending, matches in zip(members, results):
+                    pending.result = matches[: pending.top_k]
+            except Exception as e:
+                for pending in members:
+                    pending.result = e
+            for pending in members:
+                pending.done.set()
+
+        with self._lock:
+            self._stats["queries"] += len(batch)
+            self._stats["batches"] += 1
+            self._batch_sizes[len(batch)] += 1
+        metrics.record("query-batch", time.perf_counter() - start, rows=len(batch))
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            batches = self._stats["batches"]
+            return {
+                **self._stats,
+                "queue_depth": self._queue.qsize(),
+                "mean_batch_size": self._stats["queries"] / batches if batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+            }
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+
+def _serialize_matches(matches: List[Tuple[dict, float]]) -> List[Dict]:
+    return [{"record": record, "score": float(score)} for record, score in matches]
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    server: "SearchServer"
+
+    def log_message(self, format, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, payload, status: HTTPStatus = HTTPStatus.OK) -> None:
+        self._send(json.dumps(payload).encode("utf-8"), "application/json", status)
+
+    def _send(self, body: bytes, content_type: str, status: HTTPStatus) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, routes: Dict) -> None:
+        route = routes.get(self.path.split("?")[0])
+        if route is None:
+            self._send_json({"error": f"Not found: {self.path}"}, HTTPStatus.NOT_FOUND)
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else {}
+            self._send_json(route(body))
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json({"error": str(e)}, HTTPStatus.BAD_REQUEST)
+        except FileNotFoundError as e:
+            self._send_json({"error": str(e)}, HTTPStatus.NOT_FOUND)
+        except Exception as e:
+            self._send_json({"error": str(e)}, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            body = self.server.prometheus_text().encode("utf-8")
+            self._send(body, "text/plain; version=0.0.4", HTTPStatus.OK)
+            return
+        self._handle(
+            {
+                "/health": self.server.health,
+                "/corpora": self.server.corpora,
+                "/stats": self.server.stats,
+            }
+        )
+
+    def do_POST(self) -> None:
+        self._handle(
+            {
+                "/prepare": self.server.prepare,
+                "/query": self.server.query,
+                "/export": self.server.export,
+                "/federated": self.server.federated,
+            }
+        )
+
+
+class SearchServer(ThreadingHTTPServer):
+    """HTTP server owning one QueryBatcher; each request runs on its own thread."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        batcher: Optional[QueryBatcher] = None,
+        verbose: bool = False,
+    ):
+        super().__init__(address, SearchRequestHandler)
+        self.batcher = batcher or QueryBatcher()
+        self.verbose = verbose
+
+    def health(self, body: Dict) -> Dict:
+        return {
+            "status": "ok",
+            "default_model": DEFAULT_MODEL_ID,
+            "model_loaded": sbert_embedder.is_model_loaded(DEFAULT_MODEL_ID),
+        }
+
+    def corpora(self, body: Dict) -> List[Dict]:
+        return [
+            meta.model_dump()
+            for meta in semantic_search.list_cached_embedding_metadata()
+        ]
+
+    def stats(self, body: Dict) -> Dict:
+        return {
+            "batching": self.batcher.get_stats(),
+            "caches": semantic_search.get_query_cache_stats(),
+            "stages": metrics.snapshot(),
+        }
+
+    def prometheus_text(self) -> str:
+        batching = self.batcher.get_stats()
+        lines = [
+            "# HELP teddy_search_query_queue_depth Queries waiting for a batch.",
+            "# TYPE teddy_search_query_queue_depth gauge",
+            f"teddy_search_query_queue_depth {batching['queue_depth']}",
+            "# HELP teddy_search_query_batches_total Micro-batches answered.",
+            "# TYPE teddy_search_query_batches_total counter",
+            f"teddy_search_query_batches_total {batching['batches']}",
+            "# HELP teddy_search_query_batched_total Queries answered in batches.",
+            "# TYPE teddy_search_query_batched_total counter",
+            f"teddy_search_query_batched_total {batching['queries']}",
+            "# HELP teddy_search_query_batch_size Queries per micro-batch.",
+            "# TYPE teddy_search_query_batch_size gauge",
+            f"teddy_search_query_batch_size {batching['mean_batch_size']}",
+        ]
+        return "\n".join(lines) + "\n" + metrics.to_prometheus()
+
+    def prepare(self, body: Dict) -> Dict:
+        embedding_id, metadata = semantic_search.prepare_corpus(
+            Path(body["file_path"]),
+            body.get("sheet_name"),
+            body["columns"],
+            body.get("model_key", DEFAULT_MODEL_ID),
+            index_type=body.get("index_type"),
+            encoding=body.get("encoding"),
+            filter_columns=body.get("filter_columns"),
+        )
+        return {"embedding_id": embedding_id, "metadata": metadata.model_dump()}
+
+    def _query(self, body: Dict) -> List[Tuple[dict, float]]:
+        query = body["query"]
+        embedding_id = body["embedding_id"]
+        model_key = body.get("model_key", DEFAULT_MODEL_ID)
+        top_k = int(body.get("top_k", 5))
+        retriever = body.get("retriever", "numpy")
+        fusion_method = body.get("fusion")
+        filters = body.get("filters")
+        if retriever == "numpy" and not fusion_method and not filters:
+            return self.batcher.submit(query, embedding_id, model_key, top_k)
+        # Other retrievers, hybrid and filtered queries are scored one at a time
+        return semantic_search.query_corpus(
+            query,
+            embedding_id,
+            model_key,
+            top_k,
+            retriever,
+            int(body.get("nprobe", ann_index.DEFAULT_NPROBE)),
+            fusion_method,
+            float(body.get("lexical_weight", semantic_search.DEFAULT_LEXICAL_WEIGHT)),
+            filters,
+        )
+
+    def query(self, body: Dict) -> Dict:
+        return {"results": _serialize_matches(self._query(body))}
+
+    def export(self, body: Dict) -> Dict:
+        out_path = Path(body["out_path"])
+        results = self._query(body)
+        semantic_search.export_results(results, out_path)
+        return {"out_path": str(out_path), "count": len(results)}
+
+    def federated(self, body: Dict) -> Dict:
+        matches = semantic_search.query_corpora(
+            body["query"], body.get("embedding_ids"), int(body.get("top_k", 5))
+        )
+        return {
+            "results": [
+                {"record": record, "score": float(score), "source": source}
+                for record, score, source in matches
+            ]
+        }
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.batcher.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch-size", type=int, default=BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=BATCH_MAX_WAIT_MS)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    batcher = QueryBatcher(args.max_batch_size, args.max_wait_ms)
+    server = SearchServer((args.host, args.port), batcher, args.verbose)
+    sbert_embedder.warm_up(DEFAULT_MODEL_ID)
+    print(f"🚀 Teddy Search serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
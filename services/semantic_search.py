@@ -1,22 +1,68 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict
+from typing import (
+    Callable,
+    List,
+    Tuple,
+    Optional,
+    Dict,
+    Sequence,
+    Iterable,
+    Iterator,
+)
 
-from services.data_manager import load_data, local_caching, output_export
-from services.sbert_engine import sbert_embedder, sbert_retriever
+import numpy as np
+
+from services import metrics
+from services.data_manager import load_data, local_caching, output_export, corpus_cache
+from services.sbert_engine import (
+    sbert_embedder,
+    sbert_model_registry,
+    sbert_retriever,
+    numpy_retriever,
+    ann_index,
+    bm25_index,
+    filter_index,
+    fusion,
+    quantization,
+)
 from models.embeddings_metadata import EmbeddingMetadata
+from models.prepare_progress import PrepareProgress
+
+# ? Rows extracted, embedded and written per step of prepare_corpus
+EMBED_CHUNK_SIZE = 2048
+
+# ? Ranked matches kept per (corpus, query, top_k, retriever settings)
+RESULT_CACHE_SIZE = int(os.getenv("TEDDY_SEARCH_RESULT_CACHE_SIZE", "256"))
+_result_cache: "OrderedDict[Tuple, Tuple[Tuple, List[Tuple[int, float]]]]" = (
+    OrderedDict()
+)
+_result_cache_lock = threading.Lock()
+_result_stats = {"hits": 0, "misses": 0, "evictions": 0, "stale": 0}
+
+
+# ? Candidates (x top_k) taken from each engine before hybrid fusion
+FUSION_CANDIDATE_FACTOR = 10
+DEFAULT_LEXICAL_WEIGHT = 0.5
+
+# ? Threads scoring corpora in query_corpora (0 = one per core)
+FEDERATED_WORKERS = int(os.getenv("TEDDY_SEARCH_FEDERATED_WORKERS", "0"))
+
 
+class PrepareCancelled(Exception):
+    """Raised by prepare_corpus when its cancel_event is set mid-run."""
 
-def list_cached_embedding_metadata() -> List[EmbeddingMetadata]:
-    cached = []
-    for cache_dir in local_caching.CACHE_ROOT.iterdir():
-        metadata_path = cache_dir / "metadata.json"
-        if metadata_path.exists():
-            try:
-                meta = local_caching.load_metadata(cache_dir.name)
-                cached.append(meta)
-            except Exception:
-                continue
-    return cached
+
+def list_cached_embedding_metadata(
+    model_key: Optional[str] = None, file_hash: Optional[str] = None
+) -> List[EmbeddingMetadata]:
+    """Cached corpora, oldest save first, looked up in the cache catalog."""
+    return local_caching.list_metadata(model_key=model_key, file_hash=file_hash)
 
 
 def inspect_file(file_path: Path) -> Dict[str, Optional[List[str]]]:
@@ -33,52 +79,743 @@ def inspect_file(file_path: Path) -> Dict[str, Optional[List[str]]]:
         raise ValueError(f"Unsupported file type: {ext}")
 
 
+def _iter_chunks(rows: Iterable[dict], chunk_size: int) -> Iterator[List[dict]]:
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        yield chunk
+
+
+def _build_sentence(record: dict, columns: List[str]) -> str:
+    return " ".join(
+        str(record[col]) for col in columns if col in record and record[col] is not None
+    )
+
+
+def _find_previous_version(
+    source_path: str,
+    sheet_name: Optional[str],
+    columns: List[str],
+    model_key: str,
+    backend: str,
+    filter_columns: List[str],
+    file_hash: str,
+) -> Optional[EmbeddingMetadata]:
+    """
+    Latest cached corpus built from an earlier version of the same source.
+
+    Only corpora of the same selection (filter_columns included) built from
+    different file contents count: the same file prepared with other
+    filter_columns is a separate corpus, not a superseded one.
+    """
+    candidates = [
+        meta
+        for meta in local_caching.list_metadata(
+            model_key=model_key, source_path=source_path
+        )
+        if meta.sheet_name == sheet_name
+        and meta.columns == columns
+        and meta.filter_columns == filter_columns
+        and meta.file_hash != file_hash
+        and meta.backend == backend
+        and meta.normalized
+        and local_caching.has_row_hashes(meta.embedding_id)
+    ]
+    # Listed in save order, so the last one is the latest version
+    return candidates[-1] if candidates else None
+
+
+def _embed_chunk(
+    sentences: List[str],
+    row_hashes: List[bytes],
+    model_key: str,
+    previous_rows: Dict[bytes, int],
+    previous_embeddings: Optional[np.ndarray],
+    workers: Optional[int] = None,
+) -> Tuple[np.ndarray, int]:
+    """Embed a chunk, reusing vectors of rows unchanged since the previous version."""
+    reuse = [previous_rows.get(row_hash) for row_hash in row_hashes]
+    missing = [i for i, idx in enumerate(reuse) if idx is None]
+    if len(missing) == len(sentences):
+        return (
+            numpy_retriever.normalize_embeddings(
+                sbert_embedder.embed_sentences(sentences, model_key, workers=workers)
+            ),
+            0,
+        )
+
+    hits = [i for i, idx in enumerate(reuse) if idx is not None]
+    embeddings = np.empty(
+        (len(sentences), previous_embeddings.shape[1]), dtype=np.float32
+    )
+    embeddings[hits] = previous_embeddings[[reuse[i] for i in hits]]
+    if missing:
+        embeddings[missing] = numpy_retriever.normalize_embeddings(
+            sbert_embedder.embed_sentences(
+                [sentences[i] for i in missing], model_key, workers=workers
+            )
+        )
+    return embeddings, len(hits)
+
+
+def _build_ann_index(embedding_id: str, index_type: str) -> None:
+    embeddings = local_caching.load_embeddings(embedding_id, mmap=True)
+    index = ann_index.build_index(index_type, embeddings)
+    index.save(
+        local_caching.get_cache_dir(embedding_id)
+        / ann_index.index_file_name(index_type)
+    )
+
+
+def _build_embedding_codes(embedding_id: str, encoding: str) -> None:
+    embeddings = local_caching.load_embeddings(embedding_id, mmap=True)
+    codes, scales = quantization.encode_embeddings(embeddings, encoding)
+    local_caching.save_embedding_codes(embedding_id, encoding, codes, scales)
+
+
+def _build_lexical_index(embedding_id: str) -> None:
+    sentences = local_caching.open_sentences(embedding_id)
+    try:
+        index = bm25_index.BM25Index.build(sentences)
+    finally:
+        sentences.close()
+    index.save(local_caching.get_cache_dir(embedding_id) / bm25_index.INDEX_FILE)
+
+
+def _build_filter_index(embedding_id: str, filter_columns: List[str]) -> None:
+    records = local_caching.open_records(embedding_id)
+    try:
+        index = filter_index.FilterIndex.build(records, filter_columns)
+        over_cap = [
+            c for c in filter_columns if c in records.columns and c not in index.columns
+        ]
+    finally:
+        records.close()
+    if over_cap:
+        print(
+            f"⚠️ Filter columns {over_cap} have more than "
+            f"{filter_index.MAX_DISTINCT_VALUES} distinct values and were not indexed"
+        )
+    index.save(local_caching.get_cache_dir(embedding_id) / filter_index.INDEX_FILE)
+
+
+def _add_lexical_index(embedding_id: str) -> corpus_cache.CorpusHandle:
+    """Build the BM25 index of a cached corpus on its first fused query."""
+    with local_caching.corpus_lock(embedding_id):
+        metadata = local_caching.load_metadata(embedding_id)
+        if _add_search_structures(metadata, None, None, lexical_index=True):
+            local_caching.save_metadata(metadata)
+    corpus_cache.invalidate(embedding_id)
+    return corpus_cache.get_corpus(embedding_id)
+
+
+def _add_search_structures(
+    metadata: EmbeddingMetadata,
+    index_type: Optional[str],
+    encoding: Optional[str],
+    lexical_index: bool = False,
+) -> bool:
+    """
+    Build a requested ANN / lexical index or compact encoding missing from a corpus.
+
+    index_type / encoding None keep whatever the corpus already has.
+    """
+    changed = False
+    if not metadata.filter_index:
+        _build_filter_index(metadata.embedding_id, metadata.filter_columns)
+        metadata.filter_index = True
+        changed = True
+    if lexical_index and not metadata.lexical_index:
+        _build_lexical_index(metadata.embedding_id)
+        metadata.lexical_index = True
+        changed = True
+    if index_type and metadata.index_type != index_type:
+        _build_ann_index(metadata.embedding_id, index_type)
+        metadata.index_type = index_type
+        changed = True
+    if encoding is not None and encoding != metadata.embedding_encoding:
+        if encoding != "float32":
+            _build_embedding_codes(metadata.embedding_id, encoding)
+        metadata.embedding_encoding = encoding
+        changed = True
+    return changed
+
+
 def prepare_corpus(
-    file_path: Path, sheet_name: Optional[str], columns: List[str], model_key: str
+    file_path: Path,
+    sheet_name: Optional[str],
+    columns: List[str],
+    model_key: str,
+    index_type: Optional[str] = None,
+    encoding: Optional[str] = None,
+    lexical_index: bool = False,
+    filter_columns: Optional[List[str]] = None,
+    chunk_size: Optional[int] = None,
+    incremental: bool = True,
+    workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[PrepareProgress], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
 ) -> str:
+    """
+    Embed and cache the selected columns of a file; returns (embedding_id, metadata).
+
+    filter_columns are extra columns kept in the records (not embedded) so
+    query_corpus can filter on them.
+
+    lexical_index builds the BM25 index up front; otherwise the first query
+    with a fusion_method builds it.
+
+    Rows are read and embedded chunk_size at a time, EMBED_CHUNK_SIZE per
+    embedding worker by default, so each worker gets a full shard per chunk.
+
+    index_type and encoding default to None: a new corpus gets no ANN index
+    and float32 embeddings, a cached one keeps what it has, and a new version
+    of a changed file gets what the version it replaces had.
+
+    progress_callback receives a PrepareProgress after each chunk is loaded
+    and after it is embedded. Setting cancel_event stops the run between
+    chunks: the partial cache is discarded and PrepareCancelled is raised.
+    """
+    if encoding is not None and encoding not in quantization.ENCODINGS:
+        raise ValueError(f"Unsupported embedding encoding: {encoding}")
+
     file_hash = local_caching.generate_file_hash(file_path)
+    backend = sbert_model_registry.get_backend(model_key)
+    filter_columns = [c for c in filter_columns or [] if c not in columns]
     embedding_id = local_caching.compute_embedding_id(
-        file_hash, columns, model_key, sheet_name
+        file_hash,
+        columns,
+        sbert_model_registry.model_variant(model_key),
+        sheet_name,
+        filter_columns,
     )
 
-    if local_caching.is_cached(embedding_id):
-        print(f"✅ Reusing cached embedding: {embedding_id}")
-        metadata = local_caching.load_metadata(embedding_id)
+    # Single flight: concurrent callers wait here, then reuse the one build
+    with local_caching.corpus_lock(embedding_id):
+        if local_caching.is_cached(embedding_id):
+            print(f"✅ Reusing cached embedding: {embedding_id}")
+            local_caching.touch(embedding_id)
+            metadata = local_caching.load_metadata(embedding_id)
+            old_encoding = metadata.embedding_encoding
+            if _add_search_structures(metadata, index_type, encoding, lexical_index):
+                local_caching.save_metadata(metadata)
+            if metadata.embedding_encoding != old_encoding:
+                # Only once the new metadata is in place: readers go by it
+                local_caching.delete_embedding_codes(embedding_id, old_encoding)
+            return embedding_id, metadata
+
+        source_path = str(Path(file_path).resolve())
+        previous = (
+            _find_previous_version(
+                source_path,
+                sheet_name,
+                columns,
+                model_key,
+                backend,
+                filter_columns,
+                file_hash,
+            )
+            if incremental
+            else None
+        )
+        previous_rows, previous_embeddings = {}, None
+        if previous is not None:
+            # The new version keeps the search structures of the one it replaces
+            index_type = index_type or previous.index_type
+            encoding = encoding or previous.embedding_encoding
+            lexical_index = lexical_index or previous.lexical_index
+            previous_embeddings = local_caching.load_embeddings(
+                previous.embedding_id, mmap=True
+            )
+            previous_rows = {
+                row_hash.tobytes(): idx
+                for idx, row_hash in enumerate(
+                    local_caching.load_row_hashes(previous.embedding_id)
+                )
+            }
+
+        progress = PrepareProgress()
+        started = time.perf_counter()
+
+        def report() -> None:
+            if progress_callback is not None:
+                progress.elapsed_seconds = time.perf_counter() - started
+                progress_callback(progress)
+
+        def check_cancelled() -> None:
+            if cancel_event is not None and cancel_event.is_set():
+                raise PrepareCancelled(f"Preparation of {file_path.name} was cancelled")
+
+        if progress_callback is not None:
+            progress.rows_total = load_data.count_rows(file_path, sheet_name)
+
+        n_reused = 0
+        rows = load_data.iter_data(file_path, sheet_name, columns + filter_columns)
+        if filter_columns:
+            # Rows with only filter values have nothing to embed
+            rows = (r for r in rows if any(c in r for c in columns))
+        if chunk_size is None:
+            n_workers = workers or sbert_embedder.DEFAULT_EMBED_WORKERS
+            chunk_size = EMBED_CHUNK_SIZE * max(1, n_workers)
+        chunks = _iter_chunks(rows, chunk_size)
+        with local_caching.staging(embedding_id):
+            with local_caching.CorpusWriter(embedding_id) as writer:
+                while True:
+                    check_cancelled()
+                    with metrics.span("load") as span:
+                        records = next(chunks, None)
+                        span.add(rows=len(records or ()))
+                    if records is None:
+                        break
+                    progress.rows_loaded += len(records)
+                    report()
+
+                    with metrics.span("sentence-build") as span:
+                        sentences = [_build_sentence(r, columns) for r in records]
+                        # Hash only embedded values: filter values never change vectors
+                        row_hashes = [
+                            local_caching.compute_row_hash(
+                                {c: r[c] for c in columns if c in r}
+                            )
+                            for r in records
+                        ]
+                        span.add(rows=len(records))
+                    with metrics.span("embed") as span:
+                        embeddings, n_hits = _embed_chunk(
+                            sentences,
+                            row_hashes,
+                            model_key,
+                            previous_rows,
+                            previous_embeddings,
+                            workers,
+                        )
+                        span.add(
+                            rows=len(records),
+                            cache_hits=n_hits,
+                            cache_misses=len(records) - n_hits,
+                        )
+                    n_reused += n_hits
+                    writer.append(records, sentences, embeddings, row_hashes)
+
+                    progress.rows_embedded += len(records)
+                    progress.rows_reused = n_reused
+                    report()
+
+            metadata = EmbeddingMetadata(
+                embedding_id=embedding_id,
+                file_hash=file_hash,
+                file_name=file_path.name,
+                model_key=model_key,
+                backend=backend,
+                columns=columns,
+                sheet_name=sheet_name,
+                source_path=source_path,
+                normalized=True,
+                filter_columns=filter_columns,
+            )
+
+            _add_search_structures(metadata, index_type, encoding, lexical_index)
+            local_caching.save_metadata(metadata)
+        progress.rows_total = writer.n_rows
+        report()
+
+        if previous is not None:
+            # The new version supersedes the old one: drop it from the cache,
+            # unless another caller is updating it right now
+            print(
+                f"♻️ Re-embedded {writer.n_rows - n_reused} of {writer.n_rows} "
+                f"rows; replacing cached embedding: {previous.embedding_id}"
+            )
+            del previous_embeddings
+            if local_caching.is_pinned(previous.embedding_id):
+                local_caching.pin(embedding_id)  # the pin follows the source file
+            with local_caching.corpus_lock(
+                previous.embedding_id, blocking=False
+            ) as acquired:
+                if acquired:
+                    corpus_cache.invalidate(previous.embedding_id)
+                    local_caching.delete_cache(previous.embedding_id)
+
         return embedding_id, metadata
 
-    records = load_data.extract_data(file_path, sheet_name, columns)
-    sentences = [
-        " ".join(str(r[col]) for col in columns if col in r and r[col] is not None)
-        for r in records
-    ]
-    embeddings = sbert_embedder.embed_sentences(sentences, model_key)
-
-    metadata = EmbeddingMetadata(
-        embedding_id=embedding_id,
-        file_hash=file_hash,
-        file_name=file_path.name,
-        model_key=model_key,
-        columns=columns,
-        sheet_name=sheet_name,
-    )
 
-    local_caching.save_embeddings(embedding_id, embeddings)
-    local_caching.save_sentences(embedding_id, sentences)
-    local_caching.save_records(embedding_id, records)
-    local_caching.save_metadata(metadata)
+def _get_top_matches(
+    query_vec,
+    corpus: corpus_cache.CorpusHandle,
+    top_k: int,
+    retriever: str,
+    nprobe: int = ann_index.DEFAULT_NPROBE,
+) -> List[Tuple[int, float]]:
+    if retriever == "numpy" and corpus.codes is not None:
+        return quantization.search(
+            query_vec,
+            corpus.codes,
+            corpus.encoding,
+            corpus.embeddings,
+            top_k,
+            scales=corpus.code_scales,
+            corpus_normalized=corpus.normalized,
+        )
+    elif retriever == "numpy":
+        return numpy_retriever.get_top_cosine_matches(
+            query_vec, corpus.embeddings, top_k, corpus_normalized=corpus.normalized
+        )
+    elif retriever == "sbert":
+        with metrics.span("score") as span:
+            span.add(rows=len(corpus.embeddings))
+            return sbert_retriever.get_top_cosine_matches(
+                query_vec, corpus.embeddings, top_k
+            )
+    elif retriever == "ann":
+        if corpus.ann_index is None:
+            raise ValueError(f"No ANN index built for corpus: {corpus.embedding_id}")
+        with metrics.span("score"):
+            return corpus.ann_index.search(query_vec, top_k, nprobe, corpus.embeddings)
+    else:
+        raise ValueError(f"Unsupported retriever: {retriever}")
+
 
-    return embedding_id, metadata
+def _filter_mask(
+    corpus: corpus_cache.CorpusHandle, filters: Dict[str, filter_index.FilterValue]
+) -> np.ndarray:
+    """
+    Rows matching every column predicate.
+
+    A column the corpus does not have matches no row. Columns left out of
+    the filter index (too many distinct values) are rejected rather than
+    scanned row by row.
+    """
+    mask = np.ones(len(corpus.records), dtype=bool)
+    for column, allowed in filter_index.normalize_filters(filters).items():
+        if column not in corpus.records.columns:
+            return np.zeros(len(corpus.records), dtype=bool)
+        index = corpus.filter_index
+        if index is None or column not in index.columns:
+            if corpus.metadata is not None and column in corpus.metadata.filter_columns:
+                raise ValueError(
+                    f"Filter column {column!r} has more than "
+                    f"{filter_index.MAX_DISTINCT_VALUES} distinct values, "
+                    "so it was not indexed and cannot be filtered on"
+                )
+            filterable = sorted(index.columns) if index is not None else []
+            raise ValueError(
+                f"Column {column!r} is not indexed for filtering; add it to "
+                f"filter_columns when preparing the corpus (filterable: {filterable})"
+            )
+        mask &= index.mask(column, allowed)
+    return mask
 
 
 def query_corpus(
-    query: str, embedding_id: str, model_key: str, top_k: int = 5
+    query: str,
+    embedding_id: str,
+    model_key: str,
+    top_k: int = 5,
+    retriever: str = "numpy",
+    nprobe: int = ann_index.DEFAULT_NPROBE,
+    fusion_method: Optional[str] = None,
+    lexical_weight: float = DEFAULT_LEXICAL_WEIGHT,
+    filters: Optional[Dict[str, filter_index.FilterValue]] = None,
 ) -> List[Tuple[dict, float]]:
-    query_vec = sbert_embedder.embed_query(query, model_key)
-    corpus_vecs = local_caching.load_embeddings(embedding_id)
-    records = local_caching.load_records(embedding_id)
+    """
+    Top-k records for a query, best first.
+
+    With fusion_method ("rrf" or "weighted"), the retriever's ranking is
+    fused with a BM25 ranking of the corpus sentences; lexical_weight sets
+    the lexical share, and the returned scores are fused scores.
+
+    filters ({column: value or [values]}, ANDed across columns) restrict the
+    search to matching rows, which are then scored exactly whatever the
+    retriever; values compare as text.
+    """
+    if fusion_method is not None and fusion_method not in fusion.FUSIONS:
+        raise ValueError(f"Unsupported fusion method: {fusion_method}")
+    corpus = corpus_cache.get_corpus(embedding_id)
+    if fusion_method and corpus.bm25_index is None:
+        corpus = _add_lexical_index(embedding_id)
+    key = (
+        embedding_id,
+        sbert_model_registry.model_variant(model_key),
+        sbert_embedder.normalize_query(query),
+        top_k,
+        retriever,
+        nprobe if retriever == "ann" else None,
+        (fusion_method, lexical_weight) if fusion_method else None,
+        (
+            tuple(
+                (column, tuple(allowed))
+                for column, allowed in sorted(
+                    filter_index.normalize_filters(filters).items()
+                )
+            )
+            if filters
+            else None
+        ),
+    )
+    # Entries remember the corpus version they were ranked against
+    version = (corpus.cache_dir, corpus.version)
+
+    with _result_cache_lock:
+        entry = _result_cache.get(key)
+        if entry is not None and entry[0] == version:
+            _result_cache.move_to_end(key)
+            _result_stats["hits"] += 1
+            matches = entry[1]
+        else:
+            if entry is not None:
+                del _result_cache[key]
+                _result_stats["stale"] += 1
+            _result_stats["misses"] += 1
+            matches = None
+
+    if matches is None:
+        query_vec = sbert_embedder.embed_query(query, model_key)
+        row_mask = _filter_mask(corpus, filters) if filters else None
+        n_candidates = top_k * FUSION_CANDIDATE_FACTOR if fusion_method else top_k
+        if row_mask is None:
+            matches = _get_top_matches(
+                query_vec, corpus, n_candidates, retriever, nprobe
+            )
+        else:
+            # Only surviving rows are scored, so filtering speeds queries up
+            matches = numpy_retriever.get_top_cosine_matches(
+                query_vec,
+                corpus.embeddings,
+                n_candidates,
+                corpus_normalized=corpus.normalized,
+                row_ids=np.flatnonzero(row_mask),
+            )
+        if fusion_method:
+            with metrics.span("score") as span:
+                lexical = corpus.bm25_index.search(query, n_candidates, row_mask)
+                span.add(rows=len(lexical))
+            matches = fusion.fuse(
+                fusion_method, matches, lexical, lexical_weight, top_k
+            )
+        with _result_cache_lock:
+            _result_cache[key] = (version, matches)
+            while len(_result_cache) > RESULT_CACHE_SIZE:
+                _result_cache.popitem(last=False)
+                _result_stats["evictions"] += 1
+    else:
+        # Served from the result cache: scoring was skipped entirely
+        metrics.record("score", 0.0, cache_hits=1)
+
+    return [(corpus.records[idx], score) for idx, score in matches]
+
+
+def get_query_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counters of the query-embedding LRU and the result cache."""
+    with _result_cache_lock:
+        results = {
+            **_result_stats,
+            "entries": len(_result_cache),
+            "capacity": RESULT_CACHE_SIZE,
+        }
+    return {
+        "query_embeddings": sbert_embedder.get_query_cache_stats(),
+        "results": results,
+    }
+
+
+def clear_result_cache() -> None:
+    with _result_cache_lock:
+        _result_cache.clear()
+        for key in _result_stats:
+            _result_stats[key] = 0
+
+
+def query_corpus_batch(
+    queries: List[str], embedding_id: str, model_key: str, top_k: int = 5
+) -> List[List[Tuple[dict, float]]]:
+    """
+    Top-k records for each of several queries, best first.
+
+    The queries share one encode call and one pass over the corpus
+    embeddings, so a batch costs little more than a single query. Results
+    match query_corpus with the default numpy retriever and no fusion or
+    filters.
+    """
+    if not queries:
+        return []
+    query_vecs = sbert_embedder.embed_queries(queries, model_key)
+    corpus = corpus_cache.get_corpus(embedding_id)
+
+    if corpus.codes is not None:
+        batch_matches = quantization.search_batch(
+            query_vecs,
+            corpus.codes,
+            corpus.encoding,
+            corpus.embeddings,
+            top_k,
+            scales=corpus.code_scales,
+            corpus_normalized=corpus.normalized,
+        )
+    else:
+        batch_matches = numpy_retriever.get_top_cosine_matches_batch(
+            query_vecs, corpus.embeddings, top_k, corpus_normalized=corpus.normalized
+        )
+    return [
+        [(corpus.records[idx], score) for idx, score in matches]
+        for matches in batch_matches
+    ]
+
 
-    matches = sbert_retriever.get_top_cosine_matches(query_vec, corpus_vecs, top_k)
-    return [(records[idx], score) for idx, score in matches]
+class _StackedEmbeddings:
+    """
+    Several corpora's embeddings viewed as one (n, dim) matrix.
+
+    Slices are assembled on demand, so the chunked retriever scores every
+    corpus of a model in the same BLAS calls without copying them up front.
+    """
+
+    ndim = 2
+
+    def __init__(self, corpora: List[corpus_cache.CorpusHandle]):
+        self.corpora = corpora
+        self.offsets = np.cumsum([0] + [len(c.embeddings) for c in corpora])
+        self.shape = (int(self.offsets[-1]), corpora[0].embeddings.shape[1])
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, rows: slice) -> np.ndarray:
+        start, stop, _ = rows.indices(self.shape[0])
+        pieces = []
+        for corpus, offset in zip(self.corpora, self.offsets):
+            lo = max(start - offset, 0)
+            hi = min(stop - offset, len(corpus.embeddings))
+            if lo < hi:
+                piece = np.asarray(corpus.embeddings[lo:hi], dtype=np.float32)
+                if not corpus.normalized:
+                    piece = numpy_retriever.normalize_embeddings(piece)
+                pieces.append(piece)
+        return pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+
+    def locate(self, index: int) -> Tuple[int, int]:
+        """(corpus position, row within that corpus) of a stacked row index."""
+        position = int(np.searchsorted(self.offsets, index, side="right")) - 1
+        return position, index - int(self.offsets[position])
+
+
+def _provenance(corpus: corpus_cache.CorpusHandle, row: int) -> Dict:
+    meta = corpus.metadata
+    return {
+        "embedding_id": corpus.embedding_id,
+        "file_name": meta.file_name if meta else None,
+        "sheet_name": meta.sheet_name if meta else None,
+        "row": row,
+    }
+
+
+def query_corpora(
+    query: str,
+    embedding_ids: Optional[List[str]] = None,
+    top_k: int = 5,
+    stacked: bool = True,
+    workers: Optional[int] = None,
+) -> List[Tuple[dict, float, Dict]]:
+    """
+    Federated search: one global top-k over several cached corpora.
+
+    The query is embedded once per model; corpora sharing a model are scored
+    as one stacked matrix (stacked=True) or one by one, and the groups (or
+    corpora) run in parallel threads since BLAS releases the GIL.
+
+    Returns (record, score, provenance) tuples, best first; provenance holds
+    embedding_id, file_name, sheet_name and the row index within the corpus.
+    """
+    metadata = {meta.embedding_id: meta for meta in list_cached_embedding_metadata()}
+    if embedding_ids is None:
+        embedding_ids = sorted(metadata)
+    missing = [eid for eid in embedding_ids if eid not in metadata]
+    if missing:
+        raise ValueError(f"Not cached: {', '.join(missing)}")
+    if not embedding_ids or top_k <= 0:
+        return []
+
+    by_model: Dict[str, List[str]] = {}
+    for eid in embedding_ids:
+        by_model.setdefault(metadata[eid].model_key, []).append(eid)
+    query_vecs = {
+        model_key: sbert_embedder.embed_query(query, model_key)
+        for model_key in by_model
+    }
+
+    def score_stacked(
+        model_key: str,
+    ) -> List[Tuple[float, corpus_cache.CorpusHandle, int]]:
+        corpora = [corpus_cache.get_corpus(eid) for eid in by_model[model_key]]
+        stack = _StackedEmbeddings(corpora)
+        matches = numpy_retriever.get_top_cosine_matches(
+            query_vecs[model_key], stack, top_k, corpus_normalized=True
+        )
+        found = []
+        for idx, score in matches:
+            position, row = stack.locate(idx)
+            found.append((score, corpora[position], row))
+        return found
+
+    def score_one(
+        embedding_id: str,
+    ) -> List[Tuple[float, corpus_cache.CorpusHandle, int]]:
+        corpus = corpus_cache.get_corpus(embedding_id)
+        query_vec = query_vecs[metadata[embedding_id].model_key]
+        return [
+            (score, corpus, row)
+            for row, score in _get_top_matches(query_vec, corpus, top_k, "numpy")
+        ]
+
+    if stacked:
+        tasks, score = list(by_model), score_stacked
+    else:
+        tasks, score = list(embedding_ids), score_one
+    workers = workers or FEDERATED_WORKERS or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        found = [match for matches in pool.map(score, tasks) for match in matches]
+
+    order = {eid: i for i, eid in enumerate(embedding_ids)}
+    found.sort(key=lambda m: (-m[0], order[m[1].embedding_id], m[2]))
+    return [
+        (corpus.records[row], score, _provenance(corpus, row))
+        for score, corpus, row in found[:top_k]
+    ]
+
+
+def ann_recall_report(
+    embedding_id: str,
+    model_key: str,
+    queries: Optional[List[str]] = None,
+    n_samples: int = 100,
+    top_k: int = 10,
+    nprobe_values: Sequence[int] = (1, 2, 4, 8, 16, 32),
+) -> List[Dict[str, float]]:
+    """
+    Recall@k and latency of the ANN index against exact search per nprobe.
+
+    Without explicit queries, a random sample of corpus rows is used.
+    """
+    corpus = corpus_cache.get_corpus(embedding_id)
+    if corpus.ann_index is None:
+        raise ValueError(f"No ANN index built for corpus: {embedding_id}")
+
+    if queries:
+        query_vecs = sbert_embedder.embed_queries(queries, model_key)
+    else:
+        rng = np.random.default_rng(0)
+        n_rows = len(corpus.embeddings)
+        sample_ids = np.sort(
+            rng.choice(n_rows, size=min(n_samples, n_rows), replace=False)
+        )
+        query_vecs = np.asarray(corpus.embeddings[sample_ids])
+
+    return ann_index.recall_report(
+        corpus.ann_index,
+        corpus.embeddings,
+        query_vecs,
+        top_k,
+        nprobe_values,
+        corpus_normalized=corpus.normalized,
+    )
 
 
 def export_results(results: List[Tuple[dict, float]], out_path: Path) -> None:
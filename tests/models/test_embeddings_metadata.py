@@ -42,3 +42,14 @@ def test_invalid_missing_fields():
             model_key="some-model",
             columns=None,  # Invalid: columns must be a list
         )
+
+
+def test_legacy_metadata_defaults():
+    metadata = EmbeddingMetadata.model_validate_json(
+        '{"embedding_id": "old", "file_hash": "deadbeef", "file_name": "a.csv",'
+        ' "model_key": "MiniLM-L6-v2", "columns": ["Name"], "sheet_name": null}'
+    )
+
+    assert metadata.normalized is False
+    assert metadata.index_type is None
+    assert metadata.embedding_encoding == "float32"
@@ -26,3 +26,11 @@ def test_extract_data_csv_full_columns():
     assert len(rows) == 5
     assert rows[-1]["Name"] == "Evan"
     assert rows[-1]["Active"] == "No"
+
+
+def test_iter_data_csv_is_lazy_and_matches_extract():
+    path = Path("tests/test_files/sample.csv")
+    columns = ["Name", "City"]
+    rows = load_csv.iter_data(path, columns)
+    assert not isinstance(rows, list)
+    assert list(rows) == load_csv.extract_data(path, columns)
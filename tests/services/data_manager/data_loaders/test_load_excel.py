@@ -31,3 +31,11 @@ def test_extract_data_excel_full_columns():
     assert len(rows) == 5
     assert rows[-1]["Name"] == "Evan"
     assert rows[-1]["Department"] == "IT"
+
+
+def test_iter_data_excel_is_lazy_and_matches_extract():
+    path = Path("tests/test_files/sample.xlsx")
+    columns = ["Name", "City"]
+    rows = load_excel.iter_data(path, "Sheet1", columns)
+    assert not isinstance(rows, list)
+    assert list(rows) == load_excel.extract_data(path, "Sheet1", columns)
@@ -0,0 +1,134 @@
+import numpy as np
+
+from models.embeddings_metadata import EmbeddingMetadata
+from services.data_manager import cache_admin, cache_catalog, local_caching
+
+
+def _save_corpus(embedding_id, model_key="MiniLM-L6-v2", file_hash="f00d", rows=3):
+    local_caching.save_embeddings(embedding_id, np.ones((rows, 4), dtype=np.float32))
+    metadata = EmbeddingMetadata(
+        embedding_id=embedding_id,
+        file_hash=file_hash,
+        file_name="demo.csv",
+        model_key=model_key,
+        columns=["Name"],
+    )
+    local_caching.save_metadata(metadata)
+    return metadata
+
+
+def test_catalog_tracks_saves_and_deletes(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    first = _save_corpus("first", rows=3)
+    second = _save_corpus("second", model_key="mpnet-base-v2", file_hash="beef", rows=5)
+
+    assert local_caching.is_cached("first")
+    assert local_caching.list_metadata() == [first, second]
+    assert local_caching.list_metadata(model_key="mpnet-base-v2") == [second]
+    assert local_caching.list_metadata(file_hash="f00d") == [first]
+
+    entries = {e["embedding_id"]: e for e in local_caching.list_catalog()}
+    assert entries["second"]["row_count"] == 5
+    assert entries["second"]["columns"] == ["Name"]
+    assert entries["second"]["size_bytes"] > 5 * 4 * 4
+
+    local_caching.delete_cache("first")
+    assert not local_caching.is_cached("first")
+    assert local_caching.list_metadata() == [second]
+
+
+def test_touch_updates_last_access(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    _save_corpus("abc")
+    before = local_caching.list_catalog()[0]["last_access"]
+
+    cache_catalog.touch(tmp_path, "abc", force=True)
+    assert local_caching.list_catalog()[0]["last_access"] >= before
+
+
+def test_missing_catalog_is_rebuilt_from_directories(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    metadata = _save_corpus("abc", rows=7)
+    cache_catalog.close(tmp_path)
+    for path in tmp_path.glob(f"{cache_catalog.CATALOG_FILE}*"):
+        path.unlink()
+
+    assert local_caching.is_cached("abc")
+    assert local_caching.list_metadata(file_hash="f00d") == [metadata]
+    assert local_caching.list_catalog()[0]["row_count"] == 7
+
+
+def _size(embedding_id):
+    return {e["embedding_id"]: e for e in local_caching.list_catalog()}[embedding_id][
+        "size_bytes"
+    ]
+
+
+def test_prune_evicts_least_recently_used_unpinned(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    for embedding_id in ("old", "pinned", "recent"):
+        _save_corpus(embedding_id, rows=100)
+        cache_catalog.touch(tmp_path, embedding_id, force=True)
+    local_caching.pin("pinned")
+    budget_mb = (_size("pinned") + _size("recent")) / (1024 * 1024)
+
+    stats = local_caching.cache_stats(budget_mb)
+    assert [e["embedding_id"] for e in stats["corpora"] if e["evict"]] == ["old"]
+    assert stats["reclaimable_bytes"] == _size("old")
+
+    evicted = local_caching.prune(budget_mb / 2)
+    assert [e["embedding_id"] for e in evicted] == ["old", "recent"]
+    assert [m.embedding_id for m in local_caching.list_metadata()] == ["pinned"]
+    assert not local_caching.get_cache_dir("old").exists()
+
+
+def test_prune_skips_corpora_locked_elsewhere(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    for embedding_id in ("busy", "idle"):
+        _save_corpus(embedding_id, rows=100)
+        cache_catalog.touch(tmp_path, embedding_id, force=True)
+
+    # Held by a build in progress: evicting it must neither wait nor delete it
+    with local_caching.corpus_lock("busy"):
+        evicted = local_caching.prune(1e-6)
+    assert [e["embedding_id"] for e in evicted] == ["idle"]
+    assert local_caching.is_cached("busy")
+
+    with local_caching.corpus_lock("busy", blocking=False) as acquired:
+        assert acquired
+
+
+def test_pins_survive_catalog_rebuild(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    _save_corpus("abc")
+    local_caching.pin("abc")
+    local_caching.rebuild_catalog()
+    assert local_caching.list_catalog()[0]["pinned"]
+
+    local_caching.pin("abc", False)
+    local_caching.rebuild_catalog()
+    assert not local_caching.list_catalog()[0]["pinned"]
+
+
+def test_saving_over_budget_evicts_other_corpora(tmp_path, monkeypatch):
+    local_caching.CACHE_ROOT = tmp_path
+    _save_corpus("first", rows=1000)
+    monkeypatch.setattr(
+        local_caching, "CACHE_BUDGET_MB", _size("first") * 1.5 / (1024 * 1024)
+    )
+
+    _save_corpus("second", rows=1000)
+    assert not local_caching.is_cached("first")
+    assert local_caching.is_cached("second")
+
+
+def test_cache_admin_cli(tmp_path, capsys):
+    local_caching.CACHE_ROOT = tmp_path
+    _save_corpus("abc")
+
+    assert cache_admin.main(["stats", "--budget-mb", "0.000001"]) == 0
+    assert "abc" in capsys.readouterr().out
+    assert cache_admin.main(["prune", "--budget-mb", "0.000001", "--dry-run"]) == 0
+    assert "Would evict 1 corpora" in capsys.readouterr().out
+    assert local_caching.is_cached("abc")
+    assert cache_admin.main(["pin", "missing"]) == 1
@@ -0,0 +1,91 @@
+import numpy as np
+from services.data_manager import local_caching, corpus_cache
+
+
+def _save_corpus(embedding_id, n_rows=4, dim=3):
+    embeddings = np.random.rand(n_rows, dim).astype(np.float32)
+    records = [{"Name": f"row {i}"} for i in range(n_rows)]
+    local_caching.save_embeddings(embedding_id, embeddings)
+    local_caching.save_records(embedding_id, records)
+    return embeddings, records
+
+
+def test_get_corpus_is_memory_mapped_and_reused(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    corpus_cache.clear()
+    embeddings, records = _save_corpus("warm")
+
+    first = corpus_cache.get_corpus("warm")
+    second = corpus_cache.get_corpus("warm")
+
+    assert first is second
+    assert isinstance(first.embeddings, np.memmap)
+    assert np.array_equal(first.embeddings, embeddings)
+    assert first.records == records
+
+
+def test_get_corpus_reloads_when_files_change(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    corpus_cache.clear()
+    _save_corpus("changing", n_rows=2)
+    first = corpus_cache.get_corpus("changing")
+
+    _save_corpus("changing", n_rows=5)
+    second = corpus_cache.get_corpus("changing")
+
+    assert second is not first
+    assert len(second.records) == 5
+
+
+def test_lru_eviction_under_memory_budget(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    corpus_cache.clear()
+    for embedding_id in ("a", "b", "c"):
+        _save_corpus(embedding_id)
+
+    corpus_cache.set_memory_budget(0)
+    try:
+        corpus_cache.get_corpus("a")
+        corpus_cache.get_corpus("b")
+        corpus_cache.get_corpus("c")
+        stats = corpus_cache.get_cache_stats()
+        assert stats["resident"] == 1
+        assert stats["evictions"] >= 2
+    finally:
+        corpus_cache.set_memory_budget(corpus_cache.DEFAULT_MEMORY_BUDGET_MB)
+
+
+def test_invalidate_releases_file_maps(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    corpus_cache.clear()
+    embeddings, records = _save_corpus("released")
+    handle = corpus_cache.get_corpus("released")
+    assert handle.records[1] == records[1]
+
+    corpus_cache.invalidate("released")
+    assert handle.records._mmap.closed
+    assert handle._embeddings is None
+
+    # A query still holding the handle re-maps the files and finishes
+    assert handle.records[2] == records[2]
+    assert np.array_equal(handle.embeddings, embeddings)
+    handle.close()
+
+
+def test_evicted_and_replaced_handles_are_closed(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    corpus_cache.clear()
+    _save_corpus("a")
+    _save_corpus("b", n_rows=2)
+    first = corpus_cache.get_corpus("b")
+    _save_corpus("b", n_rows=5)
+    assert corpus_cache.get_corpus("b") is not first
+    assert first.records._mmap.closed
+
+    corpus_cache.set_memory_budget(0)
+    try:
+        a = corpus_cache.get_corpus("a")
+        corpus_cache.get_corpus("b")
+        assert a.records._mmap.closed and a._embeddings is None
+    finally:
+        corpus_cache.set_memory_budget(corpus_cache.DEFAULT_MEMORY_BUDGET_MB)
@@ -44,6 +44,11 @@ def test_dispatch_excel_extract_data():
     assert result[0]["City"] == "Singapore"
 
 
+def test_dispatch_count_rows():
+    assert load_data.count_rows(Path("tests/test_files/sample.csv")) == 5
+    assert load_data.count_rows(Path("tests/test_files/sample.xlsx"), "Sheet1") == 5
+
+
 def test_dispatch_invalid_format_raises(tmp_path):
     dummy_path = tmp_path / "sample.unsupported"
     dummy_path.write_text("invalid content")
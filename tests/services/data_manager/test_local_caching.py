@@ -1,7 +1,10 @@
+import os
 import pytest
 import numpy as np
 from pathlib import Path
 import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from services.data_manager import local_caching
 from models.embeddings_metadata import EmbeddingMetadata
 
@@ -23,6 +26,55 @@ def test_generate_file_hash_consistency(tmp_path):
     assert h1 != h3
 
 
+def test_generate_file_hash_memo_short_circuits_unchanged_file(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    path = tmp_path / "data.csv"
+    path.write_text("hello world")
+    first = local_caching.generate_file_hash(path)
+
+    # Same size and mtime: the memo answers without reading the file
+    st = path.stat()
+    path.write_text("HELLO WORLD")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert local_caching.generate_file_hash(path) == first
+    assert local_caching.generate_file_hash(path, use_memo=False) != first
+
+    path.write_text("changed content")
+    assert local_caching.generate_file_hash(path) != first
+    assert (tmp_path / "file_hashes.json").exists()
+
+
+def test_generate_file_hash_memo_is_thread_safe(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    paths = []
+    for i in range(40):
+        paths.append(tmp_path / f"data{i}.csv")
+        paths[-1].write_text(f"row {i}")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        hashes = list(pool.map(local_caching.generate_file_hash, paths))
+
+    assert hashes == [
+        local_caching.generate_file_hash(p, use_memo=False) for p in paths
+    ]
+    memo = json.loads((tmp_path / "file_hashes.json").read_text())
+    assert len(memo) == len(paths)
+    assert not list(tmp_path.glob("file_hashes.json.*.tmp"))
+
+
+def test_generate_file_hash_algorithms(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    path = tmp_path / "data.csv"
+    path.write_text("hello world")
+
+    md5 = local_caching.generate_file_hash(path, "md5")
+    blake2b = local_caching.generate_file_hash(path, "blake2b")
+
+    assert md5 == "5eb63bbbe01eeed093cb22bb8f5acdc3"
+    assert blake2b != md5
+    with pytest.raises(ValueError):
+        local_caching.generate_file_hash(path, "crc32")
+
+
 def test_compute_embedding_id_changes_on_input_variants():
     file_hash = "abcd1234"
     base_columns = ["col1", "col2"]
@@ -107,3 +159,68 @@ def test_is_cached(tmp_path):
     assert local_caching.is_cached(embedding_id)
     local_caching.delete_cache(embedding_id)
     assert not local_caching.is_cached(embedding_id)
+
+
+def test_is_cached_drops_corpora_removed_by_hand(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    embedding_id = "removed"
+    local_caching.save_metadata(
+        EmbeddingMetadata(
+            embedding_id=embedding_id,
+            file_hash="abc",
+            file_name="a.csv",
+            model_key="MiniLM-L6-v2",
+            columns=["Name"],
+        )
+    )
+    assert local_caching.is_cached(embedding_id)
+
+    shutil.rmtree(tmp_path / embedding_id)
+    assert not local_caching.is_cached(embedding_id)
+    assert local_caching.list_catalog() == []
+
+
+def test_corpus_writer_streams_chunks(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    embedding_id = "streamed"
+    embeddings = np.arange(12, dtype=np.float32).reshape(4, 3)
+    records = [{"Name": f"row {i}"} for i in range(4)]
+    sentences = [f"row {i}" for i in range(4)]
+
+    with local_caching.CorpusWriter(embedding_id) as writer:
+        writer.append(records[:3], sentences[:3], embeddings[:3])
+        writer.append(records[3:], sentences[3:], embeddings[3:])
+
+    assert np.array_equal(local_caching.load_embeddings(embedding_id), embeddings)
+    assert local_caching.load_records(embedding_id) == records
+    assert local_caching.load_sentences(embedding_id) == sentences
+    assert not (
+        local_caching.get_cache_dir(embedding_id) / "embeddings.npy.part"
+    ).exists()
+
+
+def test_corpus_writer_removes_partial_files_on_error(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    embedding_id = "failed"
+
+    with pytest.raises(RuntimeError):
+        with local_caching.CorpusWriter(embedding_id) as writer:
+            writer.append([{"A": 1}], ["1"], np.ones((1, 2), dtype=np.float32))
+            raise RuntimeError("embedding failed")
+
+    assert list(local_caching.get_cache_dir(embedding_id).iterdir()) == []
+
+
+def test_legacy_json_stores_are_migrated(tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    cache_dir = local_caching.get_cache_dir("legacy")
+    cache_dir.mkdir()
+    records = [{"Name": "Alice", "Age": 30}, {"Name": "Bob"}]
+    (cache_dir / "records.json").write_text(json.dumps(records, indent=2))
+    (cache_dir / "sentences.json").write_text(json.dumps(["Alice 30", "Bob"]))
+
+    assert local_caching.load_records("legacy") == records
+    assert local_caching.load_sentences("legacy") == ["Alice 30", "Bob"]
+    assert (cache_dir / local_caching.RECORDS_FILE).exists()
+    assert not (cache_dir / "records.json").exists()
+    assert not (cache_dir / "sentences.json").exists()
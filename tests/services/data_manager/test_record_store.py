@@ -0,0 +1,67 @@
+import pytest
+from services.data_manager import record_store
+
+
+@pytest.mark.parametrize("compression", record_store.COMPRESSIONS)
+def test_roundtrip_across_blocks(tmp_path, compression):
+    records = [{"Name": f"row {i}", "Score": i} for i in range(10)]
+    records[3] = {"Name": "no score"}
+    records[7] = {"Score": 7.5, "Note": "late column"}
+    path = tmp_path / "records.bin"
+
+    with record_store.RecordStoreWriter(
+        path, "json", compression, block_rows=4
+    ) as writer:
+        writer.append(records[:6])
+        writer.append(records[6:])
+
+    store = record_store.RecordStore(path)
+    assert len(store) == 10
+    assert store[7] == records[7]
+    assert store[-1] == records[-1]
+    assert list(store) == records
+    assert store == records
+    assert list(store.iter_column("Score")) == [
+        (i, r["Score"]) for i, r in enumerate(records) if "Score" in r
+    ]
+
+
+def test_only_indexed_blocks_are_decoded(tmp_path):
+    path = tmp_path / "sentences.bin"
+    sentences = [f"sentence {i}" for i in range(100)]
+    with record_store.RecordStoreWriter(path, "text", block_rows=10) as writer:
+        writer.append(sentences)
+
+    store = record_store.RecordStore(path)
+    assert [store[i] for i in (95, 3, 97)] == [
+        "sentence 95",
+        "sentence 3",
+        "sentence 97",
+    ]
+    assert sorted(store._blocks) == [0, 9]
+    with pytest.raises(IndexError):
+        store[100]
+
+
+def test_decoded_block_cache_is_bounded_by_bytes(tmp_path, monkeypatch):
+    path = tmp_path / "sentences.bin"
+    with record_store.RecordStoreWriter(path, "text", block_rows=10) as writer:
+        writer.append([f"sentence {i:03d}" for i in range(100)])
+    store = record_store.RecordStore(path)
+
+    for i in range(0, 100, 10):
+        store[i]
+    assert len(store._blocks) == 10  # small stores stay fully decoded
+
+    block_bytes = store._block_bytes // 10
+    monkeypatch.setattr(record_store, "BLOCK_CACHE_BYTES", 3 * block_bytes)
+    store = record_store.RecordStore(path)
+    for i in range(0, 100, 10):
+        store[i]
+    assert sorted(store._blocks) == [7, 8, 9]  # least recently used evicted
+    assert store.nbytes == store._index.nbytes + 3 * block_bytes
+
+
+def test_unsupported_compression_raises(tmp_path):
+    with pytest.raises(ValueError):
+        record_store.RecordStoreWriter(tmp_path / "x.bin", "json", "lz4")
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from services.sbert_engine import ann_index, numpy_retriever
+
+
+@pytest.fixture
+def clustered_corpus():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 32))
+    corpus = centers[rng.integers(0, 20, size=2000)] + 0.5 * rng.normal(
+        size=(2000, 32)
+    )
+    return numpy_retriever.normalize_embeddings(corpus)
+
+
+def test_full_probe_with_full_rescoring_matches_exact(clustered_corpus):
+    index = ann_index.IVFPQIndex.build(clustered_corpus, n_lists=16)
+    query = clustered_corpus[7]
+
+    exact = numpy_retriever.get_top_cosine_matches(query, clustered_corpus, top_k=5)
+    approx = index.search(
+        query,
+        top_k=5,
+        nprobe=16,
+        corpus_embeddings=clustered_corpus,
+        rescore_factor=len(clustered_corpus),
+    )
+
+    assert [idx for idx, _ in approx] == [idx for idx, _ in exact]
+    assert approx[0][0] == 7
+
+
+def test_save_and_load_roundtrip(clustered_corpus, tmp_path):
+    index = ann_index.IVFPQIndex.build(clustered_corpus, n_lists=8)
+    path = tmp_path / ann_index.index_file_name("ivfpq")
+    index.save(path)
+    loaded = ann_index.load_index("ivfpq", path)
+
+    query = clustered_corpus[0]
+    assert loaded.search(query, top_k=3) == index.search(query, top_k=3)
+
+
+def test_recall_report_improves_with_nprobe(clustered_corpus):
+    index = ann_index.IVFPQIndex.build(clustered_corpus, n_lists=32)
+    report = ann_index.recall_report(
+        index,
+        clustered_corpus,
+        clustered_corpus[:20],
+        top_k=5,
+        nprobe_values=(1, 32),
+        corpus_normalized=True,
+    )
+
+    assert [row["nprobe"] for row in report] == [1, 32]
+    assert report[0]["recall_at_k"] <= report[1]["recall_at_k"]
+    assert report[1]["recall_at_k"] > 0.9
+
+
+def test_unsupported_index_type_raises(clustered_corpus):
+    with pytest.raises(ValueError):
+        ann_index.build_index("hnsw", clustered_corpus)
+
+
+@pytest.mark.parametrize("nprobe", [0, -1])
+def test_search_rejects_non_positive_nprobe(clustered_corpus, nprobe):
+    index = ann_index.build_index("ivfpq", clustered_corpus)
+    with pytest.raises(ValueError):
+        index.search(clustered_corpus[0], top_k=5, nprobe=nprobe)
@@ -0,0 +1,66 @@
+import pytest
+from services.sbert_engine import bm25_index
+
+SENTENCES = [
+    "AC-2(4) Automated audit actions for account management",
+    "AC-2 Account management",
+    "Patch CVE-2021-44228 in every log4j deployment",
+    "Review account audit logs weekly",
+    "Enforce password complexity",
+]
+
+
+def test_tokenize_keeps_identifiers_whole():
+    tokens = bm25_index.tokenize("See AC-2(4), and (CVE-2021-44228).")
+    assert {"ac-2(4)", "cve-2021-44228", "ac", "2", "4", "cve"} <= set(tokens)
+    assert "see" in tokens and "(cve-2021-44228)." not in tokens
+
+
+def test_identifier_query_ranks_exact_clause_first():
+    index = bm25_index.BM25Index.build(SENTENCES)
+    assert index.search("AC-2(4)", top_k=2)[0][0] == 0
+    assert index.search("cve-2021-44228", top_k=1)[0][0] == 2
+
+
+def test_falls_back_to_union_when_few_documents_match_all_terms():
+    index = bm25_index.BM25Index.build(SENTENCES)
+    conjunctive = index.search("account audit", top_k=2)
+    assert {idx for idx, _ in conjunctive} == {0, 3}  # both contain every term
+
+    union = index.search("account audit", top_k=4)
+    assert {idx for idx, _ in union} == {0, 1, 3}
+    scores = [score for _, score in union]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_unknown_terms_and_empty_index_return_nothing():
+    assert bm25_index.BM25Index.build(SENTENCES).search("zebra", top_k=3) == []
+    assert bm25_index.BM25Index.build([]).search("account", top_k=3) == []
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = bm25_index.BM25Index.build(SENTENCES)
+    path = tmp_path / bm25_index.INDEX_FILE
+    index.save(path)
+    loaded = bm25_index.BM25Index.load(path)
+    assert loaded.search("account audit", top_k=3) == pytest.approx(
+        index.search("account audit", top_k=3)
+    )
+
+
+def test_chunked_build_matches_single_pass(monkeypatch):
+    single = bm25_index.BM25Index.build(SENTENCES)
+    monkeypatch.setattr(bm25_index, "BUILD_CHUNK_SIZE", 2)
+    chunked = bm25_index.BM25Index.build(iter(SENTENCES))
+
+    for name in ("vocabulary", "offsets", "doc_ids", "term_freqs", "doc_lengths"):
+        assert (getattr(chunked, name) == getattr(single, name)).all()
+
+
+def test_union_fallback_is_capped_to_best_matching_documents(monkeypatch):
+    monkeypatch.setattr(bm25_index, "MAX_FALLBACK_CANDIDATES", 2)
+    index = bm25_index.BM25Index.build(SENTENCES)
+    # No document holds all three terms and four hold one; only the two
+    # matching the most idf (account + audit > password > account) are scored
+    matches = index.search("account audit password", top_k=2)
+    assert {idx for idx, _ in matches} == {0, 3}
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from services.sbert_engine import embedding_store
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(embedding_store, "STORE_PATH", tmp_path / "sentences.sqlite3")
+    embedding_store.clear()
+    return embedding_store
+
+
+def test_put_and_get_many_roundtrip(store):
+    vectors = np.array([[1.0, 2.0], [3.0, 4.0]], dtype=np.float32)
+    store.put_many("MiniLM-L6-v2", ["alpha", "beta"], vectors)
+
+    found = store.get_many("MiniLM-L6-v2", ["beta", "gamma", "alpha"])
+
+    assert np.array_equal(found[0], vectors[1])
+    assert found[1] is None
+    assert np.array_equal(found[2], vectors[0])
+    assert store.get_many("MPNet-base-v2", ["alpha"]) == [None]
+
+
+def test_stats_report_hit_rate(store):
+    store.put_many("MiniLM-L6-v2", ["alpha"], np.ones((1, 2)))
+    store.get_many("MiniLM-L6-v2", ["alpha", "beta"])
+
+    stats = store.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert stats["entries"] == 1
+
+
+def test_evicts_least_recently_used_over_budget(store, monkeypatch):
+    # Budget fits two 2-dim float32 vectors (8 bytes each)
+    monkeypatch.setattr(embedding_store, "MAX_STORE_MB", 16 / (1024 * 1024))
+    store.put_many("MiniLM-L6-v2", ["old"], np.ones((1, 2)))
+    store.put_many("MiniLM-L6-v2", ["warm"], np.ones((1, 2)))
+    store.get_many("MiniLM-L6-v2", ["old"])
+    store.put_many("MiniLM-L6-v2", ["new"], np.ones((1, 2)))
+
+    found = store.get_many("MiniLM-L6-v2", ["old", "warm", "new"])
+    assert [v is not None for v in found] == [True, False, True]
+
+
+def test_size_total_tracks_writes_without_scanning(store, monkeypatch):
+    store.put_many("MiniLM-L6-v2", ["alpha", "beta"], np.ones((2, 4)))
+    store.put_many("MiniLM-L6-v2", ["beta"], np.ones((1, 8)))  # replaced, larger
+    assert store.get_stats()["size_bytes"] == 16 + 32
+
+    monkeypatch.setattr(embedding_store, "MAX_STORE_MB", 48 / (1024 * 1024))
+    store.put_many("MiniLM-L6-v2", ["gamma"], np.ones((1, 4)))
+    conn = embedding_store._connect()
+    (actual,) = conn.execute(
+        "SELECT SUM(LENGTH(vector)) FROM sentence_embeddings"
+    ).fetchone()
+    assert store.get_stats()["size_bytes"] == actual == 32 + 16
+
+
+def test_without_rowid_stores_are_migrated(monkeypatch, tmp_path):
+    import sqlite3
+
+    path = tmp_path / "legacy.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE sentence_embeddings (model_key TEXT NOT NULL,"
+        " text_hash BLOB NOT NULL, vector BLOB NOT NULL, last_access REAL NOT NULL,"
+        " PRIMARY KEY (model_key, text_hash)) WITHOUT ROWID"
+    )
+    vector = np.arange(3, dtype=np.float32)
+    conn.execute(
+        "INSERT INTO sentence_embeddings VALUES (?, ?, ?, 0)",
+        ("MiniLM-L6-v2", embedding_store._text_hash("alpha"), vector.tobytes()),
+    )
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(embedding_store, "STORE_PATH", path)
+    assert np.array_equal(
+        embedding_store.get_many("MiniLM-L6-v2", ["alpha"])[0], vector
+    )
+    assert embedding_store.get_stats()["size_bytes"] == 12
+    (sql,) = (
+        embedding_store._connect()
+        .execute("SELECT sql FROM sqlite_master WHERE name = 'sentence_embeddings'")
+        .fetchone()
+    )
+    assert "WITHOUT ROWID" not in sql
@@ -0,0 +1,71 @@
+import numpy as np
+from services.data_manager import record_store
+from services.sbert_engine import filter_index
+
+RECORDS = [
+    {"Owner": "Alice", "Status": "Active", "Score": 3},
+    {"Owner": "Bob", "Status": "Retired"},
+    {"Owner": "Alice", "Status": "Retired", "Score": 3},
+    {"Owner": "Carol", "Status": "Active", "Score": 4},
+]
+
+
+def test_masks_union_values_within_a_column():
+    index = filter_index.FilterIndex.build(RECORDS)
+    assert index.mask("Owner", ["Alice"]).tolist() == [True, False, True, False]
+    assert index.mask("Owner", ["Bob", "Carol", "Dave"]).tolist() == [
+        False,
+        True,
+        False,
+        True,
+    ]
+    assert index.mask("Score", ["3"]).tolist() == [True, False, True, False]
+
+
+def test_normalize_filters_compares_values_as_text():
+    assert filter_index.normalize_filters({"Score": 3, "Owner": ["Bob", "Alice"]}) == {
+        "Score": ["3"],
+        "Owner": ["Alice", "Bob"],
+    }
+
+
+def test_only_requested_or_low_cardinality_columns_are_indexed():
+    index = filter_index.FilterIndex.build(RECORDS, low_cardinality=2)
+    assert set(index.columns) == {"Status", "Score"}
+
+    index = filter_index.FilterIndex.build(
+        RECORDS, filter_columns=["Owner"], max_distinct=3, low_cardinality=1
+    )
+    assert set(index.columns) == {"Owner"}
+    assert index.mask("Owner", ["Alice"]).tolist() == [True, False, True, False]
+
+
+def test_record_store_is_indexed_column_by_column(tmp_path):
+    path = tmp_path / "records.bin"
+    record_store.write_store(path, RECORDS)
+    store = record_store.RecordStore(path)
+    index = filter_index.FilterIndex.build(store, low_cardinality=2)
+
+    assert set(index.columns) == {"Status", "Score"}
+    assert index.mask("Score", ["3"]).tolist() == [True, False, True, False]
+    assert store._blocks == {}  # lookup cache untouched
+
+
+def test_values_are_stored_as_packed_utf8():
+    records = [{"Owner": "Zoë"}, {"Owner": "A" * 500}]
+    index = filter_index.FilterIndex.build(records)
+    value_bytes, value_offsets, _, _ = index.columns["Owner"]
+    assert value_bytes.dtype == np.uint8
+    assert value_offsets.tolist() == [0, 500, 504]
+    assert index.mask("Owner", ["Zoë"]).tolist() == [True, False]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = filter_index.FilterIndex.build(RECORDS)
+    path = tmp_path / filter_index.INDEX_FILE
+    index.save(path)
+    loaded = filter_index.FilterIndex.load(path)
+    assert loaded.n_rows == 4
+    np.testing.assert_array_equal(
+        loaded.mask("Status", ["Active"]), index.mask("Status", ["Active"])
+    )
@@ -0,0 +1,22 @@
+import pytest
+from services.sbert_engine import fusion
+
+DENSE = [(1, 0.9), (2, 0.8), (3, 0.1)]
+LEXICAL = [(3, 12.0), (1, 2.0)]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = fusion.fuse("rrf", DENSE, LEXICAL, lexical_weight=0.5, top_k=3)
+    assert [idx for idx, _ in fused] == [1, 3, 2]
+
+
+def test_weighted_fusion_follows_lexical_weight():
+    dense_only = fusion.fuse("weighted", DENSE, LEXICAL, lexical_weight=0.0, top_k=3)
+    lexical_only = fusion.fuse("weighted", DENSE, LEXICAL, lexical_weight=1.0, top_k=1)
+    assert [idx for idx, _ in dense_only] == [1, 2, 3]
+    assert lexical_only == [(3, pytest.approx(1.0))]
+
+
+def test_unknown_fusion_method_raises():
+    with pytest.raises(ValueError):
+        fusion.fuse("max", DENSE, LEXICAL, 0.5, 3)
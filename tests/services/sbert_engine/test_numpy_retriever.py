@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from services.sbert_engine import numpy_retriever, sbert_retriever
+
+
+def test_matches_sbert_retriever_rankings():
+    rng = np.random.default_rng(0)
+    corpus_embeddings = rng.normal(size=(200, 16)).astype(np.float32)
+    query_embedding = rng.normal(size=16).astype(np.float32)
+
+    expected = sbert_retriever.get_top_cosine_matches(
+        query_embedding, corpus_embeddings, top_k=10
+    )
+    results = numpy_retriever.get_top_cosine_matches(
+        query_embedding, corpus_embeddings, top_k=10
+    )
+
+    assert [idx for idx, _ in results] == [idx for idx, _ in expected]
+    assert np.allclose([s for _, s in results], [s for _, s in expected], atol=1e-5)
+
+
+def test_chunked_scoring_matches_single_pass():
+    rng = np.random.default_rng(1)
+    corpus_embeddings = numpy_retriever.normalize_embeddings(rng.normal(size=(1000, 8)))
+    query_embedding = rng.normal(size=8)
+
+    single = numpy_retriever.get_top_cosine_matches(
+        query_embedding, corpus_embeddings, top_k=7, corpus_normalized=True
+    )
+    chunked = numpy_retriever.get_top_cosine_matches(
+        query_embedding,
+        corpus_embeddings,
+        top_k=7,
+        corpus_normalized=True,
+        chunk_size=64,
+    )
+
+    assert chunked == single
+
+
+def test_batch_matches_individual_queries():
+    rng = np.random.default_rng(2)
+    corpus_embeddings = rng.normal(size=(300, 12))
+    query_embeddings = rng.normal(size=(4, 12))
+
+    batch = numpy_retriever.get_top_cosine_matches_batch(
+        query_embeddings, corpus_embeddings, top_k=5, chunk_size=50
+    )
+
+    assert len(batch) == 4
+    for query_embedding, matches in zip(query_embeddings, batch):
+        single = numpy_retriever.get_top_cosine_matches(
+            query_embedding, corpus_embeddings, top_k=5
+        )
+        assert [idx for idx, _ in matches] == [idx for idx, _ in single]
+
+
+def test_top_k_larger_than_corpus():
+    corpus_embeddings = np.array([[1.0, 0.0], [0.0, 1.0]])
+    results = numpy_retriever.get_top_cosine_matches(
+        np.array([1.0, 0.0]), corpus_embeddings, top_k=5
+    )
+    assert [idx for idx, _ in results] == [0, 1]
+    assert results[0][1] == pytest.approx(1.0)
+
+
+def test_invalid_query_shape_raises():
+    with pytest.raises(ValueError):
+        numpy_retriever.get_top_cosine_matches(np.ones((2, 3)), np.ones((5, 3)))
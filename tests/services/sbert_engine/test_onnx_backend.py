@@ -0,0 +1,51 @@
+from types import MappingProxyType
+
+import numpy as np
+import pytest
+
+from services.sbert_engine import onnx_backend, sbert_embedder, sbert_model_registry
+
+
+def test_cosine_agreement_rowwise():
+    reference = np.array([[1.0, 0.0], [0.0, 2.0]])
+    candidate = np.array([[2.0, 0.0], [1.0, 0.0]])
+    assert np.allclose(onnx_backend.cosine_agreement(reference, candidate), [1.0, 0.0])
+
+
+def test_cosine_agreement_shape_mismatch_raises():
+    with pytest.raises(ValueError):
+        onnx_backend.cosine_agreement(np.ones((2, 3)), np.ones((3, 3)))
+
+
+class ScaledModel:
+    """Deterministic stand-in: vectors from sentence length, plus optional noise."""
+
+    def __init__(self, noise: float = 0.0):
+        self.noise = noise
+
+    def encode(self, sentences, **kwargs):
+        base = np.array([[len(s), 1.0, 0.5] for s in sentences], dtype=np.float32)
+        return base + self.noise * np.array([0.0, 0.0, 50.0], dtype=np.float32)
+
+
+def _install(monkeypatch, onnx_noise: float):
+    model_name = sbert_model_registry.SUPPORTED_MODELS["MiniLM-L6-v2"]
+    monkeypatch.setitem(sbert_embedder._model_cache, model_name, ScaledModel())
+    monkeypatch.setitem(
+        sbert_embedder._model_cache, f"{model_name}@onnx", ScaledModel(onnx_noise)
+    )
+
+
+def test_check_agreement_passes_for_matching_backend(monkeypatch):
+    _install(monkeypatch, onnx_noise=0.0)
+    # Read-only: the check must not switch backends under other threads
+    monkeypatch.setattr(sbert_model_registry, "MODEL_BACKENDS", MappingProxyType({}))
+    agreement = onnx_backend.check_agreement("MiniLM-L6-v2", "onnx")
+    assert agreement == pytest.approx(1.0)
+    assert sbert_model_registry.get_backend("MiniLM-L6-v2") == "torch"
+
+
+def test_check_agreement_raises_below_threshold(monkeypatch):
+    _install(monkeypatch, onnx_noise=1.0)
+    with pytest.raises(ValueError):
+        onnx_backend.check_agreement("MiniLM-L6-v2", "onnx", ["a", "bb"])
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from services.sbert_engine import quantization, numpy_retriever
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    return numpy_retriever.normalize_embeddings(rng.normal(size=(500, 64)))
+
+
+def test_encode_embeddings_shapes_and_sizes(corpus):
+    float16, _ = quantization.encode_embeddings(corpus, "float16")
+    int8, scales = quantization.encode_embeddings(corpus, "int8")
+    binary, _ = quantization.encode_embeddings(corpus, "binary")
+
+    assert float16.dtype == np.float16 and float16.shape == (500, 64)
+    assert int8.dtype == np.int8 and scales.shape == (64,)
+    assert binary.dtype == np.uint8 and binary.shape == (500, 8)
+    assert np.allclose(int8 * scales, corpus, atol=scales.max())
+
+
+@pytest.mark.parametrize("encoding", quantization.ENCODINGS)
+def test_search_rescores_to_exact_scores(corpus, encoding):
+    codes, scales = quantization.encode_embeddings(corpus, encoding)
+    query = corpus[42] + 0.01
+
+    exact = numpy_retriever.get_top_cosine_matches(query, corpus, top_k=3)
+    results = quantization.search(
+        query, codes, encoding, corpus, top_k=3, scales=scales
+    )
+
+    assert results[0][0] == 42
+    assert results[0][1] == pytest.approx(exact[0][1], abs=1e-5)
+
+
+def test_unsupported_encoding_raises(corpus):
+    with pytest.raises(ValueError):
+        quantization.encode_embeddings(corpus, "int4")
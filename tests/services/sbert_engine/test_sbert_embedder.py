@@ -1,6 +1,9 @@
 import pytest
 import numpy as np
-from services.sbert_engine import sbert_embedder
+from types import SimpleNamespace
+from benchmarks import stand_in_model
+from services.sbert_engine import sbert_embedder, embedding_store, sbert_model_registry
+from services.sbert_engine.sbert_model_registry import SUPPORTED_MODELS
 
 
 def test_get_model_returns_model_instance():
@@ -28,3 +31,174 @@ def test_embed_query_output_shape():
     assert isinstance(embedding, np.ndarray)
     assert embedding.ndim == 1
     assert embedding.shape[0] > 0  # embedding dimension
+
+
+def test_embed_sentences_only_encodes_unseen_sentences(monkeypatch, tmp_path):
+    monkeypatch.setattr(embedding_store, "STORE_PATH", tmp_path / "store.sqlite3")
+    encoded = []
+
+    class CountingModel:
+        def encode(self, sentences, **kwargs):
+            encoded.append(list(sentences))
+            return np.array([[len(s), 1.0] for s in sentences], dtype=np.float32)
+
+    monkeypatch.setattr(sbert_embedder, "get_model", lambda key: CountingModel())
+
+    first = sbert_embedder.embed_sentences(["a", "bb", "a"], "MiniLM-L6-v2")
+    second = sbert_embedder.embed_sentences(["bb", "ccc"], "MiniLM-L6-v2")
+
+    assert encoded == [["a", "bb"], ["ccc"]]
+    assert np.array_equal(first[1], second[0])
+    assert first.shape == (3, 2)
+
+
+def test_split_shards_preserves_order():
+    sentences = [str(i) for i in range(10)]
+    shards = sbert_embedder._split_shards(sentences, 4)
+    assert len(shards) == 4
+    assert sum(shards, []) == sentences
+
+
+def test_small_inputs_skip_the_process_pool(monkeypatch):
+    class StubModel:
+        def encode(self, sentences, **kwargs):
+            return np.ones((len(sentences), 2), dtype=np.float32)
+
+    monkeypatch.setattr(sbert_embedder, "get_model", lambda key: StubModel())
+    embeddings = sbert_embedder.embed_sentences(
+        ["a", "b"], "MiniLM-L6-v2", use_cache=False, workers=8
+    )
+
+    assert embeddings.shape == (2, 2)
+    assert sbert_embedder._pool_cache == {}
+
+
+def test_process_pool_encodes_shards_in_order(monkeypatch):
+    monkeypatch.setitem(
+        SUPPORTED_MODELS, stand_in_model.MODEL_KEY, stand_in_model.MODEL_NAME
+    )
+    monkeypatch.setitem(
+        sbert_embedder._model_cache,
+        stand_in_model.MODEL_NAME,
+        stand_in_model.HashingModel(),
+    )
+    # Spawned workers start clean: the setup registers the stand-in there too
+    monkeypatch.setattr(sbert_embedder, "WORKER_SETUP", stand_in_model.install)
+    sentences = [f"control {i} review {i % 7} owner {i % 3}" for i in range(600)]
+
+    try:
+        pooled = sbert_embedder.embed_sentences(
+            sentences,
+            stand_in_model.MODEL_KEY,
+            use_cache=False,
+            workers=2,
+            threads_per_worker=1,
+        )
+        assert len(sbert_embedder._pool_cache) == 1
+    finally:
+        sbert_embedder.shutdown_pools()
+
+    expected = stand_in_model.HashingModel().encode(sentences)
+    assert np.array_equal(pooled, expected)
+
+
+def test_token_budget_batches_respect_budget():
+    lengths = np.array([3, 40, 5, 40, 4, 10])
+    batches = sbert_embedder._token_budget_batches(
+        lengths, token_budget=80, max_batch_size=3
+    )
+
+    assert sorted(np.concatenate(batches).tolist()) == list(range(6))
+    for batch in batches:
+        assert len(batch) <= 3
+        assert len(batch) * lengths[batch].max() <= 80
+
+
+def test_length_bucketed_encode_restores_input_order(monkeypatch):
+    batch_sizes = []
+
+    class LengthModel:
+        def encode(self, sentences, batch_size=32, **kwargs):
+            batch_sizes.append(batch_size)
+            return np.array([[len(s.split()), 1.0] for s in sentences])
+
+    monkeypatch.setattr(sbert_embedder, "TOKEN_BUDGET", 20)
+    sentences = ["a b c d e f g h", "a", "a b c", "a b", "a b c d e f"]
+    embeddings = sbert_embedder._encode_with_model(LengthModel(), sentences)
+
+    assert embeddings[:, 0].tolist() == [8, 1, 3, 2, 6]
+    assert len(batch_sizes) > 1
+
+
+def test_embed_query_reuses_normalised_queries(monkeypatch):
+    encoded = []
+
+    class CountingModel:
+        def encode(self, sentences, **kwargs):
+            encoded.extend(sentences)
+            return np.array([[len(s), 1.0] for s in sentences], dtype=np.float32)
+
+    monkeypatch.setattr(sbert_embedder, "get_model", lambda key: CountingModel())
+    sbert_embedder.clear_query_cache()
+
+    first = sbert_embedder.embed_query("password  policy", "MiniLM-L6-v2")
+    second = sbert_embedder.embed_query(" password policy\n", "MiniLM-L6-v2")
+    batch = sbert_embedder.embed_queries(["password policy", "mfa"], "MiniLM-L6-v2")
+
+    assert encoded == ["password policy", "mfa"]
+    assert np.array_equal(first, second)
+    assert np.array_equal(batch[0], first)
+    stats = sbert_embedder.get_query_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+
+def test_warm_up_loads_model_in_background(monkeypatch):
+    loaded = []
+
+    class SlowModel:
+        def __init__(self, name):
+            loaded.append(name)
+
+    import sentence_transformers
+
+    monkeypatch.setattr(sentence_transformers, "SentenceTransformer", SlowModel)
+    monkeypatch.setattr(sbert_embedder, "_model_cache", {})
+    done = []
+
+    thread = sbert_embedder.warm_up(
+        "MiniLM-L6-v2", lambda key, error: done.append((key, error))
+    )
+    thread.join(timeout=5)
+
+    assert done == [("MiniLM-L6-v2", None)]
+    assert sbert_embedder.is_model_loaded("MiniLM-L6-v2")
+    sbert_embedder.get_model("MiniLM-L6-v2")
+    assert len(loaded) == 1
+
+
+def test_onnx_backend_without_export_raises(monkeypatch, tmp_path):
+    monkeypatch.setattr(sbert_model_registry, "ONNX_MODEL_DIR", tmp_path)
+    monkeypatch.setitem(sbert_model_registry.MODEL_BACKENDS, "MiniLM-L6-v2", "onnx")
+    with pytest.raises(FileNotFoundError):
+        sbert_embedder.get_model("MiniLM-L6-v2")
+    assert not sbert_embedder.is_model_loaded("MiniLM-L6-v2")
+
+
+def test_backends_keep_separate_sentence_caches(monkeypatch, tmp_path):
+    monkeypatch.setattr(embedding_store, "STORE_PATH", tmp_path / "store.sqlite3")
+    model_name = sbert_model_registry.SUPPORTED_MODELS["MiniLM-L6-v2"]
+    torch_model = SimpleNamespace(
+        encode=lambda s, **kw: np.ones((len(s), 2), dtype=np.float32)
+    )
+    onnx_model = SimpleNamespace(
+        encode=lambda s, **kw: np.full((len(s), 2), 2.0, dtype=np.float32)
+    )
+    monkeypatch.setitem(sbert_embedder._model_cache, model_name, torch_model)
+    monkeypatch.setitem(sbert_embedder._model_cache, f"{model_name}@onnx", onnx_model)
+
+    torch_vecs = sbert_embedder.embed_sentences(["a control"], "MiniLM-L6-v2")
+    monkeypatch.setitem(sbert_model_registry.MODEL_BACKENDS, "MiniLM-L6-v2", "onnx")
+    onnx_vecs = sbert_embedder.embed_sentences(["a control"], "MiniLM-L6-v2")
+
+    assert np.allclose(torch_vecs, 1.0)
+    assert np.allclose(onnx_vecs, 2.0)
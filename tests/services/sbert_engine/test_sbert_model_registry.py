@@ -1,3 +1,5 @@
+import pytest
+
 from services.sbert_engine import sbert_model_registry
 
 
@@ -11,3 +13,25 @@ def test_list_supported_models():
 def test_default_model_id_in_supported_models():
     default_model = sbert_model_registry.DEFAULT_MODEL_ID
     assert default_model in sbert_model_registry.SUPPORTED_MODELS
+
+
+def test_parse_backends():
+    spec = " MiniLM-L6-v2=onnx-int8, MPNet-base-v2 = torch ,"
+    assert sbert_model_registry._parse_backends(spec) == {
+        "MiniLM-L6-v2": "onnx-int8",
+        "MPNet-base-v2": "torch",
+    }
+
+
+def test_model_variant_keeps_torch_key(monkeypatch):
+    monkeypatch.setitem(sbert_model_registry.MODEL_BACKENDS, "MiniLM-L6-v2", "torch")
+    assert sbert_model_registry.model_variant("MiniLM-L6-v2") == "MiniLM-L6-v2"
+
+    monkeypatch.setitem(sbert_model_registry.MODEL_BACKENDS, "MiniLM-L6-v2", "onnx")
+    assert sbert_model_registry.model_variant("MiniLM-L6-v2") == "MiniLM-L6-v2@onnx"
+
+
+def test_get_backend_rejects_unknown_backend(monkeypatch):
+    monkeypatch.setitem(sbert_model_registry.MODEL_BACKENDS, "MiniLM-L6-v2", "tpu")
+    with pytest.raises(ValueError):
+        sbert_model_registry.get_backend("MiniLM-L6-v2")
@@ -0,0 +1,59 @@
+import json
+import pytest
+from services import metrics
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def test_disabled_spans_record_nothing():
+    metrics.disable()
+    metrics.reset()
+    with metrics.span("embed") as span:
+        span.add(rows=10)
+    metrics.record("score", 1.0)
+
+    assert metrics.snapshot() == {}
+
+
+def test_spans_accumulate_per_stage(enabled_metrics):
+    for rows in (3, 4):
+        with metrics.span("embed") as span:
+            span.add(rows=rows, cache_hits=1, cache_misses=rows - 1)
+    metrics.record("score", 0.5, rows=100)
+
+    totals = metrics.snapshot()
+    assert totals["embed"]["calls"] == 2
+    assert totals["embed"]["rows"] == 7
+    assert totals["embed"]["cache_hits"] == 2
+    assert totals["embed"]["cache_misses"] == 5
+    assert totals["score"]["wall_seconds"] == 0.5
+    assert json.loads(metrics.to_json()) == totals
+
+
+def test_callbacks_receive_finished_spans(enabled_metrics):
+    finished = []
+    metrics.add_callback(finished.append)
+    try:
+        with metrics.span("load") as span:
+            span.add(rows=2)
+    finally:
+        metrics.remove_callback(finished.append)
+
+    assert [(s.name, s.rows) for s in finished] == [("load", 2)]
+    assert finished[0].wall_seconds >= 0
+
+
+def test_prometheus_text_format(enabled_metrics):
+    metrics.record("top-k", 0.25, rows=1)
+    text = metrics.to_prometheus()
+
+    assert "# TYPE teddy_search_stage_seconds_total counter" in text
+    assert 'teddy_search_stage_seconds_total{stage="top-k"} 0.25' in text
+    assert 'teddy_search_stage_rows_total{stage="top-k"} 1' in text
@@ -0,0 +1,134 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from services import search_server, semantic_search
+from services.data_manager import local_caching
+from services.sbert_engine import sbert_embedder, embedding_store
+
+TEST_FILES = Path("tests/test_files")
+
+
+class FakeModel:
+    """Offline bag-of-words stand-in for a SentenceTransformer."""
+
+    def encode(self, sentences, convert_to_numpy=True, **kwargs):
+        vecs = np.zeros((len(sentences), 32), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            for token in sentence.lower().split():
+                vecs[i, zlib.crc32(token.encode()) % 32] += 1.0
+        return vecs
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    monkeypatch.setattr(local_caching, "CACHE_ROOT", tmp_path)
+    monkeypatch.setattr(embedding_store, "STORE_PATH", tmp_path / "sentences.sqlite3")
+    monkeypatch.setattr(sbert_embedder, "get_model", lambda model_key: FakeModel())
+    sbert_embedder.clear_query_cache()
+    semantic_search.clear_result_cache()
+
+    batcher = search_server.QueryBatcher(max_batch_size=16, max_wait_ms=50)
+    server = search_server.SearchServer(("127.0.0.1", 0), batcher)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _call(server, path, body=None):
+    url = f"http://127.0.0.1:{server.server_port}{path}"
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method="POST" if data else "GET")
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def test_prepare_query_and_export(server, tmp_path):
+    prepared = _call(
+        server,
+        "/prepare",
+        {"file_path": str(TEST_FILES / "sample.csv"), "columns": ["Name", "City"]},
+    )
+    embedding_id = prepared["embedding_id"]
+    assert [c["embedding_id"] for c in _call(server, "/corpora")] == [embedding_id]
+
+    body = {"query": "Singapore", "embedding_id": embedding_id, "top_k": 2}
+    results = _call(server, "/query", body)["results"]
+    expected = semantic_search.query_corpus_batch(
+        ["Singapore"], embedding_id, "MiniLM-L6-v2", top_k=2
+    )[0]
+    assert [r["record"] for r in results] == [record for record, _ in expected]
+
+    out_path = tmp_path / "results.json"
+    exported = _call(server, "/export", {**body, "out_path": str(out_path)})
+    assert exported["count"] == 2
+    assert out_path.exists()
+
+
+def test_concurrent_queries_are_micro_batched(server, monkeypatch):
+    embedding_id = _call(
+        server,
+        "/prepare",
+        {"file_path": str(TEST_FILES / "sample.csv"), "columns": ["Name", "City"]},
+    )["embedding_id"]
+    calls = []
+    original = semantic_search.query_corpus_batch
+
+    def counting_batch(queries, *args, **kwargs):
+        calls.append(len(queries))
+        return original(queries, *args, **kwargs)
+
+    monkeypatch.setattr(semantic_search, "query_corpus_batch", counting_batch)
+
+    queries = [f"query {i}" for i in range(8)]
+    answers = {}
+
+    def ask(query):
+        body = {
+            "query": query,
+            "embedding_id": embedding_id,
+            "top_k": 1 + len(query) % 3,
+        }
+        answers[query] = _call(server, "/query", body)["results"]
+
+    threads = [threading.Thread(target=ask, args=(q,)) for q in queries]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(calls) == 8
+    assert len(calls) < 8  # some queries shared an encode + matmul
+    assert all(len(answers[q]) == 1 + len(q) % 3 for q in queries)
+
+    stats = _call(server, "/stats")["batching"]
+    assert stats["queries"] == 8
+    assert stats["batches"] == len(calls)
+    assert stats["queue_depth"] == 0
+    assert stats["mean_batch_size"] > 1
+
+
+def test_errors_map_to_status_codes(server):
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        _call(server, "/nope")
+    assert excinfo.value.code == 404
+
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        _call(server, "/query", {"embedding_id": "missing"})
+    assert excinfo.value.code == 400
+
+
+def test_metrics_endpoint_reports_batching(server):
+    url = f"http://127.0.0.1:{server.server_port}/metrics"
+    with urllib.request.urlopen(url) as response:
+        text = response.read().decode()
+    assert "teddy_search_query_queue_depth 0" in text
+    assert "teddy_search_query_batches_total 0" in text
@@ -1,7 +1,15 @@
 import pytest
+import subprocess
+import sys
+import threading
+import time
+import zlib
+import numpy as np
 from pathlib import Path
 import json
-from services import semantic_search
+from services import semantic_search, metrics
+from services.data_manager import local_caching
+from services.sbert_engine import sbert_embedder, embedding_store
 
 TEST_FILES = Path("tests/test_files")
 OUTPUT_DIR = Path("tests/test_outputs")
@@ -47,6 +55,561 @@ def test_prepare_and_query_corpus_csv():
     assert isinstance(results[0][1], float)
 
 
+class FakeModel:
+    """Offline bag-of-words stand-in for a SentenceTransformer."""
+
+    encoded = []
+
+    def encode(self, sentences, convert_to_numpy=True, **kwargs):
+        FakeModel.encoded.extend(sentences)
+        vecs = np.zeros((len(sentences), 32), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            for token in sentence.lower().split():
+                vecs[i, zlib.crc32(token.encode()) % 32] += 1.0
+        return vecs
+
+
+@pytest.fixture
+def fake_model(monkeypatch, tmp_path):
+    local_caching.CACHE_ROOT = tmp_path
+    FakeModel.encoded = []
+    monkeypatch.setattr(embedding_store, "STORE_PATH", tmp_path / "sentences.sqlite3")
+    monkeypatch.setattr(sbert_embedder, "get_model", lambda model_key: FakeModel())
+    sbert_embedder.clear_query_cache()
+    semantic_search.clear_result_cache()
+
+
+def test_query_corpus_retrievers_agree(fake_model):
+    path = TEST_FILES / "sample.csv"
+    embedding_id, metadata = semantic_search.prepare_corpus(
+        path, None, ["Name", "City"], "MiniLM-L6-v2"
+    )
+    assert metadata.normalized
+
+    numpy_results = semantic_search.query_corpus(
+        "Singapore", embedding_id, "MiniLM-L6-v2", top_k=3, retriever="numpy"
+    )
+    sbert_results = semantic_search.query_corpus(
+        "Singapore", embedding_id, "MiniLM-L6-v2", top_k=3, retriever="sbert"
+    )
+    assert numpy_results[0][0]["City"] == "Singapore"
+    assert [r for r, _ in numpy_results][:1] == [r for r, _ in sbert_results][:1]
+
+    with pytest.raises(ValueError):
+        semantic_search.query_corpus(
+            "Singapore", embedding_id, "MiniLM-L6-v2", retriever="unknown"
+        )
+
+
+def test_query_corpus_batch_matches_single_queries(fake_model):
+    path = TEST_FILES / "sample.csv"
+    embedding_id, _ = semantic_search.prepare_corpus(
+        path, None, ["Name", "City"], "MiniLM-L6-v2"
+    )
+    queries = ["Singapore", "Tokyo", "Bob"]
+
+    batch = semantic_search.query_corpus_batch(
+        queries, embedding_id, "MiniLM-L6-v2", top_k=2
+    )
+
+    assert len(batch) == len(queries)
+    for query, results in zip(queries, batch):
+        single = semantic_search.query_corpus(
+            query, embedding_id, "MiniLM-L6-v2", top_k=2
+        )
+        assert [r for r, _ in results] == [r for r, _ in single]
+    assert semantic_search.query_corpus_batch([], embedding_id, "MiniLM-L6-v2") == []
+
+
+def test_query_corpora_merges_one_global_top_k(fake_model):
+    csv_id, _ = semantic_search.prepare_corpus(
+        TEST_FILES / "sample.csv", None, ["Name", "City"], "MiniLM-L6-v2"
+    )
+    xlsx_id, _ = semantic_search.prepare_corpus(
+        TEST_FILES / "sample.xlsx", "Sheet1", ["Name", "City"], "MiniLM-L6-v2"
+    )
+    FakeModel.encoded = []
+
+    stacked = semantic_search.query_corpora("Singapore", top_k=4)
+    assert FakeModel.encoded == ["Singapore"]  # embedded once for both corpora
+    separate = semantic_search.query_corpora("Singapore", top_k=4, stacked=False)
+
+    expected = sorted(
+        (
+            score
+            for eid in (csv_id, xlsx_id)
+            for _, score in semantic_search.query_corpus(
+                "Singapore", eid, "MiniLM-L6-v2", top_k=10
+            )
+        ),
+        reverse=True,
+    )[:4]
+    for results in (stacked, separate):
+        assert [score for _, score, _ in results] == pytest.approx(expected)
+        for record, _, source in results:
+            assert source["file_name"] in ("sample.csv", "sample.xlsx")
+            corpus_records = local_caching.load_records(source["embedding_id"])
+            assert corpus_records[source["row"]] == record
+
+    xlsx_only = semantic_search.query_corpora("Singapore", [xlsx_id], top_k=2)
+    assert {source["sheet_name"] for _, _, source in xlsx_only} == {"Sheet1"}
+    with pytest.raises(ValueError):
+        semantic_search.query_corpora("Singapore", ["not-cached"])
+
+
+def test_query_corpus_hybrid_fusion_finds_clause_ids(fake_model, tmp_path):
+    path = tmp_path / "controls.csv"
+    path.write_text(
+        "id,text\n"
+        "AC-2,Account management\n"
+        "AC-2(4),Automated audit actions\n"
+        "AU-6,Audit record review\n"
+        "IA-5,Password complexity\n"
+    )
+    embedding_id, metadata = semantic_search.prepare_corpus(
+        path, None, ["id", "text"], "MiniLM-L6-v2"
+    )
+    # Built on the first fused query, not by every prepare
+    assert not metadata.lexical_index
+    semantic_search.query_corpus("AC-2(4)", embedding_id, "MiniLM-L6-v2")
+    assert not local_caching.load_metadata(embedding_id).lexical_index
+
+    for method in ("rrf", "weighted"):
+        results = semantic_search.query_corpus(
+            "AC-2(4)", embedding_id, "MiniLM-L6-v2", top_k=2, fusion_method=method
+        )
+        assert results[0][0]["id"] == "AC-2(4)"
+
+    assert local_caching.load_metadata(embedding_id).lexical_index
+
+    with pytest.raises(ValueError):
+        semantic_search.query_corpus(
+            "AC-2(4)", embedding_id, "MiniLM-L6-v2", fusion_method="max"
+        )
+
+
+def test_query_corpus_filters_before_top_k(fake_model, tmp_path):
+    path = tmp_path / "controls.csv"
+    path.write_text(
+        "text,Owner,Status\n"
+        "Firewall rule review,Alice,Active\n"
+        "Firewall change approval,Bob,Active\n"
+        "Firewall logging,Alice,Retired\n"
+        "Password rotation,Alice,Active\n"
+    )
+    embedding_id, metadata = semantic_search.prepare_corpus(
+        path, None, ["text"], "MiniLM-L6-v2", filter_columns=["Owner", "Status"]
+    )
+    assert metadata.filter_index and metadata.filter_columns == ["Owner", "Status"]
+    # Filter columns are kept in the records but never embedded
+    assert all("Alice" not in sentence for sentence in FakeModel.encoded)
+
+    results = semantic_search.query_corpus(
+        "firewall",
+        embedding_id,
+        "MiniLM-L6-v2",
+        top_k=5,
+        filters={"Owner": "Alice", "Status": ["Active"]},
+    )
+    assert [r["text"] for r, _ in results] == [
+        "Firewall rule review",
+        "Password rotation",
+    ]
+
+    hybrid = semantic_search.query_corpus(
+        "firewall",
+        embedding_id,
+        "MiniLM-L6-v2",
+        top_k=1,
+        fusion_method="rrf",
+        filters={"Owner": "Bob"},
+    )
+    assert [r["Owner"] for r, _ in hybrid] == ["Bob"]
+
+    # Low-cardinality embedded columns can be filtered on too
+    embedded = semantic_search.query_corpus(
+        "firewall", embedding_id, "MiniLM-L6-v2", filters={"text": "Firewall logging"}
+    )
+    assert [r["Status"] for r, _ in embedded] == ["Retired"]
+    for filters in ({"Owner": "Nobody"}, {"Team": "Network"}):
+        none = semantic_search.query_corpus(
+            "firewall", embedding_id, "MiniLM-L6-v2", filters=filters
+        )
+        assert none == []
+
+
+def test_filter_index_skips_free_text_columns(fake_model, tmp_path, monkeypatch):
+    monkeypatch.setattr(semantic_search.filter_index, "LOW_CARDINALITY_LIMIT", 2)
+    path = tmp_path / "controls.csv"
+    path.write_text(
+        "text,Owner,Status\n"
+        "Firewall rule review,Alice,Active\n"
+        "Firewall change approval,Bob,Active\n"
+        "Firewall logging,Carol,Retired\n"
+    )
+    columns = ["text", "Status"]
+    embedding_id, _ = semantic_search.prepare_corpus(
+        path, None, columns, "MiniLM-L6-v2", filter_columns=["Owner"]
+    )
+    # Owner was requested; embedded Status has few values, text one per row
+    results = semantic_search.query_corpus(
+        "firewall",
+        embedding_id,
+        "MiniLM-L6-v2",
+        filters={"Owner": "Carol", "Status": "Retired"},
+    )
+    assert [r["text"] for r, _ in results] == ["Firewall logging"]
+    with pytest.raises(ValueError, match="filter_columns"):
+        semantic_search.query_corpus(
+            "firewall", embedding_id, "MiniLM-L6-v2", filters={"text": "Firewall"}
+        )
+
+    # A cached re-prepare keeps the index it has
+    builds = []
+    build = semantic_search._build_filter_index
+    monkeypatch.setattr(
+        semantic_search,
+        "_build_filter_index",
+        lambda *args: builds.append(args) or build(*args),
+    )
+    semantic_search.prepare_corpus(
+        path, None, columns, "MiniLM-L6-v2", filter_columns=["Owner"]
+    )
+    assert builds == []
+
+    # Other filter_columns over the same file is a separate corpus, not a new version
+    other_id, _ = semantic_search.prepare_corpus(path, None, columns, "MiniLM-L6-v2")
+    assert other_id != embedding_id and len(builds) == 1
+    assert local_caching.is_cached(embedding_id)
+
+
+def test_filter_column_over_the_cap_is_reported(
+    fake_model, tmp_path, monkeypatch, capsys
+):
+    monkeypatch.setattr(semantic_search.filter_index, "MAX_DISTINCT_VALUES", 2)
+    path = tmp_path / "controls.csv"
+    path.write_text("text,Owner\nFirewall,Alice\nLogging,Bob\nBackup,Carol\n")
+    embedding_id, _ = semantic_search.prepare_corpus(
+        path, None, ["text"], "MiniLM-L6-v2", filter_columns=["Owner"]
+    )
+    assert "['Owner'] have more than 2 distinct values" in capsys.readouterr().out
+
+    with pytest.raises(ValueError, match="more than 2 distinct values"):
+        semantic_search.query_corpus(
+            "firewall", embedding_id, "MiniLM-L6-v2", filters={"Owner": "Alice"}
+        )
+
+
+def test_prepare_corpus_with_ann_index(fake_model):
+    path = TEST_FILES / "sample.csv"
+    embedding_id, metadata = semantic_search.prepare_corpus(
+        path, None, ["Name", "City"], "MiniLM-L6-v2", index_type="ivfpq"
+    )
+    assert metadata.index_type == "ivfpq"
+    assert (local_caching.get_cache_dir(embedding_id) / "ivfpq_index.npz").exists()
+
+    results = semantic_search.query_corpus(
+        "Singapore", embedding_id, "MiniLM-L6-v2", top_k=1, retriever="ann"
+    )
+    assert results[0][0]["City"] == "Singapore"
+
+    report = semantic_search.ann_recall_report(
+        embedding_id, "MiniLM-L6-v2", top_k=2, nprobe_values=(1, 4)
+    )
+    assert len(report) == 2
+
+
+def test_prepare_corpus_with_compact_encoding(fake_model):
+    path = TEST_FILES / "sample.csv"
+    embedding_id, metadata = semantic_search.prepare_corpus(
+        path, None, ["Name", "City"], "MiniLM-L6-v2"
+    )
+    exact = semantic_search.query_corpus("Tokyo", embedding_id, "MiniLM-L6-v2")
+
+    embedding_id, metadata = semantic_search.prepare_corpus(
+        path, None, ["Name", "City"], "MiniLM-L6-v2", encoding="int8"
+    )
+    assert metadata.embedding_encoding == "int8"
+    assert (local_caching.get_cache_dir(embedding_id) / "embeddings.int8.npy").exists()
+
+    results = semantic_search.query_corpus("Tokyo", embedding_id, "MiniLM-L6-v2")
+    assert results[0] == exact[0]
+
+    # Re-preparing without an encoding keeps it; switching drops the old codes
+    _, metadata = semantic_search.prepare_corpus(
+        path, None, ["Name", "City"], "MiniLM-L6-v2"
+    )
+    assert metadata.embedding_encoding == "int8"
+    _, metadata = semantic_search.prepare_corpus(
+        path, None, ["Name", "City"], "MiniLM-L6-v2", encoding="float32"
+    )
+    assert metadata.embedding_encoding == "float32"
+    assert not list(local_caching.get_cache_dir(embedding_id).glob("embeddings.int8*"))
+
+
+def test_prepare_corpus_streams_in_chunks(fake_model, tmp_path):
+    path = TEST_FILES / "sample.csv"
+    columns = ["Name", "City"]
+    embedding_id, _ = semantic_search.prepare_corpus(
+        path, None, columns, "MiniLM-L6-v2"
+    )
+    expected = local_caching.load_embeddings(embedding_id)
+
+    local_caching.CACHE_ROOT = tmp_path / "chunked"
+    embedding_id, _ = semantic_search.prepare_corpus(
+        path, None, columns, "MiniLM-L6-v2", chunk_size=2
+    )
+
+    assert np.array_equal(local_caching.load_embeddings(embedding_id), expected)
+    assert len(local_caching.load_records(embedding_id)) == 5
+
+
+def test_default_chunks_give_each_worker_a_full_shard(fake_model, monkeypatch):
+    monkeypatch.setattr(semantic_search, "EMBED_CHUNK_SIZE", 2)
+    sizes = []
+    embed = sbert_embedder.embed_sentences
+    monkeypatch.setattr(
+        sbert_embedder,
+        "embed_sentences",
+        lambda sentences, *args, **kwargs: sizes.append(len(sentences))
+        or embed(sentences, *args, **kwargs),
+    )
+    semantic_search.prepare_corpus(
+        TEST_FILES / "sample.csv", None, ["Name", "City"], "MiniLM-L6-v2", workers=2
+    )
+    assert sizes == [4, 1]
+
+
+def test_prepare_corpus_reports_progress(fake_model):
+    updates = []
+    semantic_search.prepare_corpus(
+        TEST_FILES / "sample.csv",
+        None,
+        ["Name", "City"],
+        "MiniLM-L6-v2",
+        chunk_size=2,
+        progress_callback=lambda p: updates.append(p.model_copy()),
+    )
+
+    assert [(u.rows_loaded, u.rows_embedded) for u in updates] == [
+        (2, 0),
+        (2, 2),
+        (4, 2),
+        (4, 4),
+        (5, 4),
+        (5, 5),
+        (5, 5),
+    ]
+    assert all(u.rows_total == 5 for u in updates)
+    assert updates[-1].eta_seconds == 0
+
+
+def test_prepare_corpus_cancels_between_chunks(fake_model):
+    cancel_event = threading.Event()
+
+    def cancel_after_first_chunk(progress):
+        if progress.rows_embedded:
+            cancel_event.set()
+
+    with pytest.raises(semantic_search.PrepareCancelled):
+        semantic_search.prepare_corpus(
+            TEST_FILES / "sample.csv",
+            None,
+            ["Name", "City"],
+            "MiniLM-L6-v2",
+            chunk_size=2,
+            progress_callback=cancel_after_first_chunk,
+            cancel_event=cancel_event,
+        )
+
+    assert FakeModel.encoded == ["Alice Singapore", "Bob New York"]
+    assert semantic_search.list_cached_embedding_metadata() == []
+
+
+def test_concurrent_prepares_share_one_build(fake_model, monkeypatch):
+    builds = []
+
+    class SlowWriter(local_caching.CorpusWriter):
+        def __init__(self, embedding_id):
+            builds.append(embedding_id)
+            time.sleep(0.2)  # leave time for the other callers to miss the cache
+            super().__init__(embedding_id)
+
+    monkeypatch.setattr(local_caching, "CorpusWriter", SlowWriter)
+    results = []
+
+    def prepare():
+        results.append(
+            semantic_search.prepare_corpus(
+                TEST_FILES / "sample.csv", None, ["Name", "City"], "MiniLM-L6-v2"
+            )[0]
+        )
+
+    threads = [threading.Thread(target=prepare) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert results == builds * 4
+    assert len(local_caching.load_records(builds[0])) == 5
+
+
+def test_prepare_corpus_publishes_complete_corpora_only(fake_model, tmp_path):
+    def visible_corpora():
+        return [p.name for p in tmp_path.iterdir() if p.is_dir() and p.name[0] != "."]
+
+    seen_during_build = []
+    embedding_id, _ = semantic_search.prepare_corpus(
+        TEST_FILES / "sample.csv",
+        None,
+        ["Name", "City"],
+        "MiniLM-L6-v2",
+        chunk_size=2,
+        progress_callback=lambda p: seen_during_build.append(visible_corpora()),
+    )
+
+    assert seen_during_build[:-1] == [[]] * (len(seen_during_build) - 1)
+    assert visible_corpora() == [embedding_id]
+    assert list((tmp_path / local_caching.STAGING_DIR).iterdir()) == []
+
+    # A directory left by an interrupted build is replaced, not reused
+    local_caching.delete_cache(embedding_id)
+    partial = tmp_path / embedding_id
+    partial.mkdir()
+    (partial / "embeddings.npy.part").write_bytes(b"partial")
+    semantic_search.prepare_corpus(
+        TEST_FILES / "sample.csv", None, ["Name", "City"], "MiniLM-L6-v2"
+    )
+    assert not (partial / "embeddings.npy.part").exists()
+    assert len(local_caching.load_records(embedding_id)) == 5
+
+
+def test_prepare_corpus_re_embeds_only_changed_rows(fake_model, tmp_path):
+    path = tmp_path / "controls.csv"
+    path.write_text("Name,City\nAlice,Singapore\nBob,New York\nCharlie,London\n")
+    old_id, _ = semantic_search.prepare_corpus(
+        path, None, ["Name", "City"], "MiniLM-L6-v2"
+    )
+
+    # Fix a typo, delete a row and add a row
+    path.write_text("Name,City\nAlice,Singapore\nBob,New Jersey\nDana,Berlin\n")
+    FakeModel.encoded = []
+    new_id, metadata = semantic_search.prepare_corpus(
+        path, None, ["Name", "City"], "MiniLM-L6-v2"
+    )
+
+    assert sorted(FakeModel.encoded) == ["Bob New Jersey", "Dana Berlin"]
+    assert metadata.source_path == str(path.resolve())
+    assert not local_caching.is_cached(old_id)
+    assert [r["Name"] for r in local_caching.load_records(new_id)] == [
+        "Alice",
+        "Bob",
+        "Dana",
+    ]
+
+    incremental = local_caching.load_embeddings(new_id)
+    local_caching.CACHE_ROOT = tmp_path / "full"
+    full_id, _ = semantic_search.prepare_corpus(
+        path, None, ["Name", "City"], "MiniLM-L6-v2"
+    )
+    assert np.allclose(local_caching.load_embeddings(full_id), incremental)
+
+
+def test_previous_version_locked_elsewhere_is_kept(fake_model, tmp_path):
+    path = tmp_path / "controls.csv"
+    path.write_text("Name,City\nAlice,Singapore\nBob,New York\n")
+    old_id, _ = semantic_search.prepare_corpus(path, None, ["Name"], "MiniLM-L6-v2")
+
+    path.write_text("Name,City\nAlice,Singapore\nBob,New Jersey\nDana,Berlin\n")
+    with local_caching.corpus_lock(old_id):
+        new_id, _ = semantic_search.prepare_corpus(path, None, ["Name"], "MiniLM-L6-v2")
+    assert new_id != old_id
+    assert local_caching.is_cached(old_id) and local_caching.is_cached(new_id)
+    assert not list((tmp_path / new_id).glob("*.tmp"))
+
+
+def test_new_version_of_a_pinned_corpus_stays_pinned(fake_model, tmp_path):
+    path = tmp_path / "controls.csv"
+    path.write_text("Name,City\nAlice,Singapore\nBob,New York\n")
+    old_id, _ = semantic_search.prepare_corpus(path, None, ["Name"], "MiniLM-L6-v2")
+    local_caching.pin(old_id)
+
+    path.write_text("Name,City\nAlice,Singapore\nDana,Berlin\n")
+    new_id, _ = semantic_search.prepare_corpus(path, None, ["Name"], "MiniLM-L6-v2")
+
+    assert not local_caching.is_cached(old_id)
+    assert local_caching.is_pinned(new_id)
+    assert [(e["embedding_id"], e["pinned"]) for e in local_caching.list_catalog()] == [
+        (new_id, True)
+    ]
+    assert local_caching.prune(1e-6) == []
+
+
+def test_new_version_keeps_index_and_encoding(fake_model, tmp_path):
+    path = tmp_path / "controls.csv"
+    path.write_text("Name\n" + "".join(f"control {i}\n" for i in range(300)))
+    semantic_search.prepare_corpus(
+        path, None, ["Name"], "MiniLM-L6-v2", index_type="ivfpq", encoding="int8"
+    )
+
+    path.write_text("Name\n" + "".join(f"control {i}\n" for i in range(301)))
+    new_id, metadata = semantic_search.prepare_corpus(
+        path, None, ["Name"], "MiniLM-L6-v2"
+    )
+    assert metadata.index_type == "ivfpq"
+    assert metadata.embedding_encoding == "int8"
+    assert local_caching.load_metadata(new_id) == metadata
+
+
+def test_query_corpus_caches_results_until_corpus_changes(fake_model, tmp_path):
+    path = tmp_path / "controls.csv"
+    path.write_text("Name,City\nAlice,Singapore\nBob,London\n")
+    embedding_id, _ = semantic_search.prepare_corpus(
+        path, None, ["Name", "City"], "MiniLM-L6-v2"
+    )
+
+    first = semantic_search.query_corpus("Singapore", embedding_id, "MiniLM-L6-v2")
+    FakeModel.encoded = []
+    second = semantic_search.query_corpus("  Singapore ", embedding_id, "MiniLM-L6-v2")
+
+    assert second == first
+    assert FakeModel.encoded == []
+    stats = semantic_search.get_query_cache_stats()
+    assert stats["results"]["hits"] == 1
+    assert stats["query_embeddings"]["misses"] == 1
+
+    # Rewriting the cached records bumps the corpus version
+    records = local_caching.load_records(embedding_id)
+    records[0]["City"] = "Changed"
+    local_caching.save_records(embedding_id, records)
+    third = semantic_search.query_corpus("Singapore", embedding_id, "MiniLM-L6-v2")
+
+    assert third[0][0]["City"] == "Changed"
+    stats = semantic_search.get_query_cache_stats()
+    assert stats["results"]["stale"] == 1
+    assert stats["query_embeddings"]["hits"] == 1
+
+
+def test_pipeline_stages_are_instrumented(fake_model):
+    metrics.reset()
+    metrics.enable()
+    try:
+        embedding_id, _ = semantic_search.prepare_corpus(
+            TEST_FILES / "sample.csv", None, ["Name", "City"], "MiniLM-L6-v2"
+        )
+        semantic_search.query_corpus("Singapore", embedding_id, "MiniLM-L6-v2")
+        totals = metrics.snapshot()
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+    assert set(totals) == set(metrics.STAGES)
+    assert totals["embed"]["rows"] == 5
+    assert totals["load-corpus"]["cache_misses"] == 1
+
+
 def test_export_results_to_json(tmp_path):
     results = [
         ({"Name": "Alice", "City": "Singapore"}, 0.95),
@@ -66,3 +629,24 @@ def test_export_results_invalid_extension():
     out_path = OUTPUT_DIR / "invalid.xyz"
     with pytest.raises(ValueError):
         semantic_search.export_results(results, out_path)
+
+
+IMPORT_TIME_BUDGET_SECONDS = 2.0
+
+
+def test_import_stays_light_and_within_budget():
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import services.semantic_search\n"
+        "elapsed = time.perf_counter() - start\n"
+        "heavy = [m for m in ('torch', 'sentence_transformers', 'openpyxl')"
+        " if m in sys.modules]\n"
+        "print(elapsed, ','.join(heavy))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    ).stdout.split()
+
+    assert out[1:] == []  # no heavy modules imported
+    assert float(out[0]) < IMPORT_TIME_BUDGET_SECONDS